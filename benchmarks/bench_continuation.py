@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""continuation 查找基准：直接路径 vs 全树遍历
+
+用法:
+    python benchmarks/bench_continuation.py                  # 合成分页
+    python benchmarks/bench_continuation.py --recorded DIR   # 录制的响应（DIR/*.json）
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_chat_downloader import fetcher
+from benchmarks import legacy
+from benchmarks.payloads import make_replay_pages, make_initial_data, load_recorded_pages
+
+
+def per_call_us(func, items, repeat):
+    """返回每次调用的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    return (time.perf_counter() - start) / (repeat * len(items)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="continuation 查找基准")
+    parser.add_argument("--recorded", type=str, help="录制的响应目录（*.json）")
+    parser.add_argument("--pages", type=int, default=50, help="合成分页数 (默认: 50)")
+    parser.add_argument("--actions", type=int, default=100, help="每页消息数 (默认: 100)")
+    parser.add_argument("--repeat", type=int, default=20, help="重复次数 (默认: 20)")
+    args = parser.parse_args()
+
+    if args.recorded:
+        pages = load_recorded_pages(args.recorded)
+        source = f"录制响应 {args.recorded}"
+    else:
+        pages = make_replay_pages(args.pages, args.actions)
+        source = f"合成分页 {args.pages} 页 × {args.actions} 条"
+    if not pages:
+        print("❌ 没有可用的响应数据")
+        return 1
+
+    mismatched = sum(
+        1 for p in pages if fetcher.extract_next_cont(p) != legacy.extract_next_cont(p)
+    )
+
+    for key in fetcher.continuation_lookup_stats:
+        fetcher.continuation_lookup_stats[key] = 0
+    before = per_call_us(legacy.extract_next_cont, pages, args.repeat)
+    after = per_call_us(fetcher.extract_next_cont, pages, args.repeat)
+    stats = dict(fetcher.continuation_lookup_stats)
+
+    initial = [make_initial_data(related=40)]
+    init_before = per_call_us(legacy.find_continuation, initial, args.repeat * 50)
+    init_after = per_call_us(fetcher.find_continuation, initial, args.repeat * 50)
+
+    print("=" * 60)
+    print(f"📦 数据: {source}")
+    print("=" * 60)
+    print(f"extract_next_cont  遍历: {before:9.2f} µs/页   直接路径: {after:9.2f} µs/页   "
+          f"加速 {before / after:.1f}x")
+    print(f"find_continuation  遍历: {init_before:9.2f} µs     直接路径: {init_after:9.2f} µs     "
+          f"加速 {init_before / init_after:.1f}x")
+    print(f"直接路径命中: {stats['fast_path']} 次, 回退遍历: {stats['fallback']} 次")
+    print(f"与旧实现结果不同的分页: {mismatched}（最后一页旧实现会误取 playerSeek token）")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""JSON 后端基准：标准库 json vs orjson（MB/秒）
+
+用法:
+    python benchmarks/bench_json_codec.py                  # 合成回放响应与聊天文件
+    python benchmarks/bench_json_codec.py --files DIR      # 已保存的聊天文件（DIR/*.json）
+    python benchmarks/bench_json_codec.py --recorded DIR   # 录制的回放响应（DIR/*.json）
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_chat_downloader import codec, fetcher
+from youtube_chat_downloader.writers import JsonChatWriter
+from benchmarks.payloads import make_replay_pages, make_watch_html, make_initial_data
+
+
+def mb_per_second(func, blobs, repeat):
+    size = sum(len(b) for b in blobs) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for b in blobs:
+            func(b)
+    return size / (time.perf_counter() - start) / 2**20
+
+
+def synthetic_chat_file(tmpdir, pages):
+    """用 JsonChatWriter 写出一个合成的聊天文件"""
+    info = {"id": "benchmark01", "title": "基准", "duration": 3600, "upload_date": "20240101",
+            "url": "https://www.youtube.com/watch?v=benchmark01"}
+    with JsonChatWriter(tmpdir, info) as writer:
+        for page in pages:
+            writer.write(fetcher.parse_messages(fetcher._page_actions(page))[0])
+        return writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 后端基准")
+    parser.add_argument("--files", type=str, help="已保存的聊天文件目录（*.json）")
+    parser.add_argument("--recorded", type=str, help="录制的回放响应目录（*.json）")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数 (默认: 5)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pages = make_replay_pages(50, 100)
+        if args.recorded:
+            responses = [p.read_bytes() for p in sorted(Path(args.recorded).glob("*.json"))]
+        else:
+            responses = [json.dumps(p, ensure_ascii=False).encode("utf-8") for p in pages]
+        if args.files:
+            files = [p.read_bytes() for p in sorted(Path(args.files).glob("*.json"))]
+        else:
+            with open(synthetic_chat_file(tmpdir, pages), 'rb') as f:
+                files = [f.read()]
+    watch = [make_watch_html(make_initial_data(related=200), padding=200000)]
+    marker = "var ytInitialData = "
+
+    if not responses or not files:
+        print("❌ 没有可用的数据")
+        return 1
+
+    print("=" * 60)
+    print(f"📦 回放响应 {len(responses)} 个 ({sum(map(len, responses)) / 2**20:.1f} MiB)，"
+          f"聊天文件 {len(files)} 个 ({sum(map(len, files)) / 2**20:.1f} MiB)")
+    print("=" * 60)
+    decoded = [codec.loads(r) for r in responses]
+    try:
+        for name in codec.BACKENDS:
+            codec.use_backend(name)
+            resp = mb_per_second(codec.loads, responses, args.repeat)
+            saved = mb_per_second(codec.loads, files, args.repeat)
+            page = mb_per_second(lambda h: codec.raw_decode(h, h.index(marker) + len(marker)),
+                                 watch, args.repeat * 10)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                size = sum(len(codec.dumps(d)) for d in decoded)
+            enc = size * args.repeat / (time.perf_counter() - start) / 2**20
+            print(f"{name:7s} 解析响应 {resp:8.1f} MB/s   解析聊天文件 {saved:8.1f} MB/s   "
+                  f"页面内嵌 JSON {page:8.1f} MB/s   编码 {enc:8.1f} MB/s")
+    finally:
+        codec.use_backend()
+    if "orjson" not in codec.BACKENDS:
+        print("ℹ️ 未安装 orjson，只测试了标准库（pip install orjson）")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""消息内存占用基准：旧的五键字典 vs ChatMessage
+
+用法:
+    python benchmarks/bench_message_memory.py [--messages N]
+"""
+
+import os
+import sys
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_chat_downloader import fetcher
+from benchmarks import legacy
+from benchmarks.payloads import make_replay_pages
+
+
+def retained_bytes(parse, action_lists, repeat):
+    """解析 repeat 轮并保留全部消息，返回 (新增内存字节数, 消息数)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = []
+    for _ in range(repeat):
+        for actions in action_lists:
+            kept.extend(parse(actions)[0])
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, len(kept)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="消息内存占用基准")
+    parser.add_argument("--messages", type=int, default=200000, help="保留的消息数 (默认: 200000)")
+    args = parser.parse_args()
+
+    pages = make_replay_pages(100, 100)
+    action_lists = [fetcher._page_actions(p) for p in pages]
+    repeat = max(1, args.messages // 10000)
+
+    old_bytes, count = retained_bytes(legacy.parse_messages, action_lists, repeat)
+    new_bytes, _ = retained_bytes(fetcher.parse_messages, action_lists, repeat)
+    # 消息正文本身无法压缩，单独列出记录结构的开销
+    text_bytes = sum(sys.getsizeof(m.message) for a in action_lists for m in fetcher.parse_messages(a)[0]) * repeat
+
+    print("=" * 60)
+    print(f"📦 保留 {count:,} 条消息")
+    print("=" * 60)
+    print(f"字典:        {old_bytes / count:7.1f} 字节/条   ({old_bytes / count * 1e6 / 2**20:7.1f} MiB/百万条)")
+    print(f"ChatMessage: {new_bytes / count:7.1f} 字节/条   ({new_bytes / count * 1e6 / 2**20:7.1f} MiB/百万条)")
+    print(f"其中消息正文约 {text_bytes / count:.1f} 字节/条；"
+          f"不计正文时缩小 {(old_bytes - text_bytes) / (new_bytes - text_bytes):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""parse_messages 基准：旧实现 vs 热路径优化实现（消息/秒）
+
+用法:
+    python benchmarks/bench_parse_messages.py                  # 合成分页
+    python benchmarks/bench_parse_messages.py --recorded DIR   # 录制的响应（DIR/*.json）
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_chat_downloader import fetcher
+from benchmarks import legacy
+from benchmarks.payloads import make_replay_pages, load_recorded_pages
+
+
+def messages_per_second(func, action_lists, repeat):
+    """返回 (消息/秒, 每轮消息数)"""
+    total = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for actions in action_lists:
+            total += len(func(actions)[0])
+    elapsed = time.perf_counter() - start
+    return total / elapsed, total // repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parse_messages 基准")
+    parser.add_argument("--recorded", type=str, help="录制的响应目录（*.json）")
+    parser.add_argument("--pages", type=int, default=50, help="合成分页数 (默认: 50)")
+    parser.add_argument("--actions", type=int, default=100, help="每页消息数 (默认: 100)")
+    parser.add_argument("--repeat", type=int, default=20, help="重复次数 (默认: 20)")
+    args = parser.parse_args()
+
+    if args.recorded:
+        pages = load_recorded_pages(args.recorded)
+        source = f"录制响应 {args.recorded}"
+    else:
+        pages = make_replay_pages(args.pages, args.actions)
+        source = f"合成分页 {args.pages} 页 × {args.actions} 条"
+    action_lists = [fetcher._page_actions(p) for p in pages]
+    if not action_lists:
+        print("❌ 没有可用的响应数据")
+        return 1
+
+    mismatched = sum(1 for a in action_lists if fetcher.parse_messages(a) != legacy.parse_messages(a))
+
+    before, count = messages_per_second(legacy.parse_messages, action_lists, args.repeat)
+    after, _ = messages_per_second(fetcher.parse_messages, action_lists, args.repeat)
+
+    print("=" * 60)
+    print(f"📦 数据: {source}（每轮 {count} 条消息）")
+    print("=" * 60)
+    print(f"旧实现:   {before:12,.0f} 条/秒")
+    print(f"优化实现: {after:12,.0f} 条/秒   加速 {after / before:.2f}x")
+    print(f"输出不一致的分页: {mismatched}")
+    return 0 if mismatched == 0 else 1
+
+
+if __name__ == "__main__":
+    exit(main())
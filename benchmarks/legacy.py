@@ -0,0 +1,105 @@
+"""优化前的参考实现，仅用于基准对比和一致性校验"""
+
+
+def find_continuation(ytInitialData):
+    def walk(d):
+        if isinstance(d, dict):
+            if "continuation" in d:
+                return d["continuation"]
+            for v in d.values():
+                res = walk(v)
+                if res:
+                    return res
+        elif isinstance(d, list):
+            for i in d:
+                res = walk(i)
+                if res:
+                    return res
+        return None
+
+    return walk(ytInitialData)
+
+
+def extract_next_cont(json_data):
+    def walk(obj):
+        if isinstance(obj, dict):
+            for k, v in obj.items():
+                if k == "continuation":
+                    return v
+                res = walk(v)
+                if res:
+                    return res
+        elif isinstance(obj, list):
+            for i in obj:
+                res = walk(i)
+                if res:
+                    return res
+        return None
+
+    return walk(json_data)
+
+
+def extract_params(html):
+    import re
+    import json
+
+    key_m = re.search(r'INNERTUBE_API_KEY["\']\s*:\s*"([^"]+)"', html)
+    ver_m = re.search(r'INNERTUBE_CONTEXT_CLIENT_VERSION["\']\s*:\s*"([^"]+)"', html)
+    yid_m = re.search(
+        r'ytInitialData["\']?\s*[:=]\s*(\{.*?\})[;\n]', html, flags=re.DOTALL
+    )
+
+    api_key = key_m.group(1) if key_m else None
+    version = ver_m.group(1) if ver_m else "2.20201021.03.00"
+    yid = json.loads(yid_m.group(1)) if yid_m else None
+    return api_key, version, yid
+
+
+def parse_messages(actions):
+    import re
+    from youtube_chat_downloader.fetcher import ms_to_timestamp
+
+    messages = []
+    latest_offset = 0
+    for a in actions or []:
+        if "replayChatItemAction" in a:
+            item = a["replayChatItemAction"].get("actions", [{}])[0]
+            chat = item.get("addChatItemAction", {}).get("item", {})
+            for t in ("liveChatTextMessageRenderer", "liveChatPaidMessageRenderer"):
+                if t in chat:
+                    r = chat[t]
+
+                    author = r.get("authorName", {}).get("simpleText", "").strip()
+                    if not author:
+                        continue
+
+                    author_id = r.get("authorExternalChannelId", "")
+
+                    msg_runs = r.get("message", {}).get("runs", [])
+                    msg = "".join([x.get("text", "") for x in msg_runs]).strip()
+                    if not msg:
+                        continue
+
+                    offset = 0
+                    time_text = "0:00"
+                    if "videoOffsetTimeMsec" in r:
+                        try:
+                            offset = int(float(r["videoOffsetTimeMsec"]))
+                            time_text = ms_to_timestamp(offset)
+                        except:
+                            pass
+                    elif "timestampText" in r:
+                        time_text = r["timestampText"].get("simpleText", "0:00").strip()
+
+                    msg = re.sub(r"[\x00-\x1F\x7F]", "", msg)
+
+                    messages.append({
+                        "time_text": time_text,
+                        "author": author,
+                        "author_id": author_id,
+                        "message": msg,
+                        "offset_ms": offset
+                    })
+                    if offset > latest_offset:
+                        latest_offset = offset
+    return messages, latest_offset
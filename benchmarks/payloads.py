@@ -0,0 +1,232 @@
+"""构造与 YouTube InnerTube 响应结构一致的合成数据
+
+字段布局参照录制的 get_live_chat_replay 响应和观看页面 ytInitialData，
+用于在没有网络时进行基准测试和离线测试。
+"""
+
+import json
+import random
+
+_TRACKING = "CAEQl98BIhMI" + "x" * 40
+
+
+def _thumbnails(url):
+    return {"thumbnails": [
+        {"url": f"{url}=s32-c-k-c0x00ffffff-no-rj", "width": 32, "height": 32},
+        {"url": f"{url}=s64-c-k-c0x00ffffff-no-rj", "width": 64, "height": 64},
+    ]}
+
+
+def _ms_to_text(ms):
+    s = int(ms) // 1000
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+def make_chat_action(i, offset_ms, author_idx, paid=False, text=None):
+    """构造一条 replayChatItemAction"""
+    runs = [{"text": text if text is not None else f"消息 {i} "}]
+    if i % 7 == 0:
+        runs.append({"emoji": {
+            "emojiId": "😂",
+            "shortcuts": [":joy:"],
+            "searchTerms": ["joy"],
+            "image": _thumbnails("https://yt3.ggpht.com/emoji"),
+        }})
+        runs.append({"text": " 哈哈"})
+
+    renderer = {
+        "message": {"runs": runs},
+        "authorName": {"simpleText": f"用户{author_idx}"},
+        "authorPhoto": _thumbnails(f"https://yt4.ggpht.com/author{author_idx}"),
+        "contextMenuEndpoint": {
+            "clickTrackingParams": _TRACKING,
+            "commandMetadata": {"webCommandMetadata": {"ignoreNavigation": True}},
+            "liveChatItemContextMenuEndpoint": {"params": "Q2g0S0dnb1lRMmh" + "A" * 60},
+        },
+        "id": f"ChwKGkNJbTV{i:012d}",
+        "timestampUsec": str(1700000000000000 + offset_ms * 1000),
+        "authorExternalChannelId": f"UC{author_idx:022d}",
+        "contextMenuAccessibility": {"accessibilityData": {"label": "Chat actions"}},
+        "timestampText": {"simpleText": _ms_to_text(offset_ms)},
+        "trackingParams": _TRACKING,
+        "videoOffsetTimeMsec": str(offset_ms),
+    }
+    if paid:
+        renderer["purchaseAmountText"] = {"simpleText": "¥30.00"}
+        renderer["headerBackgroundColor"] = 4278239141
+        renderer["bodyBackgroundColor"] = 4280150454
+        name = "liveChatPaidMessageRenderer"
+    else:
+        name = "liveChatTextMessageRenderer"
+
+    return {"replayChatItemAction": {
+        "actions": [{"addChatItemAction": {"item": {name: renderer}, "clientId": f"CLIENT{i}"}}],
+        "videoOffsetTimeMsec": str(offset_ms),
+    }}
+
+
+def make_replay_page(start_offset_ms, n_actions=100, continuation="next", step_ms=300,
+                     seek="seek-token", authors=500, seed=0, first_index=0):
+    """构造一页 get_live_chat_replay 响应"""
+    rng = random.Random(seed + start_offset_ms)
+    actions = []
+    for j in range(n_actions):
+        offset = start_offset_ms + j * step_ms
+        i = first_index + j
+        actions.append(make_chat_action(i, offset, rng.randrange(authors), paid=(i % 50 == 0)))
+
+    continuations = []
+    if continuation:
+        continuations.append({"liveChatReplayContinuationData": {
+            "timeUntilLastMessageMsec": step_ms, "continuation": continuation,
+        }})
+    if seek:
+        continuations.append({"playerSeekContinuationData": {"continuation": seek}})
+
+    return {
+        "responseContext": {
+            "serviceTrackingParams": [
+                {"service": "CSI", "params": [
+                    {"key": "c", "value": "WEB"},
+                    {"key": "cver", "value": "2.20240101.00.00"},
+                    {"key": "yt_li", "value": "0"},
+                    {"key": "GetLiveChatReplay_rid", "value": "0x1234567890abcdef"},
+                ]},
+                {"service": "GFEEDBACK", "params": [
+                    {"key": "logged_in", "value": "0"},
+                    {"key": "e", "value": ",".join(str(23800000 + k) for k in range(60))},
+                ]},
+                {"service": "ECATCHER", "params": [
+                    {"key": "client.version", "value": "2.20240101"},
+                    {"key": "client.name", "value": "WEB"},
+                ]},
+            ],
+            "mainAppWebResponseContext": {"loggedOut": True, "trackingParam": _TRACKING * 3},
+            "webResponseContextExtensionData": {"hasDecorated": True},
+        },
+        "continuationContents": {"liveChatContinuation": {
+            "continuations": continuations,
+            "actions": actions,
+        }},
+        "trackingParams": _TRACKING,
+    }
+
+
+def make_replay_pages(n_pages, n_actions=100, step_ms=300, seed=0):
+    """构造一串首尾相连的回放分页（token 为 page-1, page-2, ...）"""
+    pages = []
+    for p in range(n_pages):
+        nxt = f"page-{p + 1}" if p + 1 < n_pages else None
+        pages.append(make_replay_page(
+            p * n_actions * step_ms, n_actions, continuation=nxt, step_ms=step_ms,
+            seed=seed, first_index=p * n_actions,
+        ))
+    return pages
+
+
+def make_initial_data(continuation="page-0", related=20):
+    """构造观看页面的 ytInitialData"""
+    related_items = [{"compactVideoRenderer": {
+        "videoId": f"rel{k:08d}",
+        "thumbnail": _thumbnails(f"https://i.ytimg.com/vi/rel{k:08d}/hqdefault.jpg"),
+        "title": {"simpleText": f"相关视频 {k}"},
+        "lengthText": {"simpleText": "1:02:03"},
+        "navigationEndpoint": {"watchEndpoint": {"videoId": f"rel{k:08d}"}},
+        "trackingParams": _TRACKING,
+    }} for k in range(related)]
+
+    return {
+        "responseContext": {"serviceTrackingParams": [{"service": "CSI", "params": []}]},
+        "contents": {"twoColumnWatchNextResults": {
+            "results": {"results": {"contents": [
+                {"videoPrimaryInfoRenderer": {"title": {"runs": [{"text": "测试直播"}]}}},
+            ]}},
+            "secondaryResults": {"secondaryResults": {"results": related_items}},
+            "conversationBar": {"liveChatRenderer": {
+                "continuations": [{"reloadContinuationData": {
+                    "continuation": continuation, "clickTrackingParams": _TRACKING,
+                }}],
+                "header": {"liveChatHeaderRenderer": {"viewSelector": {
+                    "sortFilterSubMenuRenderer": {"subMenuItems": [
+                        {"title": "Top chat replay", "selected": True,
+                         "continuation": {"reloadContinuationData": {"continuation": continuation}}},
+                        {"title": "Live chat replay", "selected": False,
+                         "continuation": {"reloadContinuationData": {"continuation": continuation + "-all"}}},
+                    ]},
+                }}},
+                "trackingParams": _TRACKING,
+                "isReplay": True,
+            }},
+        }},
+        "trackingParams": _TRACKING,
+    }
+
+
+def load_recorded_pages(directory):
+    """读取目录中录制的响应文件（*.json）"""
+    from pathlib import Path
+
+    pages = []
+    for path in sorted(Path(directory).glob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append(json.load(f))
+    return pages
+
+
+def make_player_response(video_id="abcdefghijk", title="测试直播", length_seconds=3600,
+                         upload_date="2024-01-15T12:00:00-08:00"):
+    """构造观看页面的 ytInitialPlayerResponse"""
+    return {
+        "responseContext": {"serviceTrackingParams": []},
+        "playabilityStatus": {"status": "OK"},
+        "videoDetails": {
+            "videoId": video_id,
+            "title": title,
+            "lengthSeconds": str(length_seconds),
+            "channelId": "UC" + "0" * 22,
+            "isLiveContent": True,
+            "shortDescription": "直播回放;\n第二行",
+        },
+        "microformat": {"playerMicroformatRenderer": {
+            "title": {"simpleText": title},
+            "lengthSeconds": str(length_seconds),
+            "uploadDate": upload_date,
+            "publishDate": upload_date,
+            "liveBroadcastDetails": {
+                "isLiveNow": False,
+                "startTimestamp": upload_date,
+            },
+        }},
+    }
+
+
+def make_watch_html(initial_data=None, player_response=None, api_key="AIzaTestKey",
+                    version="2.20240101.00.00", padding=0):
+    """构造观看页面HTML（ytcfg + ytInitialPlayerResponse + ytInitialData）
+
+    Args:
+        padding: 额外填充的脚本字节数，用于模拟数 MB 的真实页面
+    """
+    initial_data = initial_data if initial_data is not None else make_initial_data()
+    player_response = player_response if player_response is not None else make_player_response()
+    filler = "".join(
+        f'<script nonce="x">var _f{k}="' + "z" * 1000 + '";</script>\n'
+        for k in range(padding // 1000)
+    )
+    ytcfg = json.dumps({
+        "INNERTUBE_API_KEY": api_key,
+        "INNERTUBE_CONTEXT_CLIENT_VERSION": version,
+        "INNERTUBE_CONTEXT_CLIENT_NAME": 1,
+    })
+    return (
+        "<!DOCTYPE html><html><head>"
+        f'<script nonce="x">ytcfg.set({ytcfg});</script>\n'
+        "</head><body>\n"
+        f"{filler}"
+        f'<script nonce="x">var ytInitialPlayerResponse = {json.dumps(player_response, ensure_ascii=False)};'
+        "var meta = document.createElement('meta');</script>\n"
+        f'<script nonce="x">var ytInitialData = {json.dumps(initial_data, ensure_ascii=False)};</script>\n'
+        "</body></html>"
+    )
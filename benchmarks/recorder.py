@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""录制观看页面和 get_live_chat_replay 响应，供 benchmarks/stub_server.py 离线回放
+
+录制目录结构:
+    DIR/watch/<video_id>.html     观看页面
+    DIR/replay/<key>.json         回放响应，key 为 continuation（和跳转位置）的摘要
+
+DIR/replay 同时可以直接作为 bench_continuation.py / bench_parse_messages.py 的 --recorded 参数。
+
+用法:
+    python benchmarks/recorder.py --url "https://www.youtube.com/watch?v=VIDEO_ID" --output DIR
+"""
+
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_chat_downloader import fetcher
+from youtube_chat_downloader.session import ChatSession
+from benchmarks.stub_server import REPLAY_PATH, request_key
+
+
+class RecordingSession(ChatSession):
+    """把成功的观看页面和回放响应原样写入录制目录的 ChatSession"""
+
+    def __init__(self, directory, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = Path(directory)
+        (self.directory / "watch").mkdir(parents=True, exist_ok=True)
+        (self.directory / "replay").mkdir(parents=True, exist_ok=True)
+        self.recorded = {"watch": 0, "replay": 0}
+
+    def request(self, method, url, **kwargs):
+        r = super().request(method, url, **kwargs)
+        if r.status_code != 200:
+            return r
+        parsed = urlparse(url)
+        if method == "GET":
+            video_id = parse_qs(parsed.query).get("v", [""])[0]
+            if video_id:
+                (self.directory / "watch" / f"{video_id}.html").write_bytes(r.content)
+                self.recorded["watch"] += 1
+        elif parsed.path == REPLAY_PATH:
+            body = json.loads(kwargs.get("data") or b"{}")
+            (self.directory / "replay" / f"{request_key(body)}.json").write_bytes(r.content)
+            self.recorded["replay"] += 1
+        return r
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制聊天回放响应")
+    parser.add_argument("--url", type=str, required=True, action="append",
+                        help="视频链接（可重复指定）")
+    parser.add_argument("--output", type=str, required=True, help="录制目录")
+    parser.add_argument("--cookies", type=str, help="Cookie 文件路径")
+    args = parser.parse_args()
+
+    session = RecordingSession(args.output)
+    for url in args.url:
+        counters = {}
+        try:
+            for _ in fetcher.iter_video_chat(url, args.cookies, True, session, counters, prefetch=0):
+                pass
+        except fetcher.ChatReplayUnavailable as e:
+            print(e)
+        print(f"📼 {url}: {counters.get('pages', 0)} 页")
+
+    print(f"✅ 已录制 {session.recorded['watch']} 个观看页面、{session.recorded['replay']} 个回放响应 → {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""本地 InnerTube 桩服务器
+
+回放录制的观看页面和 get_live_chat_replay 响应（见 benchmarks/recorder.py），
+没有录制目录时使用 benchmarks/payloads 生成的合成回放。可配置延迟、
+HTTP 500 和 429（带 Retry-After），用于在没有网络的机器上重复测量吞吐和重试行为。
+
+用法:
+    python benchmarks/stub_server.py --recorded DIR --latency 0.05 --throttle-rate 0.05
+    python benchmarks/stub_server.py --pages 200             # 合成回放
+
+然后:
+    ytchat --url http://127.0.0.1:PORT/watch?v=VIDEO_ID --api-base http://127.0.0.1:PORT
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.payloads import (
+    make_replay_pages,
+    make_initial_data,
+    make_player_response,
+    make_watch_html
+)
+
+REPLAY_PATH = "/youtubei/v1/live_chat/get_live_chat_replay"
+SYNTHETIC_VIDEO_ID = "stubvideo01"
+
+
+def response_key(continuation, player_offset_ms=None):
+    """录制文件名：continuation（和跳转位置）的摘要"""
+    raw = continuation if player_offset_ms is None else f"{continuation}@{player_offset_ms}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def request_key(body):
+    """从 get_live_chat_replay 请求体中计算 response_key"""
+    offset = body.get("currentPlayerState", {}).get("playerOffsetMs")
+    return response_key(body.get("continuation", ""), offset)
+
+
+class StubInnerTube:
+    """在后台线程中运行的桩服务器
+
+    Args:
+        directory: 录制目录（watch/*.html + replay/*.json），None 时使用合成回放
+        pages: 合成回放的页数
+        actions: 合成回放每页的消息数
+        latency: 每个请求的固定延迟（秒）
+        error_rate: 回放请求返回 HTTP 500 的概率
+        throttle_rate: 回放请求返回 HTTP 429 的概率
+        retry_after: 429 响应的 Retry-After 头（秒），None 时不发送
+        seed: 故障注入的随机种子
+    """
+
+    def __init__(self, directory=None, pages=20, actions=100, latency=0.0, error_rate=0.0,
+                 throttle_rate=0.0, retry_after=None, seed=0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.stats = {"watch": 0, "replay": 0, "throttled": 0, "server_errors": 0, "not_found": 0}
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._watch_pages = {}
+        self._responses = {}
+        self._synthetic_pages = None
+        if directory:
+            self._load_recorded(Path(directory))
+        else:
+            self._load_synthetic(pages, actions)
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    def _load_recorded(self, directory):
+        for path in (directory / "watch").glob("*.html"):
+            self._watch_pages[path.stem] = path.read_bytes()
+        for path in (directory / "replay").glob("*.json"):
+            self._responses[path.stem] = path.read_bytes()
+
+    def _load_synthetic(self, pages, actions):
+        step_ms = 300
+        length_seconds = pages * actions * step_ms // 1000 + 1
+        html = make_watch_html(
+            make_initial_data("page-0"),
+            make_player_response(SYNTHETIC_VIDEO_ID, length_seconds=length_seconds),
+        )
+        self._watch_pages[SYNTHETIC_VIDEO_ID] = html.encode("utf-8")
+        for k, page in enumerate(make_replay_pages(pages, actions, step_ms)):
+            self._responses[response_key(f"page-{k}")] = json.dumps(page, ensure_ascii=False).encode("utf-8")
+        self._synthetic_pages = (pages, actions * step_ms)
+
+    def lookup(self, body):
+        """按请求体查找要回放的响应，没有时返回 None"""
+        response = self._responses.get(request_key(body))
+        # 合成回放的 seek token：跳到包含该偏移的那一页
+        if response is None and self._synthetic_pages and body.get("continuation") == "seek-token":
+            pages, page_ms = self._synthetic_pages
+            offset = int(body.get("currentPlayerState", {}).get("playerOffsetMs", 0))
+            response = self._responses.get(response_key(f"page-{min(max(offset // page_ms, 0), pages - 1)}"))
+        return response
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def watch_url(self, video_id=None):
+        if video_id is None:
+            video_id = next(iter(self._watch_pages), SYNTHETIC_VIDEO_ID)
+        return f"{self.base_url}/watch?v={video_id}"
+
+    def _fault(self):
+        """按配置的概率决定本次回放请求的状态码"""
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 500
+        return 200
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 响应头和正文分两次写出，关闭 Nagle 以免与延迟 ACK 叠加出 ~40ms 的假延迟
+            disable_nagle_algorithm = True
+
+            def _send(self, status, body=b"", content_type="application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                video_id = parse_qs(urlparse(self.path).query).get("v", [""])[0]
+                html = stub._watch_pages.get(video_id)
+                if html is None:
+                    stub._count("not_found")
+                    self._send(404, b"not found", "text/plain")
+                    return
+                stub._count("watch")
+                self._send(200, html, "text/html; charset=utf-8")
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if urlparse(self.path).path != REPLAY_PATH:
+                    stub._count("not_found")
+                    self._send(404, b"{}")
+                    return
+                status = stub._fault()
+                if status == 429:
+                    stub._count("throttled")
+                    headers = {"Retry-After": str(stub.retry_after)} if stub.retry_after is not None else None
+                    self._send(429, b"{}", headers=headers)
+                    return
+                if status == 500:
+                    stub._count("server_errors")
+                    self._send(500, b"{}")
+                    return
+                response = stub.lookup(json.loads(body))
+                if response is None:
+                    stub._count("not_found")
+                    self._send(404, b"{}")
+                    return
+                stub._count("replay")
+                self._send(200, response)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 InnerTube 桩服务器")
+    parser.add_argument("--recorded", type=str, help="录制目录（由 benchmarks/recorder.py 生成）")
+    parser.add_argument("--pages", type=int, default=20, help="合成回放页数 (默认: 20)")
+    parser.add_argument("--actions", type=int, default=100, help="合成回放每页消息数 (默认: 100)")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的延迟秒数 (默认: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 HTTP 500 的概率 (默认: 0)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="返回 HTTP 429 的概率 (默认: 0)")
+    parser.add_argument("--retry-after", type=int, help="429 响应的 Retry-After 秒数")
+    parser.add_argument("--seed", type=int, default=0, help="故障注入随机种子 (默认: 0)")
+    parser.add_argument("--port", type=int, default=8000, help="监听端口 (默认: 8000)")
+    args = parser.parse_args()
+
+    stub = StubInnerTube(
+        args.recorded, args.pages, args.actions, args.latency, args.error_rate,
+        args.throttle_rate, args.retry_after, args.seed, port=args.port,
+    )
+    print(f"🧪 桩服务器: {stub.base_url}")
+    for video_id in stub._watch_pages:
+        print(f"   ytchat --url {stub.watch_url(video_id)} --api-base {stub.base_url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {stub.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
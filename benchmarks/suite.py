@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""热点函数基准套件
+
+对 parse_messages、extract_next_cont、find_continuation、extract_params、
+ms_to_timestamp、save_to_json 和 import_json_to_db 在不同规模下测速，
+结果写成 JSON，并可与保存的基线比较，吞吐下降超过阈值时标记为回退（退出码 1）。
+每个用例取 5 轮中最快一轮的耗时；默认只有 100k 及以上的规模参与回退判定。
+
+用法:
+    python benchmarks/suite.py                                   # 1k + 100k，与 baseline.json 比较（1k 只报告）
+    python benchmarks/suite.py --sizes 1k,100k,1m --output results.json
+    python benchmarks/suite.py --recorded DIR                    # 使用录制的回放响应
+    python benchmarks/suite.py --save-baseline                   # 把本次结果写为新的基线
+
+基线与机器相关：在新机器上先用 --save-baseline 生成基线再比较。
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import sqlite3
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+from itertools import cycle, islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_chat_downloader import codec, fetcher
+from youtube_chat_downloader.cli import save_to_json
+from youtube_chat_downloader.db_importer import init_database, import_json_to_db
+from benchmarks.payloads import make_replay_pages, make_initial_data, make_watch_html, load_recorded_pages
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+PAGE_ACTIONS = 100
+# 每轮至少运行的秒数和轮数：小规模时一轮内重复多次，取各轮中最快的一轮，
+# 以排除调度、频率调整等一次性干扰（与 timeit 的 repeat 相同）
+MIN_TIME = 0.2
+REPEATS = 5
+# 小于该规模的用例只报告不判定回退：单次只有几毫秒，机器上的抖动就可能超过阈值
+GATE_MIN_SIZE = 100000
+
+
+def parse_size(text):
+    """'1k' / '100k' / '1m' → 消息数"""
+    text = text.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def format_size(n):
+    if n >= 1000000 and n % 1000000 == 0:
+        return f"{n // 1000000}m"
+    if n >= 1000 and n % 1000 == 0:
+        return f"{n // 1000}k"
+    return str(n)
+
+
+def measure(func, work, repeats=REPEATS):
+    """测 repeats 轮，每轮连续执行至少 MIN_TIME 秒，按最快一轮的平均耗时返回 (每秒工作量, 单次耗时)
+    
+    计时期间关闭垃圾回收。
+    """
+    func()  # 预热
+    best = None
+    gc_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            runs = 0
+            start = time.perf_counter()
+            while True:
+                func()
+                runs += 1
+                elapsed = time.perf_counter() - start
+                if elapsed >= MIN_TIME:
+                    break
+            per_run = elapsed / runs
+            if best is None or per_run < best:
+                best = per_run
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return work / best, best
+
+
+class Inputs:
+    """按规模准备的输入：不同的分页循环复用，避免 1M 条消息时占用数 GB 内存"""
+
+    def __init__(self, size, source_pages):
+        self.size = size
+        self.pages = list(islice(cycle(source_pages), max(1, size // PAGE_ACTIONS)))
+        self.actions = [fetcher._page_actions(p) for p in self.pages]
+        self.messages = [m for a in self.actions for m in fetcher.parse_messages(a)[0]]
+        self.offsets = [m.offset_ms for m in self.messages]
+
+
+def run_cases(inputs, tmpdir):
+    """返回本规模下所有用例的结果列表"""
+    size = inputs.size
+    n_messages = len(inputs.messages)
+    results = []
+
+    def add(name, unit, value, seconds):
+        results.append({"name": name, "size": format_size(size), "unit": unit,
+                        "value": round(value, 2), "seconds": round(seconds, 6)})
+
+    def parse_all():
+        for a in inputs.actions:
+            fetcher.parse_messages(a)
+    add("parse_messages", "msgs/s", *measure(parse_all, n_messages))
+
+    def next_cont_all():
+        for p in inputs.pages:
+            fetcher.extract_next_cont(p)
+    add("extract_next_cont", "pages/s", *measure(next_cont_all, len(inputs.pages)))
+
+    initial = make_initial_data(related=40)
+    calls = max(1, size // PAGE_ACTIONS)
+
+    def find_cont_all():
+        for _ in range(calls):
+            fetcher.find_continuation(initial)
+    add("find_continuation", "calls/s", *measure(find_cont_all, calls))
+
+    # 观看页面大小与消息数无关；规模越大解析的页面越多
+    html = make_watch_html(make_initial_data(related=200), padding=500000)
+    html_mb = len(html.encode("utf-8")) / 2**20
+    pages = max(1, size // 10000)
+
+    def extract_params_all():
+        for _ in range(pages):
+            fetcher.extract_params(html)
+    add("extract_params", "MB/s", *measure(extract_params_all, html_mb * pages))
+
+    def timestamps():
+        for offset in inputs.offsets:
+            fetcher.ms_to_timestamp(offset)
+    add("ms_to_timestamp", "calls/s", *measure(timestamps, n_messages))
+
+    chat_stats = fetcher.ChatStatistics()
+    chat_stats.add(inputs.messages)
+    data = {
+        "video_info": {"id": "benchmark01", "title": "基准", "duration": 3600, "upload_date": "20240101",
+                       "url": "https://www.youtube.com/watch?v=benchmark01"},
+        "messages": inputs.messages,
+        "statistics": chat_stats.as_dict(),
+    }
+    out_dir = os.path.join(tmpdir, f"save-{size}")
+    saved = [None]
+
+    def save():
+        saved[0] = save_to_json(data, out_dir)
+    save()
+    file_mb = os.path.getsize(saved[0]) / 2**20
+    add("save_to_json", "MB/s", *measure(save, file_mb))
+
+    db_path = os.path.join(tmpdir, f"import-{size}.db")
+    init_database(db_path).close()
+
+    def import_file():
+        conn = sqlite3.connect(db_path)
+        try:
+            import_json_to_db(saved[0], conn, incremental=False, verbose=False)
+        finally:
+            conn.close()
+    add("import_json_to_db", "msgs/s", *measure(import_file, n_messages))
+
+    return results
+
+
+def compare(results, baseline, threshold, gate_min_size=GATE_MIN_SIZE):
+    """与基线比较，返回回退列表 [(结果, 基线值, 变化比例)]；小于 gate_min_size 的规模不判定"""
+    by_key = {(r["name"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        base = by_key.get((r["name"], r["size"]))
+        if not base or not base["value"]:
+            r["change"] = None
+            continue
+        change = r["value"] / base["value"] - 1
+        r["change"] = round(change, 4)
+        if change < -threshold and parse_size(r["size"]) >= gate_min_size:
+            regressions.append((r, base["value"], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点函数基准套件")
+    parser.add_argument("--sizes", type=str, default="1k,100k", help="消息规模，逗号分隔 (默认: 1k,100k)")
+    parser.add_argument("--recorded", type=str, help="录制的回放响应目录（*.json）")
+    parser.add_argument("--output", type=str, help="结果 JSON 输出路径")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE, help="基线文件 (默认: benchmarks/baseline.json)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定回退的吞吐下降比例 (默认: 0.2)")
+    parser.add_argument("--gate-min-size", type=str, default=format_size(GATE_MIN_SIZE),
+                        help="参与回退判定的最小规模，更小的规模只报告 (默认: 100k)")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写入基线文件")
+    args = parser.parse_args()
+
+    if args.recorded:
+        source_pages = load_recorded_pages(args.recorded)
+        if not source_pages:
+            print(f"❌ 没有可用的响应数据: {args.recorded}")
+            return 1
+    else:
+        source_pages = make_replay_pages(100, PAGE_ACTIONS)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in map(parse_size, args.sizes.split(",")):
+            print(f"⏱️ 规模 {format_size(size)} ...")
+            results.extend(run_cases(Inputs(size, source_pages), tmpdir))
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "json_backend": codec.BACKEND,
+            "source": args.recorded or "synthetic",
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold, parse_size(args.gate_min_size))
+
+    print("=" * 72)
+    print(f"{'用例':20s} {'规模':>6s} {'吞吐':>16s} {'单位':8s} {'相对基线':>8s}")
+    print("=" * 72)
+    for r in results:
+        change = r.get("change")
+        change_text = f"{change:+.1%}" if change is not None else "-"
+        if change is not None and parse_size(r["size"]) < parse_size(args.gate_min_size):
+            change_text += " (仅报告)"
+        print(f"{r['name']:20s} {r['size']:>6s} {r['value']:16,.1f} {r['unit']:8s} {change_text:>8s}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📁 结果: {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📌 已更新基线: {args.baseline}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} 项低于基线超过 {args.threshold:.0%}:")
+        for r, base, change in regressions:
+            print(f"   {r['name']} ({r['size']}): {r['value']:,.1f} vs {base:,.1f} {r['unit']} ({change:+.1%})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
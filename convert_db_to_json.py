@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
-"""将旧版 SQLite 数据库转换为新的 JSON 格式"""
+"""将旧版 SQLite 数据库转换为新的 JSON / JSONL 格式"""
 
 import sys
-import json
 import sqlite3
 import re
 from pathlib import Path
+from youtube_chat_downloader.jsonl import write_chat_file
 
 
 def ms_to_timestamp(ms):
@@ -22,7 +22,10 @@ def ms_to_timestamp(ms):
 
 
 def convert_db_to_json(db_path, output_path=None):
-    """转换 SQLite 数据库到 JSON 格式"""
+    """转换 SQLite 数据库到 JSON 格式
+
+    output_path 以 .jsonl / .jsonl.gz / .jsonl.zst 结尾时输出 JSON Lines 格式。
+    """
     
     # 从文件名提取 video_id
     match = re.search(r'chatlog_(.+)\.db', str(db_path))
@@ -86,9 +89,8 @@ def convert_db_to_json(db_path, output_path=None):
     if output_path is None:
         output_path = Path(db_path).stem + ".json"
     
-    # 保存 JSON
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # 按扩展名保存为 JSON 或 JSONL
+    write_chat_file(output_path, data)
     
     print(f"✅ 转换完成:")
     print(f"   输入: {db_path}")
@@ -101,10 +103,11 @@ def convert_db_to_json(db_path, output_path=None):
 
 def main():
     if len(sys.argv) < 2:
-        print("使用方法: python convert_db_to_json.py <database.db> [output.json]")
+        print("使用方法: python convert_db_to_json.py <database.db> [output.json|.jsonl|.jsonl.gz|.jsonl.zst]")
         print("\n示例:")
         print("  python convert_db_to_json.py chatlog_abc123.db")
         print("  python convert_db_to_json.py chatlog_abc123.db output.json")
+        print("  python convert_db_to_json.py chatlog_abc123.db output.jsonl.gz")
         sys.exit(1)
     
     db_path = sys.argv[1]
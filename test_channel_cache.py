@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""测试频道直播列表缓存与增量刷新（离线，替换 YoutubeDL）"""
+
+import tempfile
+from youtube_chat_downloader import fetcher
+from youtube_chat_downloader.channel_cache import channel_cache_path, load_channel_cache
+
+
+class FakeYoutubeDL:
+    """按顺序惰性产出频道条目的 YoutubeDL 替身，记录被消费的条目数"""
+
+    listing = []
+    consumed = 0
+
+    def __init__(self, opts):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def extract_info(self, url, download=False, process=True, **kwargs):
+        def entries():
+            for entry in FakeYoutubeDL.listing:
+                FakeYoutubeDL.consumed += 1
+                yield dict(entry)
+        return {"_type": "playlist", "entries": entries()}
+
+
+def make_entry(video_id, live_status="was_live"):
+    return {"id": video_id, "title": f"直播 {video_id}", "duration": 3600, "live_status": live_status}
+
+
+def list_channel(cache_path, full_rescan=False):
+    FakeYoutubeDL.consumed = 0
+    urls = fetcher.get_livestream_urls(
+        "https://www.youtube.com/@test/streams", cache_path=cache_path, full_rescan=full_rescan
+    )
+    return [u.rsplit("=", 1)[1] for u in urls], FakeYoutubeDL.consumed
+
+
+def test_incremental_refresh():
+    """测试遇到已知视频即停止翻页"""
+    print("=" * 60)
+    print("测试: 频道列表增量刷新")
+    print("=" * 60)
+
+    original = fetcher.YoutubeDL
+    fetcher.YoutubeDL = FakeYoutubeDL
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_path = channel_cache_path("https://www.youtube.com/@test/streams", tmpdir)
+
+            FakeYoutubeDL.listing = [
+                make_entry("up1", "is_upcoming"),
+                make_entry("v3"), make_entry("v2"), make_entry("v1"),
+            ]
+            ids, consumed = list_channel(cache_path)
+            assert ids == ["v3", "v2", "v1"], ids
+            assert consumed == 4
+            assert len(load_channel_cache(cache_path)["entries"]) == 4
+
+            # 新增 v4，up1 变为 was_live：应在 v3 处停止
+            FakeYoutubeDL.listing = [
+                make_entry("v4"), make_entry("up1"),
+                make_entry("v3"), make_entry("v2"), make_entry("v1"),
+            ]
+            ids, consumed = list_channel(cache_path)
+            assert ids == ["v4", "up1", "v3", "v2", "v1"], ids
+            assert consumed == 3, f"应在第一个已知视频处停止，实际消费: {consumed}"
+
+            # 完整重扫：删除的视频不再出现
+            FakeYoutubeDL.listing = [make_entry("v4"), make_entry("v3")]
+            ids, consumed = list_channel(cache_path, full_rescan=True)
+            assert ids == ["v4", "v3"], ids
+            assert consumed == 2
+    finally:
+        fetcher.YoutubeDL = original
+
+    print("✅ 测试通过\n")
+
+
+def main():
+    """运行所有测试"""
+    test_incremental_refresh()
+    print("🎉 所有测试通过！")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""测试 JSON 编解码层"""
+
+import json
+from youtube_chat_downloader import codec
+
+
+def test_backends_roundtrip():
+    """测试每个可用后端都能直接处理 bytes 并得到相同结果"""
+    print("=" * 60)
+    print(f"测试 1: 后端往返（可用: {', '.join(codec.BACKENDS)}，当前: {codec.BACKEND}）")
+    print("=" * 60)
+
+    obj = {"continuation": "page-1", "作者": "用户 \"1\" 🎉", "offset": -4500, "ok": True, "x": None,
+           "runs": [{"text": "a\nb"}, {"emoji": {"emojiId": "😂"}}]}
+    text = json.dumps(obj, ensure_ascii=False)
+    try:
+        for name in codec.BACKENDS:
+            codec.use_backend(name)
+            assert codec.loads(text.encode("utf-8")) == obj, name
+            assert codec.loads(text) == obj, name
+            encoded = codec.dumps(obj)
+            assert isinstance(encoded, bytes), name
+            assert json.loads(encoded) == obj, name
+    finally:
+        codec.use_backend()
+
+    try:
+        codec.use_backend("no-such-backend")
+        assert False, "未知后端应抛出 ValueError"
+    except ValueError:
+        pass
+
+    print("✅ 测试 1 通过\n")
+
+
+def test_raw_decode():
+    """测试从页面中截取恰好一个 JSON 值"""
+    print("=" * 60)
+    print("测试 2: raw_decode")
+    print("=" * 60)
+
+    value = {"a": "含有 ;</script> 和 ;var  的字符串", "b": [1, 2]}
+    prefix = "var ytInitialData = "
+    html = prefix + json.dumps(value, ensure_ascii=False) + ";</script><script>var x = {};</script>"
+    try:
+        for name in codec.BACKENDS:
+            codec.use_backend(name)
+            decoded, end = codec.raw_decode(html, len(prefix))
+            assert decoded == value, name
+            assert html[end] == ";", name
+            # 没有结束标记时回退到 JSONDecoder.raw_decode
+            decoded, end = codec.raw_decode(prefix + '{"k": 1} trailing', len(prefix))
+            assert decoded == {"k": 1} and end == len(prefix) + 8, name
+    finally:
+        codec.use_backend()
+
+    print("✅ 测试 2 通过\n")
+
+
+def main():
+    """运行所有测试"""
+    test_backends_roundtrip()
+    test_raw_decode()
+    print("🎉 所有测试通过！")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""测试 Parquet / Arrow 列式导出"""
+
+import os
+import tempfile
+from youtube_chat_downloader import columnar
+from youtube_chat_downloader.columnar import (
+    ColumnarChatWriter,
+    export_database,
+    export_chat_directory,
+    partition_dir
+)
+from youtube_chat_downloader.db_importer import import_directory_to_db
+from test_db_import import create_test_json
+
+
+def test_partition_dir():
+    """测试分区目录名"""
+    print("=" * 60)
+    print("测试 1: 分区目录")
+    print("=" * 60)
+
+    assert partition_dir({"id": "abc", "upload_date": "20240115"}, "video") == "video_id=abc"
+    assert partition_dir({"id": "abc", "upload_date": "20240115"}, "month") == "upload_month=2024-01"
+    assert partition_dir({"id": "abc", "upload_date": ""}, "month") == "upload_month=unknown"
+
+    if columnar.pyarrow is None:
+        try:
+            ColumnarChatWriter(tempfile.gettempdir(), {"id": "abc"})
+            assert False, "未安装 pyarrow 时应抛出 RuntimeError"
+        except RuntimeError:
+            pass
+
+    print("✅ 测试 1 通过\n")
+
+
+def test_export_roundtrip():
+    """测试从数据库和文件导出，按分区读取并下推过滤条件"""
+    print("=" * 60)
+    print("测试 2: 导出与读取")
+    print("=" * 60)
+
+    if columnar.pyarrow is None:
+        print("⏭️ 未安装 pyarrow，跳过")
+        return
+
+    import pyarrow
+    import pyarrow.dataset as ds
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_dir = os.path.join(tmpdir, "jsons")
+        db_path = os.path.join(tmpdir, "test.db")
+        for i, save_type in enumerate(("json", "jsonl", "jsonl.gz")):
+            create_test_json(json_dir, f"test{i:03d}", 30, save_type)
+        import_directory_to_db(json_dir, db_path, incremental=True, verbose=False)
+
+        for source in ("db", "files"):
+            for fmt in ("parquet", "arrow"):
+                for partition_by in ("video", "month"):
+                    out_dir = os.path.join(tmpdir, f"{source}-{fmt}-{partition_by}")
+                    if source == "db":
+                        count, rows = export_database(db_path, out_dir, fmt, partition_by,
+                                                      batch_rows=7, verbose=False)
+                    else:
+                        count, rows = export_chat_directory(json_dir, out_dir, fmt, partition_by,
+                                                            verbose=False)
+                    assert (count, rows) == (3, 90), (source, fmt, partition_by, count, rows)
+
+                    dataset = ds.dataset(out_dir, format="ipc" if fmt == "arrow" else "parquet",
+                                         partitioning="hive")
+                    schema = dataset.schema
+                    assert schema.field("offset_ms").type == pyarrow.int64()
+                    assert pyarrow.types.is_dictionary(schema.field("author_id").type)
+                    assert pyarrow.types.is_dictionary(schema.field("author").type)
+
+                    table = dataset.to_table(
+                        columns=["video_id", "offset_ms", "author_id", "message"],
+                        filter=(ds.field("video_id") == "test001") & (ds.field("offset_ms") >= 25 * 60000),
+                    )
+                    assert table.num_rows == 5, (source, fmt, partition_by, table.num_rows)
+                    assert set(table.column("video_id").to_pylist()) == {"test001"}
+                    assert table.column("message").to_pylist()[0] == "测试消息 25"
+                    assert sorted(os.listdir(out_dir)) == (
+                        ["video_id=test000", "video_id=test001", "video_id=test002"]
+                        if partition_by == "video" else ["upload_month=2024-01"]
+                    )
+
+        print("✅ 数据库和文件 × parquet/arrow × video/month 均可按分区和 offset_ms 过滤读取")
+
+    print("✅ 测试 2 通过\n")
+
+
+def main():
+    """运行所有测试"""
+    test_partition_dir()
+    test_export_roundtrip()
+    print("🎉 所有测试通过！")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -3,6 +3,7 @@
 
 import os
 import json
+import sqlite3
 import tempfile
 from pathlib import Path
 from youtube_chat_downloader.db_importer import (
@@ -10,12 +11,17 @@ from youtube_chat_downloader.db_importer import (
     import_directory_to_db,
     init_database,
     get_database_stats,
+    migrate_database,
+    bulk_load,
+    decode_chat_file,
+    write_video,
     print_database_stats
 )
+from youtube_chat_downloader.jsonl import write_chat_file
 
 
-def create_test_json(output_dir, video_id="test123", message_count=10):
-    """创建测试JSON文件"""
+def create_test_json(output_dir, video_id="test123", message_count=10, save_type="json"):
+    """创建测试JSON文件（save_type 为 jsonl / jsonl.gz 时创建 JSONL 文件）"""
     os.makedirs(output_dir, exist_ok=True)
     
     test_data = {
@@ -46,9 +52,11 @@ def create_test_json(output_dir, video_id="test123", message_count=10):
         }
     }
     
-    filename = f"20240115_{video_id}.json"
+    filename = f"20240115_{video_id}.{save_type}"
     filepath = os.path.join(output_dir, filename)
     
+    if save_type != "json":
+        return write_chat_file(filepath, test_data)
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(test_data, f, ensure_ascii=False, indent=2)
     
@@ -156,6 +164,298 @@ def test_incremental_import():
     print("✅ 测试 3 通过\n")
 
 
+def test_jsonl_import():
+    """测试导入 JSONL / JSONL.gz 文件，结果与 JSON 文件一致"""
+    print("=" * 60)
+    print("测试 4: 导入 JSONL 格式")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_dir = os.path.join(tmpdir, "jsons")
+        db_path = os.path.join(tmpdir, "test.db")
+        
+        for i, save_type in enumerate(("json", "jsonl", "jsonl.gz")):
+            create_test_json(json_dir, f"test{i:03d}", 20, save_type)
+        # 缺少 trailer 的文件（下载中断）应导入失败而不是导入一半
+        with open(os.path.join(json_dir, "20240115_broken.jsonl"), 'w', encoding='utf-8') as f:
+            f.write('{"type":"header","format":"ytchat-jsonl","version":1,"video_info":{"id":"broken"}}\n')
+        
+        success, skipped, failed, total = import_directory_to_db(
+            json_dir,
+            db_path,
+            incremental=True,
+            verbose=False
+        )
+        assert (success, skipped, failed, total) == (3, 0, 1, 60), (success, skipped, failed, total)
+        
+        conn = init_database(db_path)
+        rows = conn.execute('''
+            SELECT video_id, time_text, author, author_id, message, offset_ms
+            FROM chat_messages ORDER BY video_id, offset_ms
+        ''').fetchall()
+        conn.close()
+        by_video = {}
+        for row in rows:
+            by_video.setdefault(row[0], []).append(row[1:])
+        assert sorted(by_video) == ["test000", "test001", "test002"]
+        assert by_video["test000"] == by_video["test001"] == by_video["test002"]
+        
+        print(f"✅ 导入 {success} 个文件，{total} 条消息，不完整文件被拒绝")
+    
+    print("✅ 测试 4 通过\n")
+
+
+def test_bulk_import():
+    """测试批量导入模式：结果与普通导入一致，索引重建、设置恢复"""
+    print("=" * 60)
+    print("测试 5: 批量导入模式")
+    print("=" * 60)
+    
+    query = '''
+        SELECT video_id, time_text, author, author_id, message, offset_ms
+        FROM chat_messages ORDER BY video_id, offset_ms
+    '''
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_dir = os.path.join(tmpdir, "jsons")
+        for i in range(4):
+            create_test_json(json_dir, f"test{i:03d}", 25 + i)
+        
+        results = {}
+        for bulk in (False, True):
+            db_path = os.path.join(tmpdir, f"bulk-{bulk}.db")
+            assert import_directory_to_db(json_dir, db_path, incremental=True, verbose=True, bulk=bulk) \
+                == (4, 0, 0, 106)
+            conn = init_database(db_path)
+            results[bulk] = conn.execute(query).fetchall()
+            indexes = {row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'messages'"
+            )}
+            assert {"idx_messages_video", "idx_messages_author"} <= indexes, indexes
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == "delete"
+            conn.close()
+        assert results[True] == results[False]
+        
+        # 已有数据时重新导入（非增量）：保留 idx_messages_video 用于删除旧消息
+        create_test_json(json_dir, "test000", 5)
+        create_test_json(json_dir, "test100", 7)
+        db_path = os.path.join(tmpdir, "bulk-True.db")
+        assert import_directory_to_db(json_dir, db_path, incremental=False, verbose=False, bulk=True) \
+            == (5, 0, 0, 5 + 26 + 27 + 28 + 7)
+        conn = init_database(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM chat_messages").fetchone()[0] == 93
+        conn.close()
+        
+        # 删除旧消息不能扫描整张表：新视频不执行删除，已有视频时删除走 idx_messages_video
+        db_path = os.path.join(tmpdir, "bulk-plan.db")
+        conn = init_database(db_path)
+        statements = []
+        conn.set_trace_callback(statements.append)
+        with bulk_load(conn, verbose=False):
+            for i in range(4):
+                write_video(conn, *decode_chat_file(create_test_json(json_dir, f"test{i:03d}", 25)),
+                            incremental=False, verbose=False)
+        assert not [sql for sql in statements if "DELETE" in sql], statements
+        with bulk_load(conn, verbose=False):
+            plan = " ".join(row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN DELETE FROM messages WHERE video_key = ?", (1,)
+            ))
+            assert "idx_messages_video" in plan, plan
+            statements.clear()
+            write_video(conn, *decode_chat_file(create_test_json(json_dir, "test000", 5)),
+                        incremental=False, verbose=False)
+            assert [sql for sql in statements if "DELETE" in sql], statements
+        conn.set_trace_callback(None)
+        assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 80
+        conn.close()
+        
+        print("✅ 批量导入结果与普通导入一致")
+    
+    print("✅ 测试 5 通过\n")
+
+
+def test_parallel_decode():
+    """测试多进程解码：结果和顺序与单进程一致，失败的文件被隔离"""
+    print("=" * 60)
+    print("测试 6: 多进程解码")
+    print("=" * 60)
+    
+    query = '''
+        SELECT id, video_id, time_text, author, author_id, message, offset_ms
+        FROM chat_messages ORDER BY id
+    '''
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_dir = os.path.join(tmpdir, "jsons")
+        for i in range(9):
+            create_test_json(json_dir, f"test{i:03d}", 10 + i, ("json", "jsonl", "jsonl.gz")[i % 3])
+        with open(os.path.join(json_dir, "20240115_test004x.json"), 'w', encoding='utf-8') as f:
+            f.write("{不是 JSON")
+        
+        results = {}
+        for workers in (1, 3):
+            db_path = os.path.join(tmpdir, f"workers-{workers}.db")
+            summary = import_directory_to_db(json_dir, db_path, incremental=True, verbose=False,
+                                             workers=workers)
+            assert summary == (9, 0, 1, sum(10 + i for i in range(9))), summary
+            conn = init_database(db_path)
+            results[workers] = conn.execute(query).fetchall()
+            conn.close()
+        assert results[1] == results[3]
+        
+        print(f"✅ 3 个进程解码，{len(results[3])} 行，插入顺序与单进程一致")
+    
+    print("✅ 测试 6 通过\n")
+
+
+def test_import_manifest():
+    """测试导入清单：未变化的文件不读取，变化的文件原子地重新导入"""
+    print("=" * 60)
+    print("测试 7: 导入清单")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_dir = os.path.join(tmpdir, "jsons")
+        db_path = os.path.join(tmpdir, "test.db")
+        paths = [create_test_json(json_dir, f"test{i:03d}", 10 + i, ("json", "jsonl.gz", "jsonl")[i])
+                 for i in range(3)]
+        assert import_directory_to_db(json_dir, db_path, incremental=True, verbose=False) == (3, 0, 0, 33)
+        
+        conn = init_database(db_path)
+        manifest = dict(conn.execute('SELECT video_id, message_count FROM import_manifest').fetchall())
+        conn.close()
+        assert manifest == {"test000": 10, "test001": 11, "test002": 12}, manifest
+        
+        # 大小和修改时间不变的文件不会被读取：把内容换成等长的垃圾也照样跳过
+        st = os.stat(paths[0])
+        with open(paths[0], 'wb') as f:
+            f.write(b"x" * st.st_size)
+        os.utime(paths[0], ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert import_directory_to_db(json_dir, db_path, incremental=True, verbose=True) == (0, 3, 0, 0)
+        
+        # 只改修改时间：按内容哈希判断未变化
+        create_test_json(json_dir, "test000", 10)
+        os.utime(paths[1], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert import_directory_to_db(json_dir, db_path, incremental=True, verbose=False) == (0, 3, 0, 0)
+        
+        # 内容变了：替换旧消息而不是追加或跳过
+        create_test_json(json_dir, "test002", 4, "jsonl")
+        assert import_directory_to_db(json_dir, db_path, incremental=True, verbose=True) == (1, 2, 0, 4)
+        conn = init_database(db_path)
+        counts = dict(conn.execute(
+            'SELECT video_id, COUNT(*) FROM chat_messages GROUP BY video_id'
+        ).fetchall())
+        assert counts == {"test000": 10, "test001": 11, "test002": 4}, counts
+        assert conn.execute(
+            "SELECT message_count FROM import_manifest WHERE video_id = 'test002'"
+        ).fetchone()[0] == 4
+        conn.close()
+        
+        # 重新导入失败时整个文件回滚，清单不变，下次仍会重试
+        with open(paths[2], 'w', encoding='utf-8') as f:
+            f.write('{"type":"header","format":"ytchat-jsonl","version":1,"video_info":{"id":"test002"}}\n')
+        assert import_directory_to_db(json_dir, db_path, incremental=True, verbose=False) == (0, 2, 1, 0)
+        assert import_directory_to_db(json_dir, db_path, incremental=True, verbose=False) == (0, 2, 1, 0)
+        conn = init_database(db_path)
+        assert conn.execute(
+            "SELECT COUNT(*) FROM chat_messages WHERE video_id = 'test002'"
+        ).fetchone()[0] == 4
+        conn.close()
+        
+        print("✅ 未变化的文件按 stat() 跳过，变化的文件整体替换")
+    
+    print("✅ 测试 7 通过\n")
+
+
+# v1 结构（转换前的旧版数据库）
+V1_SCHEMA = '''
+    CREATE TABLE videos (
+        video_id TEXT PRIMARY KEY, title TEXT, duration INTEGER, upload_date TEXT, url TEXT,
+        total_messages INTEGER, unique_authors INTEGER, time_range_min TEXT, time_range_max TEXT,
+        imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE chat_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, video_id TEXT, time_text TEXT, author TEXT,
+        author_id TEXT, message TEXT, offset_ms INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (video_id) REFERENCES videos(video_id)
+    );
+    CREATE INDEX idx_video_id ON chat_messages(video_id);
+    CREATE INDEX idx_offset ON chat_messages(offset_ms);
+    CREATE INDEX idx_author_id ON chat_messages(author_id);
+    CREATE INDEX idx_video_upload_date ON videos(upload_date);
+'''
+
+
+def test_migrate():
+    """测试 v1 → v2 转换：兼容视图的内容与转换前的 chat_messages 表一致"""
+    print("=" * 60)
+    print("测试 8: 数据库结构转换")
+    print("=" * 60)
+    
+    query = '''
+        SELECT id, video_id, time_text, author, author_id, message, offset_ms
+        FROM chat_messages ORDER BY id
+    '''
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_dir = os.path.join(tmpdir, "jsons")
+        db_path = os.path.join(tmpdir, "v1.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript(V1_SCHEMA)
+        for i in range(3):
+            conn.execute('''
+                INSERT INTO videos (video_id, title, upload_date, total_messages)
+                VALUES (?, ?, '20240115', 200)
+            ''', (f"test{i:03d}", f"测试视频 {i}"))
+            conn.executemany('''
+                INSERT INTO chat_messages (video_id, time_text, author, author_id, message, offset_ms)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(f"test{i:03d}", f"{j // 60}:{j % 60:02d}", f"用户{j % 7}", f"UC{j % 7}", f"消息 {j}",
+                   j * 1000 + 999) for j in range(200)])
+        # 直播前和没有偏移的实时消息的 time_text 不能由 offset_ms 算出，需要单独保存
+        conn.executemany('''
+            INSERT INTO chat_messages (video_id, time_text, author, author_id, message, offset_ms)
+            VALUES ('test000', ?, '用户1', 'UC1', ?, ?)
+        ''', [("-0:05", "直播前", -5000), ("1:02:03", "很久以后", 3723000), ("下午 8:15", "实时", 0)])
+        # 同一频道改名后算作另一个作者
+        conn.execute('''
+            INSERT INTO chat_messages (video_id, time_text, author, author_id, message, offset_ms)
+            VALUES ('test001', '0:01', '改名后', 'UC1', '新名字', 1000)
+        ''')
+        conn.commit()
+        before = conn.execute(query).fetchall()
+        conn.close()
+        
+        # 未转换的数据库拒绝写入
+        try:
+            init_database(db_path)
+            assert False, "v1 数据库应抛出 RuntimeError"
+        except RuntimeError:
+            pass
+        create_test_json(json_dir, "test100", 10)
+        assert import_directory_to_db(json_dir, db_path, incremental=True, verbose=False) == (0, 0, 0, 0)
+        
+        size_before, size_after = migrate_database(db_path)
+        assert size_after < size_before, (size_before, size_after)
+        assert migrate_database(db_path) == (size_after, size_after)
+        
+        conn = init_database(db_path)
+        assert conn.execute(query).fetchall() == before
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == 2
+        assert conn.execute('SELECT COUNT(*) FROM authors').fetchone()[0] == 8
+        assert conn.execute('SELECT COUNT(*) FROM messages WHERE time_text IS NOT NULL').fetchone()[0] == 2
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert not {"videos_v1", "chat_messages_v1"} & tables, tables
+        conn.close()
+        
+        # 转换后可以继续导入
+        assert import_directory_to_db(json_dir, db_path, incremental=True, verbose=False) == (1, 0, 0, 10)
+        stats = get_database_stats(db_path)
+        assert (stats['schema_version'], stats['video_count'], stats['message_count']) == (2, 4, 614)
+        
+        print(f"✅ 转换后内容一致，数据库 {size_before} → {size_after} 字节")
+    
+    print("✅ 测试 8 通过\n")
+
+
 def main():
     """运行所有测试"""
     print("\n🧪 数据库导入功能测试\n")
@@ -164,6 +464,11 @@ def main():
         test_single_import()
         test_directory_import()
         test_incremental_import()
+        test_jsonl_import()
+        test_bulk_import()
+        test_parallel_decode()
+        test_import_manifest()
+        test_migrate()
         
         print("=" * 60)
         print("🎉 所有测试通过！")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""测试多视频并发下载调度"""
+
+import time
+import _thread
+import threading
+from youtube_chat_downloader.engine import run_downloads, summarize_results
+
+
+def test_concurrent_downloads():
+    """测试并发执行与单个视频失败隔离"""
+    print("=" * 60)
+    print("测试 1: 并发下载与失败隔离")
+    print("=" * 60)
+
+    urls = [f"https://www.youtube.com/watch?v=vid{i}" for i in range(8)]
+    active = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def worker(idx, url):
+        with lock:
+            active.append(url)
+            peak[0] = max(peak[0], len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(url)
+        if idx == 3:
+            raise RuntimeError("模拟网络错误")
+        if idx == 5:
+            return {"url": url, "status": "skipped"}
+        return {"url": url, "status": "success", "total_messages": 10}
+
+    results = run_downloads(urls, worker, jobs=4)
+    summary = summarize_results(results)
+
+    assert [r["url"] for r in results] == urls, "结果应保持输入顺序"
+    assert 1 < peak[0] <= 4, f"并发数应在 (1, 4] 之间，实际: {peak[0]}"
+    assert summary["successful"] == 6, f"应该成功6个，实际: {summary['successful']}"
+    assert summary["skipped"] == 1, f"应该跳过1个，实际: {summary['skipped']}"
+    assert summary["failed"] == 1, f"应该失败1个，实际: {summary['failed']}"
+    assert summary["total_messages"] == 60
+    assert summary["failures"][0][0] == urls[2]
+
+    print("✅ 测试 1 通过\n")
+
+
+def test_interrupt_waits_for_writers():
+    """测试多线程运行被 Ctrl-C 中断时，进行中的写入器在返回前关闭并保存检查点"""
+    print("=" * 60)
+    print("测试 2: 中断并发下载")
+    print("=" * 60)
+
+    urls = [f"https://www.youtube.com/watch?v=vid{i}" for i in range(6)]
+    cancel = threading.Event()
+    first_done = threading.Event()
+    started = []
+    checkpointed = []
+    lock = threading.Lock()
+
+    class FakeWriter:
+        def __init__(self, url):
+            self.url = url
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            if exc_type is KeyboardInterrupt:
+                time.sleep(0.05)  # 模拟保存检查点耗时
+                with lock:
+                    checkpointed.append(self.url)
+
+    def worker(idx, url):
+        with lock:
+            started.append(url)
+        if idx == 1:
+            first_done.set()
+            return {"url": url, "status": "success", "total_messages": 1}
+        with FakeWriter(url):
+            for page in range(200):
+                time.sleep(0.01)
+                if idx == 2 and page == 5:
+                    first_done.wait()
+                    _thread.interrupt_main()  # 模拟主线程收到 Ctrl-C
+                if cancel.is_set():
+                    raise KeyboardInterrupt
+        return {"url": url, "status": "success", "total_messages": 200}
+
+    results = run_downloads(urls, worker, jobs=3, cancel=cancel)
+
+    assert cancel.is_set()
+    assert results == [{"url": urls[0], "status": "success", "total_messages": 1}], results
+    # 中断时在途的三个视频都已保存检查点，之后不再开始新的视频
+    assert sorted(checkpointed) == urls[1:4], checkpointed
+    assert sorted(started) == urls[:4], started
+    alive = [t.name for t in threading.enumerate() if t.name.startswith("ytchat-worker")]
+    assert not alive, f"worker 线程应已结束: {alive}"
+
+    print("✅ 测试 2 通过\n")
+
+
+def main():
+    """运行所有测试"""
+    test_concurrent_downloads()
+    test_interrupt_waits_for_writers()
+    print("🎉 所有测试通过！")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
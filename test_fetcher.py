@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""测试聊天获取核心逻辑（离线，使用合成响应）"""
+
+import sys
+import os
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from youtube_chat_downloader import fetcher
+from youtube_chat_downloader.session import ChatSession
+from benchmarks import legacy
+from benchmarks.payloads import (
+    make_chat_action,
+    make_replay_page,
+    make_replay_pages,
+    make_initial_data,
+    make_player_response,
+    make_watch_html
+)
+
+
+def serve_pages(pages):
+    """启动本地 HTTP 服务器，按路径返回固定内容；返回 (server, 请求计数)"""
+    hits = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits[self.path] = hits.get(self.path, 0) + 1
+            body = pages[self.path].encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, hits
+
+
+def test_continuation_lookup():
+    """测试 continuation 直接路径查找与回退"""
+    print("=" * 60)
+    print("测试: continuation 查找")
+    print("=" * 60)
+
+    stats = fetcher.continuation_lookup_stats
+    fast, fallback = stats["fast_path"], stats["fallback"]
+
+    page = make_replay_page(0, 10, continuation="next-token", seek="seek-token")
+    assert fetcher.extract_next_cont(page) == "next-token"
+
+    # 最后一页只有 playerSeek token，不应被当成下一页
+    last = make_replay_page(0, 10, continuation=None, seek="seek-token")
+    assert fetcher.extract_next_cont(last) is None
+
+    assert fetcher.find_continuation(make_initial_data("init-token")) == "init-token"
+    assert stats["fast_path"] == fast + 3
+    assert stats["fallback"] == fallback
+
+    # 结构未知时回退到全树遍历
+    odd = {"something": [{"nested": {"continuation": "walked"}}]}
+    assert fetcher.extract_next_cont(odd) == "walked"
+    assert fetcher.find_continuation(odd) == "walked"
+    assert stats["fallback"] == fallback + 2
+
+    print("✅ 测试通过\n")
+
+
+def test_extract_params():
+    """测试 ytInitialData 的锚定解码与参数缓存"""
+    print("=" * 60)
+    print("测试: extract_params")
+    print("=" * 60)
+
+    initial = make_initial_data("init-token")
+    # 旧的非贪婪正则会在字符串内的 ";\n" 处截断
+    initial["engagementPanels"] = [{"text": "第一行};\n第二行"}]
+    html = make_watch_html(initial, api_key="AIzaKey", version="2.20240101.01.00")
+
+    api_key, version, yid = fetcher.extract_params(html)
+    assert api_key == "AIzaKey"
+    assert version == "2.20240101.01.00"
+    assert yid == initial
+
+    cache = {}
+    fetcher.extract_params(html, cache)
+    assert cache == {"api_key": "AIzaKey", "version": "2.20240101.01.00"}
+    # 缓存命中后即使页面里没有 ytcfg 也能得到 key/version
+    bare = html.replace("INNERTUBE_API_KEY", "X").replace("INNERTUBE_CONTEXT_CLIENT_VERSION", "Y")
+    assert fetcher.extract_params(bare, cache) == ("AIzaKey", "2.20240101.01.00", initial)
+
+    assert fetcher.extract_params("<html></html>") == (None, fetcher.DEFAULT_CLIENT_VERSION, None)
+
+    print("✅ 测试通过\n")
+
+
+def test_watch_page_metadata():
+    """测试从观看页面获取视频信息并按运行缓存"""
+    print("=" * 60)
+    print("测试: 观看页面元数据")
+    print("=" * 60)
+
+    player = make_player_response("vid00000001", "回放标题", 5400, "2024-03-02T20:00:00+08:00")
+    html = make_watch_html(make_initial_data("init-token"), player)
+    server, hits = serve_pages({"/watch?v=vid00000001": html})
+    url = f"http://127.0.0.1:{server.server_port}/watch?v=vid00000001"
+
+    try:
+        session = ChatSession()
+        info = fetcher.resolve_video_info(url, session=session)
+        assert info == {
+            "id": "vid00000001",
+            "title": "回放标题",
+            "duration": 5400,
+            "upload_date": "20240302",
+            "url": url
+        }, info
+        page = fetcher.load_watch_page(url, session=session)
+        assert page["continuation"] == "init-token"
+        assert page["api_key"] == "AIzaTestKey"
+        assert hits["/watch?v=vid00000001"] == 1, "同一视频在一次运行中只应获取一次页面"
+    finally:
+        server.shutdown()
+
+    # 与 yt-dlp 一致按 UTC 取日期：太平洋时间晚上开播的直播算作第二天
+    for upload, expected in [
+        ("2024-03-02T20:00:00-08:00", "20240303"),
+        ("2024-03-02T15:59:59-08:00", "20240302"),
+        ("2024-03-02T07:00:00+09:00", "20240301"),
+        ("2024-03-02T23:30:00Z", "20240302"),
+        ("2024-03-02", "20240302"),
+    ]:
+        info = fetcher.extract_video_info(make_player_response("vid00000002", "t", 60, upload), url)
+        assert info["upload_date"] == expected, (upload, info)
+    assert fetcher.utc_upload_date("不是日期") == ""
+
+    # 字段不全时返回 None，由调用方回退到 yt-dlp
+    assert fetcher.extract_video_info({"videoDetails": {"videoId": "x"}}, url) is None
+    assert fetcher.extract_video_info(None, url) is None
+
+    print("✅ 测试通过\n")
+
+
+def test_parse_messages_parity():
+    """测试优化后的 parse_messages 与旧实现输出一致"""
+    print("=" * 60)
+    print("测试: parse_messages 与旧实现一致")
+    print("=" * 60)
+
+    corpus = [fetcher._page_actions(p) for p in make_replay_pages(5, 200)]
+
+    def renderer(action):
+        item = action["replayChatItemAction"]["actions"][0]["addChatItemAction"]["item"]
+        return next(iter(item.values()))
+
+    edge = [make_chat_action(i, 1000 * i + 7, i, paid=(i == 3)) for i in range(12)]
+    renderer(edge[0])["message"]["runs"] = [{"text": "a\x00b\tc\x7fd\n"}]
+    renderer(edge[1])["message"]["runs"] = [{"text": "   "}]
+    renderer(edge[2])["authorName"] = {"simpleText": "  "}
+    del renderer(edge[4])["videoOffsetTimeMsec"]
+    renderer(edge[5])["videoOffsetTimeMsec"] = "12345.9"
+    renderer(edge[6])["videoOffsetTimeMsec"] = "not-a-number"
+    renderer(edge[7])["videoOffsetTimeMsec"] = "-4500"
+    renderer(edge[8])["message"]["runs"] = [{"emoji": {"emojiId": "😂"}}, {"text": " 😂 ok "}]
+    del renderer(edge[9])["authorExternalChannelId"]
+    del renderer(edge[10])["message"]
+    renderer(edge[11])["videoOffsetTimeMsec"] = None
+    edge += [{}, {"replayChatItemAction": {}}, {"addChatItemAction": {}}]
+    corpus.append(edge)
+    corpus.append(None)
+
+    for actions in corpus:
+        assert fetcher.parse_messages(actions) == legacy.parse_messages(actions)
+
+    msgs, latest = fetcher.parse_messages(edge)
+    assert msgs[0]["message"] == "abcd"
+    assert all(list(m.to_dict()) == ["time_text", "author", "author_id", "message", "offset_ms"]
+               for m in msgs)
+    print(f"✅ {len(corpus)} 组分页输出一致（边界用例 {len(msgs)} 条）\n")
+
+
+def test_prefetch_pipeline():
+    """测试预取流水线：结果与顺序获取一致、有界提前量、提前结束与异常传递"""
+    print("=" * 60)
+    print("测试: 分页预取流水线")
+    print("=" * 60)
+
+    pages = make_replay_pages(12, 20)
+    state = {"calls": 0}
+    original_fetch, original_load = fetcher.fetch_chat, fetcher.load_watch_page
+
+    def fake_fetch(api_key, version, continuation, **kwargs):
+        state["calls"] += 1
+        if continuation == state.get("fail_at"):
+            raise RuntimeError("模拟重试耗尽")
+        time.sleep(0.005)
+        return pages[int(continuation.split("-")[1])]
+
+    fetcher.fetch_chat = fake_fetch
+    fetcher.load_watch_page = lambda url, cookies_file=None, session=None, metrics=None: {
+        "video_info": {"duration": 10 ** 6}, "api_key": "k", "version": "v",
+        "has_initial_data": True, "continuation": "page-0",
+    }
+    try:
+        def collect(prefetch, consumed_hook=None):
+            result = []
+            for k, page in enumerate(fetcher.iter_video_chat("u", verbose=False, prefetch=prefetch), 1):
+                if consumed_hook:
+                    consumed_hook(k)
+                result.append(([m.to_dict() for m in page["messages"]], page["next_continuation"]))
+            return result
+
+        sequential = collect(0)
+        assert len(sequential) == 12 and sequential[-1][1] is None
+
+        def check_bound(consumed):
+            time.sleep(0.02)  # 消费较慢时，生产方最多领先 队列长度 + 1 页
+            assert state["calls"] - consumed <= 2 + 1, f"提前量过大: {state['calls']} / {consumed}"
+
+        state["calls"] = 0
+        assert collect(2, check_bound) == sequential
+
+        # 提前结束后生产线程停止请求
+        state["calls"] = 0
+        gen = fetcher.iter_video_chat("u", verbose=False, prefetch=2)
+        next(gen)
+        gen.close()
+        time.sleep(0.2)
+        stopped_at = state["calls"]
+        time.sleep(0.1)
+        assert state["calls"] == stopped_at <= 4
+
+        # 获取失败时，已取到的页先被处理，然后异常在消费方抛出
+        state["fail_at"] = "page-5"
+        got = []
+        try:
+            for page in fetcher.iter_video_chat("u", verbose=False, prefetch=2):
+                got.append(page["next_continuation"])
+            assert False, "应该抛出 RuntimeError"
+        except RuntimeError:
+            pass
+        assert got == [f"page-{k}" for k in range(1, 6)]
+    finally:
+        fetcher.fetch_chat, fetcher.load_watch_page = original_fetch, original_load
+
+    print("✅ 测试通过\n")
+
+
+def main():
+    """运行所有测试"""
+    test_continuation_lookup()
+    test_extract_params()
+    test_watch_page_metadata()
+    test_parse_messages_parity()
+    test_prefetch_pipeline()
+    print("🎉 所有测试通过！")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
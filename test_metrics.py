@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""测试分阶段统计与导出"""
+
+import sys
+import os
+import json
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from youtube_chat_downloader import fetcher
+from youtube_chat_downloader.metrics import StageMetrics, RunMetrics, percentile, prometheus_text
+from youtube_chat_downloader.session import ChatSession
+from youtube_chat_downloader.ratelimit import AdaptiveRateLimiter
+from benchmarks.stub_server import StubInnerTube
+
+
+def test_percentile():
+    """测试分位数计算"""
+    print("=" * 60)
+    print("测试 1: 分位数")
+    print("=" * 60)
+
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3.0], 0.99) == 3.0
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50.5
+    assert abs(percentile(values, 0.95) - 95.05) < 1e-9
+    assert percentile(values, 1.0) == 100
+
+    print("✅ 测试 1 通过\n")
+
+
+def test_stage_metrics_from_fetch():
+    """测试下载过程中各阶段都被记录，并能导出 JSON 和 Prometheus 文本"""
+    print("=" * 60)
+    print("测试 2: 下载阶段统计")
+    print("=" * 60)
+
+    pages = 6
+    with StubInnerTube(pages=pages, actions=20, latency=0.005, throttle_rate=0.2,
+                       retry_after=0, seed=1) as stub:
+        limiter = AdaptiveRateLimiter(rate=1000.0, max_rate=1000.0, burst=50)
+        session = ChatSession(limiter=limiter, api_base=stub.base_url)
+        metrics = StageMetrics()
+        counters = {}
+        messages = sum(
+            len(page["messages"])
+            for page in fetcher.iter_video_chat(stub.watch_url(), verbose=False, session=session,
+                                                counters=counters, metrics=metrics)
+        )
+        throttled = stub.stats["throttled"]
+
+    data = metrics.as_dict()
+    stages = data["stages"]
+    assert stages["chat_page"]["count"] == pages, stages
+    assert stages["chat_page"]["bytes"] > 0 and stages["html"]["bytes"] > 0
+    assert stages["parse"]["count"] == pages
+    for name in ("metadata", "decode", "rate_limit_wait"):
+        assert name in stages, name
+    if throttled:
+        assert stages["chat_page_error"]["count"] == throttled
+        assert stages["backoff"]["count"] == throttled
+    latency = data["page_latency"]
+    assert latency["count"] == pages
+    assert 0.005 <= latency["p50"] <= latency["p95"] <= latency["p99"]
+
+    run = RunMetrics()
+    run.add_video("stubvideo01", "success", metrics, counters, messages)
+    run.add_video("other", "skipped")
+    summary = run.summary()
+    assert summary["run"]["videos"] == {"success": 1, "skipped": 1}
+    assert summary["run"]["fetch_stats"]["throttled"] == throttled
+    assert summary["run"]["page_latency"]["count"] == pages
+
+    text = prometheus_text(summary)
+    assert f"ytchat_pages_total {pages}" in text
+    assert f"ytchat_throttled_total {throttled}" in text
+    assert 'ytchat_page_latency_seconds{quantile="0.99"}' in text
+    assert 'ytchat_video_stage_seconds{video_id="stubvideo01",stage="chat_page"}' in text
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "metrics", "run.json")
+        run.write_json(path)
+        with open(path, "r", encoding="utf-8") as f:
+            assert json.load(f)["videos"]["stubvideo01"]["messages"] == messages
+        run.write_prometheus(os.path.join(tmpdir, "ytchat.prom"))
+        assert sorted(os.listdir(tmpdir)) == ["metrics", "ytchat.prom"]
+
+    print(f"✅ {pages} 页，限流 {throttled} 次，p50 {latency['p50'] * 1000:.1f}ms")
+    print("✅ 测试 2 通过\n")
+
+
+def main():
+    """运行所有测试"""
+    test_percentile()
+    test_stage_metrics_from_fetch()
+    print("🎉 所有测试通过！")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
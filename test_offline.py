@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""离线端到端测试：录制响应 → 桩服务器回放（含延迟、500 和 429）→ CLI 下载"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from youtube_chat_downloader import cli, fetcher
+from benchmarks.recorder import RecordingSession
+from benchmarks.stub_server import StubInnerTube, SYNTHETIC_VIDEO_ID
+
+PAGES = 8
+ACTIONS = 25
+
+
+def test_record_and_replay():
+    """测试录制的响应能被桩服务器原样回放，CLI 在故障注入下仍能完整下载"""
+    print("=" * 60)
+    print("测试: 录制与离线回放")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        record_dir = Path(tmpdir) / "recorded"
+        output_dir = Path(tmpdir) / "out"
+
+        with StubInnerTube(pages=PAGES, actions=ACTIONS) as source:
+            session = RecordingSession(record_dir, api_base=source.base_url)
+            expected = [
+                m.to_dict()
+                for page in fetcher.iter_video_chat(source.watch_url(), verbose=False, session=session)
+                for m in page["messages"]
+            ]
+        assert session.recorded == {"watch": 1, "replay": PAGES}, session.recorded
+        assert len(expected) == PAGES * ACTIONS
+
+        stub = StubInnerTube(record_dir, latency=0.002, error_rate=0.1, throttle_rate=0.15,
+                             retry_after=0, seed=3)
+        argv = sys.argv
+        sys.argv = ["ytchat", "--url", stub.watch_url(SYNTHETIC_VIDEO_ID), "--api-base", stub.base_url,
+                    "--output-dir", str(output_dir), "--sleep-interval", "0", "--max-retries", "10"]
+        try:
+            with stub:
+                cli.main()
+        finally:
+            sys.argv = argv
+
+        files = list(output_dir.glob("*.json"))
+        assert len(files) == 1, files
+        with open(files[0], "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        assert saved["messages"] == expected
+        assert stub.stats["replay"] == PAGES, stub.stats
+        assert stub.stats["throttled"] + stub.stats["server_errors"] > 0, stub.stats
+        assert stub.stats["not_found"] == 0, stub.stats
+
+        print(f"✅ {len(expected)} 条消息，桩服务器统计: {stub.stats}")
+    print("✅ 测试通过\n")
+
+
+def main():
+    """运行所有测试"""
+    test_record_and_replay()
+    print("🎉 所有测试通过！")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
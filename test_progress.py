@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""测试进度输出"""
+
+import sys
+import os
+import io
+import json
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from youtube_chat_downloader.messages import ChatMessage
+from youtube_chat_downloader.progress import ProgressReporter
+
+
+def make_page(start, count):
+    return [ChatMessage("0:00", f"用户{i}", f"UC{i}", f"消息{i}", i * 1000)
+            for i in range(start, start + count)]
+
+
+def test_sampling():
+    """测试抽样回显跨页连续计数，all 回显全部，status 不回显"""
+    print("=" * 60)
+    print("测试 1: 消息回显级别")
+    print("=" * 60)
+
+    page_sizes = [7, 3, 12, 1, 9]
+    for level, sample_every, expected in (
+        ("sample", 5, [4, 9, 14, 19, 24, 29]),
+        ("all", 5, list(range(32))),
+        ("status", 5, []),
+    ):
+        stream = io.StringIO()
+        reporter = ProgressReporter(level, interval=3600, sample_every=sample_every, stream=stream)
+        progress = reporter.video("vid", 3600)
+        start = 0
+        for size in page_sizes:
+            progress.page(make_page(start, size), (start + size) * 1000)
+            start += size
+        progress.done("success")
+        echoed = [int(line.split("|")[2].strip()[2:]) for line in stream.getvalue().splitlines() if line]
+        assert echoed == expected, (level, echoed)
+        assert progress.messages == 32 and progress.pages == len(page_sizes)
+        print(f"✅ {level}: 回显 {len(echoed)} 条")
+
+    print("✅ 测试 1 通过\n")
+
+
+def test_quiet_and_events():
+    """测试 quiet 不输出进度，结构化日志记录开始、进度和结束事件"""
+    print("=" * 60)
+    print("测试 2: quiet 与 JSON Lines 日志")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        log_path = os.path.join(tmpdir, "progress.jsonl")
+        stream = io.StringIO()
+        reporter = ProgressReporter("quiet", interval=0, file_interval=0, stream=stream, log_path=log_path)
+        reporter.info("不应输出")
+        progress = reporter.video("vid", 100)
+        progress.page(make_page(0, 10), 50000)
+        progress.page(make_page(10, 10), 200000)
+        progress.done("success", path="out.json")
+        reporter.close()
+
+        assert stream.getvalue() == ""
+        with open(log_path, "r", encoding="utf-8") as f:
+            events = [json.loads(line) for line in f]
+
+    assert [e["event"] for e in events] == ["video_start", "progress", "progress", "video_done"]
+    assert events[1]["covered"] == 0.5
+    assert events[2]["covered"] == 1.0
+    assert events[3]["messages"] == 20 and events[3]["path"] == "out.json"
+
+    # 非终端输出时状态行整行写出
+    stream = io.StringIO()
+    reporter = ProgressReporter("status", interval=0, file_interval=0, stream=stream)
+    progress = reporter.video("vid", 100)
+    progress.page(make_page(0, 10), 25000)
+    progress.done("success")
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1 and "25.0%" in lines[0] and "\r" not in lines[0]
+
+    print(f"✅ {len(events)} 个事件")
+    print("✅ 测试 2 通过\n")
+
+
+def main():
+    """运行所有测试"""
+    test_sampling()
+    test_quiet_and_events()
+    print("🎉 所有测试通过！")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
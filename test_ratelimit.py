@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""测试自适应限速器与退避策略"""
+
+import time
+from youtube_chat_downloader.ratelimit import (
+    AdaptiveRateLimiter,
+    backoff_delay,
+    parse_retry_after
+)
+
+
+def test_adaptive_rate():
+    """测试成功时提速、限流时降速"""
+    print("=" * 60)
+    print("测试 1: 速率自适应")
+    print("=" * 60)
+
+    limiter = AdaptiveRateLimiter(rate=4.0, min_rate=1.0, max_rate=6.0, increase=1.0)
+    for _ in range(5):
+        limiter.on_success()
+    assert limiter.rate == 6.0, f"速率应封顶为6，实际: {limiter.rate}"
+
+    limiter.on_throttle()
+    assert limiter.rate == 3.0, f"速率应减半为3，实际: {limiter.rate}"
+    for _ in range(5):
+        limiter.on_throttle()
+    assert limiter.rate == 1.0, f"速率不应低于下限，实际: {limiter.rate}"
+
+    print("✅ 测试 1 通过\n")
+
+
+def test_retry_after_pause():
+    """测试 Retry-After 暂停请求"""
+    print("=" * 60)
+    print("测试 2: Retry-After 全局暂停")
+    print("=" * 60)
+
+    limiter = AdaptiveRateLimiter(rate=100.0, max_rate=100.0)
+    limiter.on_throttle(retry_after=0.2)
+    start = time.monotonic()
+    limiter.acquire()
+    waited = time.monotonic() - start
+    assert waited >= 0.19, f"应至少等待0.2秒，实际: {waited:.3f}"
+
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("garbage") is None
+
+    for attempt in range(10):
+        delay = backoff_delay(attempt, base=1.0, cap=30.0)
+        assert 0.5 <= delay <= 30.0, f"退避时间越界: {delay}"
+
+    print("✅ 测试 2 通过\n")
+
+
+def main():
+    """运行所有测试"""
+    test_adaptive_rate()
+    test_retry_after_pause()
+    print("🎉 所有测试通过！")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
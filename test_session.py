@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""测试共享 HTTP 会话的连接池与 keep-alive 复用（本地 HTTP/1.1 服务器）"""
+
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from youtube_chat_downloader.session import ChatSession, USER_AGENT
+
+
+def serve(delay=0.0):
+    """启动支持 keep-alive 的本地服务器；返回 (server, 收到的 User-Agent 列表, 基础地址)"""
+    agents = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            agents.append(self.headers.get("User-Agent"))
+            if delay:
+                time.sleep(delay)
+            body = b"ok"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, agents, f"http://127.0.0.1:{server.server_port}"
+
+
+def test_keep_alive_reuse():
+    """测试顺序请求复用同一个连接，关闭 keep-alive 时每次新建连接"""
+    print("=" * 60)
+    print("测试 1: keep-alive 连接复用")
+    print("=" * 60)
+
+    server, agents, base = serve()
+    try:
+        with ChatSession() as session:
+            for i in range(6):
+                assert session.get(f"{base}/page/{i}").status_code == 200
+            stats = session.connection_stats()
+        assert stats == {"requests": 6, "connections": 1, "reused": 5,
+                         "reuse_ratio": 5 / 6, "bytes": 12}, stats
+        assert agents == [USER_AGENT] * 6
+
+        with ChatSession(keep_alive=False) as session:
+            for i in range(4):
+                session.get(f"{base}/page/{i}")
+            stats = session.connection_stats()
+        assert (stats["requests"], stats["connections"], stats["reused"]) == (4, 4, 0), stats
+    finally:
+        server.shutdown()
+
+    print("✅ 测试 1 通过\n")
+
+
+def test_pool_size():
+    """测试并发请求的连接数不超过连接池大小，且连接在请求之间被复用"""
+    print("=" * 60)
+    print("测试 2: 连接池大小")
+    print("=" * 60)
+
+    server, _, base = serve(delay=0.02)
+    try:
+        with ChatSession(pool_size=3) as session:
+            barrier = threading.Barrier(3)
+
+            def worker(n):
+                barrier.wait()
+                for i in range(5):
+                    session.get(f"{base}/worker/{n}/{i}")
+
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(3)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            stats = session.connection_stats()
+        assert stats["requests"] == 15, stats
+        assert 1 <= stats["connections"] <= 3, stats
+        assert stats["reused"] >= 12, stats
+    finally:
+        server.shutdown()
+
+    print(f"✅ 15 个并发请求使用 {stats['connections']} 个连接")
+    print("✅ 测试 2 通过\n")
+
+
+def main():
+    """运行所有测试"""
+    test_keep_alive_reuse()
+    test_pool_size()
+    print("🎉 所有测试通过！")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
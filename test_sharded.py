@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""测试按时间分段并发获取（本地桩服务器）"""
+
+import sys
+import os
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from youtube_chat_downloader import fetcher
+from youtube_chat_downloader.session import ChatSession
+from youtube_chat_downloader.ratelimit import AdaptiveRateLimiter
+from benchmarks.payloads import (
+    make_chat_action,
+    make_initial_data,
+    make_player_response,
+    make_watch_html
+)
+
+DURATION = 600
+PAGE_SIZE = 25
+OFFSETS = list(range(-3000, DURATION * 1000, 1000))
+# 回放数据越过视频长度（直播结束后仍有消息），两种获取方式都应截止在 DURATION
+OVERRUN_OFFSETS = list(range(-3000, DURATION * 1000 + 90000, 1000))
+
+
+def replay_page(actions, start):
+    """从第 start 条消息开始的一页响应"""
+    continuations = []
+    if start + PAGE_SIZE < len(actions):
+        continuations.append({"liveChatReplayContinuationData": {"continuation": f"c:{start + PAGE_SIZE}"}})
+    continuations.append({"playerSeekContinuationData": {"continuation": "seek"}})
+    return {"continuationContents": {"liveChatContinuation": {
+        "continuations": continuations,
+        "actions": actions[start:start + PAGE_SIZE],
+    }}}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """观看页面 + get_live_chat_replay（支持 playerOffsetMs 跳转）"""
+
+    protocol_version = "HTTP/1.1"
+    offsets = OFFSETS
+    actions = [make_chat_action(i, offset, i % 40) for i, offset in enumerate(OFFSETS)]
+    watch_html = make_watch_html(
+        make_initial_data("c:0"), make_player_response("vid00000001", length_seconds=DURATION)
+    )
+
+    def _send(self, body, content_type):
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send(self.watch_html, "text/html; charset=utf-8")
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        token = request["continuation"]
+        if token == "seek":
+            target = int(request["currentPlayerState"]["playerOffsetMs"])
+            index = next((i for i, o in enumerate(self.offsets) if o >= target), len(self.offsets))
+            start = max(index - 5, 0)  # 跳转页会带回跳转点之前的少量消息
+        else:
+            start = int(token.split(":")[1])
+        self._send(json.dumps(replay_page(self.actions, start)), "application/json")
+
+    def log_message(self, *args):
+        pass
+
+
+def fetch_both(handler):
+    """分别顺序获取和分段获取同一个视频，返回 (顺序结果, 分段结果, 分段计数器)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    url = f"{base}/watch?v=vid00000001"
+
+    def new_session():
+        limiter = AdaptiveRateLimiter(rate=1000.0, max_rate=1000.0, burst=50)
+        return ChatSession(limiter=limiter, api_base=base)
+
+    try:
+        sequential = [
+            m for page in fetcher.iter_video_chat(url, verbose=False, session=new_session())
+            for m in page["messages"]
+        ]
+        counters = {}
+        sharded = [
+            m for page in fetcher.iter_video_chat_sharded(
+                url, 4, verbose=False, session=new_session(), counters=counters
+            )
+            for m in page["messages"]
+        ]
+    finally:
+        server.shutdown()
+    return sequential, sharded, counters
+
+
+def test_sharded_matches_sequential():
+    """测试分段获取结果与顺序获取一致"""
+    print("=" * 60)
+    print("测试 1: 分段并发获取")
+    print("=" * 60)
+
+    sequential, sharded, counters = fetch_both(StubHandler)
+
+    assert len(sequential) == len(OFFSETS), len(sequential)
+    assert sharded == sequential, f"分段结果不一致: {len(sharded)} vs {len(sequential)}"
+    assert counters["pages"] <= len(OFFSETS) // PAGE_SIZE + 1 + 4, counters
+
+    print(f"✅ {len(sharded)} 条消息，{counters['pages']} 次分页请求")
+    print("✅ 测试 1 通过\n")
+
+
+def test_duration_cutoff():
+    """测试回放越过视频长度时，顺序与分段获取使用同一截止规则"""
+    print("=" * 60)
+    print("测试 2: 视频长度截止")
+    print("=" * 60)
+
+    class OverrunHandler(StubHandler):
+        offsets = OVERRUN_OFFSETS
+        actions = [make_chat_action(i, offset, i % 40) for i, offset in enumerate(OVERRUN_OFFSETS)]
+
+    sequential, sharded, _ = fetch_both(OverrunHandler)
+
+    offsets = [m.offset_ms for m in sequential]
+    assert offsets == [o for o in OVERRUN_OFFSETS if o < DURATION * 1000], offsets[-3:]
+    assert sharded == sequential, f"分段结果不一致: {len(sharded)} vs {len(sequential)}"
+
+    print(f"✅ 两种方式都保留 {len(sequential)} 条长度内的消息")
+    print("✅ 测试 2 通过\n")
+
+
+def main():
+    """运行所有测试"""
+    test_sharded_matches_sequential()
+    test_duration_cutoff()
+    print("🎉 所有测试通过！")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
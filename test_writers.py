@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""测试聊天回放的增量写入"""
+
+import os
+import json
+import sqlite3
+import time
+import tempfile
+import threading
+from youtube_chat_downloader.fetcher import ChatStatistics
+from youtube_chat_downloader.messages import ChatMessage, as_messages
+from youtube_chat_downloader.writers import JsonChatWriter, open_chat_writer, generate_filename
+from youtube_chat_downloader.db_importer import import_json_to_db, init_database
+from youtube_chat_downloader.jsonl import load_chat_file, zstandard
+from youtube_chat_downloader.cli import video_saved_in_db
+
+
+def make_messages(count, start=0):
+    return [
+        {
+            "time_text": f"{i // 60}:{i % 60:02d}",
+            "author": f"用户{i % 7}",
+            "author_id": f"UC{i % 7}" if i % 5 else "",
+            "message": f"消息 \"{i}\" ✨\\ 🎉\u2028/" + ("\t" if i % 3 else ""),
+            "offset_ms": i * 1000 - 5000
+        }
+        for i in range(start, start + count)
+    ]
+
+
+VIDEO_INFO = {
+    "id": "abcdefghijk",
+    "title": "测试 \"直播\"",
+    "duration": 3600,
+    "upload_date": "20240115",
+    "url": "https://www.youtube.com/watch?v=abcdefghijk"
+}
+
+
+def expected_json(messages):
+    stats = ChatStatistics()
+    stats.add(as_messages(messages))
+    data = {"video_info": VIDEO_INFO, "messages": messages, "statistics": stats.as_dict()}
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def test_streaming_json_identical():
+    """测试逐页写入的结果与一次性 json.dump 逐字节一致"""
+    print("=" * 60)
+    print("测试 1: 增量 JSON 写入")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for pages in ([], [[]], [make_messages(1)], [make_messages(3), [], make_messages(4, 3)],
+                      [as_messages(make_messages(5)), make_messages(2, 5)]):
+            with JsonChatWriter(tmpdir, VIDEO_INFO) as writer:
+                for page in pages:
+                    writer.write(page)
+                path = writer.close()
+
+            assert path == os.path.join(tmpdir, generate_filename(VIDEO_INFO))
+            assert not os.path.exists(path + ".part")
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            all_messages = [m.to_dict() if isinstance(m, ChatMessage) else m
+                            for page in pages for m in page]
+            assert content == expected_json(all_messages), f"输出不一致: {len(all_messages)} 条消息"
+            assert json.loads(content)["statistics"]["total_messages"] == len(all_messages)
+
+    print("✅ 测试 1 通过\n")
+
+
+def test_abort_on_error():
+    """测试写入中途失败时不留下不完整的文件"""
+    print("=" * 60)
+    print("测试 2: 失败时清理临时文件")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        try:
+            with JsonChatWriter(tmpdir, VIDEO_INFO) as writer:
+                writer.write(make_messages(5))
+                raise RuntimeError("模拟网络中断")
+        except RuntimeError:
+            pass
+        assert os.listdir(tmpdir) == [], os.listdir(tmpdir)
+
+    print("✅ 测试 2 通过\n")
+
+
+def test_checkpoint_resume():
+    """测试中断后从检查点续传，结果与一次性下载一致"""
+    print("=" * 60)
+    print("测试 3: 检查点与续传")
+    print("=" * 60)
+
+    pages = [make_messages(4, p * 4) for p in range(6)]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        try:
+            with JsonChatWriter(tmpdir, VIDEO_INFO, checkpoint_every=2) as writer:
+                for p in range(3):
+                    writer.write(pages[p], f"page-{p + 1}", (p + 1) * 4000)
+                # 模拟写了一半的下一页后进程被中断
+                writer._file.write(b"garbage")
+                raise KeyboardInterrupt
+        except KeyboardInterrupt:
+            pass
+
+        assert os.path.exists(writer.part_path) and os.path.exists(writer.checkpoint_path)
+
+        with JsonChatWriter(tmpdir, VIDEO_INFO, resume=True) as writer:
+            assert writer.resume_state == {"continuation": "page-3", "max_offset": 12000, "messages": 12}
+            for p in range(3, 6):
+                writer.write(pages[p], f"page-{p + 1}" if p < 5 else None, (p + 1) * 4000)
+            path = writer.close()
+
+        assert not os.path.exists(writer.checkpoint_path)
+        with open(path, 'r', encoding='utf-8') as f:
+            assert f.read() == expected_json([m for page in pages for m in page])
+
+        # 不指定 resume 时重新开始
+        with JsonChatWriter(tmpdir, VIDEO_INFO) as writer:
+            assert writer.resume_state is None
+            writer.abort()
+
+    print("✅ 测试 3 通过\n")
+
+
+def test_jsonl_resume():
+    """测试 JSONL（含压缩格式）的写入、检查点续传和读取"""
+    print("=" * 60)
+    print("测试 4: JSONL 写入与续传")
+    print("=" * 60)
+
+    pages = [make_messages(4, p * 4) for p in range(6)]
+    expected = json.loads(expected_json([m for page in pages for m in page]))
+    save_types = ["jsonl", "jsonl.gz"] + (["jsonl.zst"] if zstandard else [])
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for save_type in save_types:
+            try:
+                with open_chat_writer(tmpdir, VIDEO_INFO, save_type, checkpoint_every=2) as writer:
+                    for p in range(3):
+                        writer.write(pages[p], f"page-{p + 1}", (p + 1) * 4000)
+                    writer._file.write(b"garbage")
+                    raise KeyboardInterrupt
+            except KeyboardInterrupt:
+                pass
+
+            with open_chat_writer(tmpdir, VIDEO_INFO, save_type, resume=True) as writer:
+                # 压缩格式只能从检查点所在的成员边界续传
+                resumed = writer.resume_state["messages"] // 4
+                assert resumed == (3 if save_type == "jsonl" else 2), (save_type, writer.resume_state)
+                for p in range(resumed, 6):
+                    writer.write(pages[p], f"page-{p + 1}" if p < 5 else None, (p + 1) * 4000)
+                path = writer.close()
+
+            assert path.endswith("." + save_type)
+            assert os.path.basename(path) == generate_filename(VIDEO_INFO, save_type)
+            assert load_chat_file(path) == expected, save_type
+            print(f"✅ {save_type}: {os.path.getsize(path)} 字节")
+
+    print("✅ 测试 4 通过\n")
+
+
+def test_sqlite_writer():
+    """测试直接写入 SQLite：结果与导入 JSON 相同，中断时回滚，下载期间不占用写锁"""
+    print("=" * 60)
+    print("测试 5: SQLite 写入")
+    print("=" * 60)
+
+    pages = [make_messages(4, p * 4) for p in range(5)]
+    query = '''
+        SELECT video_id, time_text, author, author_id, message, offset_ms FROM chat_messages
+        ORDER BY video_id, id
+    '''
+    video_query = '''
+        SELECT video_id, title, duration, upload_date, url, total_messages, unique_authors,
+               time_range_min, time_range_max FROM videos ORDER BY video_id
+    '''
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "direct.db")
+        with open_chat_writer(tmpdir, VIDEO_INFO, "sqlite", db_path=db_path) as writer:
+            for p, page in enumerate(pages):
+                writer.write(page, f"page-{p + 1}", (p + 1) * 4000)
+            assert writer.close() == db_path
+
+        # 对照：先写 JSON 再导入
+        reference_db = os.path.join(tmpdir, "reference.db")
+        with JsonChatWriter(tmpdir, VIDEO_INFO) as writer:
+            for page in pages:
+                writer.write(page)
+            json_path = writer.close()
+        conn = init_database(reference_db)
+        import_json_to_db(json_path, conn, incremental=False, verbose=False)
+        conn.close()
+
+        direct = sqlite3.connect(db_path)
+        reference = sqlite3.connect(reference_db)
+        assert direct.execute(query).fetchall() == reference.execute(query).fetchall()
+        assert direct.execute(video_query).fetchall() == reference.execute(video_query).fetchall()
+        reference.close()
+
+        # 重新下载时中断：回滚，原有的完整数据不受影响
+        try:
+            with open_chat_writer(tmpdir, VIDEO_INFO, "sqlite", db_path=db_path) as writer:
+                writer.write(make_messages(3), "page-1", 3000)
+                raise KeyboardInterrupt
+        except KeyboardInterrupt:
+            pass
+        assert direct.execute("SELECT COUNT(*) FROM chat_messages").fetchone()[0] == 20
+        direct.close()
+
+        # 多个线程同时写不同视频
+        def download(video_id):
+            info = dict(VIDEO_INFO, id=video_id)
+            with open_chat_writer(tmpdir, info, "sqlite", db_path=db_path) as w:
+                for page in pages:
+                    w.write(page)
+                w.close()
+
+        threads = [threading.Thread(target=download, args=(f"video{i:06d}",)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        conn = sqlite3.connect(db_path)
+        counts = conn.execute('''
+            SELECT video_id, COUNT(*) FROM chat_messages GROUP BY video_id
+        ''').fetchall()
+        conn.close()
+        assert sorted(counts) == [("abcdefghijk", 20)] + [(f"video{i:06d}", 20) for i in range(4)], counts
+
+        # 一个视频正在下载时不占用写锁：另一个视频可以打开、写入并提交，检查视频是否已存在也不用等待
+        with open_chat_writer(tmpdir, dict(VIDEO_INFO, id="busy"), "sqlite", db_path=db_path) as first:
+            first.write(pages[0])
+            start = time.perf_counter()
+            with open_chat_writer(tmpdir, dict(VIDEO_INFO, id="other"), "sqlite", db_path=db_path) as second:
+                second.write(pages[1])
+                second.close()
+            assert video_saved_in_db(db_path, "other")
+            assert not video_saved_in_db(db_path, "busy")
+            assert time.perf_counter() - start < 1.0, time.perf_counter() - start
+            first.write(pages[2])
+            first.close()
+        conn = sqlite3.connect(db_path)
+        assert conn.execute('''
+            SELECT message FROM chat_messages WHERE video_id = 'busy' ORDER BY id
+        ''').fetchall() == [(m["message"],) for m in pages[0] + pages[2]]
+        conn.close()
+
+    print("✅ 测试 5 通过\n")
+
+
+def main():
+    """运行所有测试"""
+    test_streaming_json_identical()
+    test_abort_on_error()
+    test_checkpoint_resume()
+    test_jsonl_resume()
+    test_sqlite_writer()
+    print("🎉 所有测试通过！")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
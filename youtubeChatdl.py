@@ -168,7 +168,8 @@ def extract_next_cont(json_data):
     return walk(json_data)
 
 
-def main(url):
+def main(url, progress="status"):
+    """progress: quiet 不输出进度；status 每 5 秒输出状态行；all 另外回显每条消息"""
     print(f"▶ Fetching: {url}")
     ydl_opts = {
         'cookiefile': 'www.youtube.com_cookies.txt'  # <-- 在这里设置 cookie 文件路径
@@ -203,6 +204,7 @@ def main(url):
     print("开始获取聊天消息...")
 
     start_time = time.time()
+    last_status = start_time
     for i in range(3000):
         if continuation in seen_continuations:
             print("🔁 由于重复相同的 continuation，已终止。")
@@ -223,13 +225,14 @@ def main(url):
             break
 
         # 批量插入数据库
-        for time_text, author, author_id, msg, offset in msgs:
-            cursor.execute('''
-                INSERT INTO chat_messages (time_text, author, author_id, message, offset_ms)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (time_text, author, author_id, msg, offset))
-            total += 1
-            print(f"{time_text} | {author} ({author_id}) | {msg}", flush=True)
+        cursor.executemany('''
+            INSERT INTO chat_messages (time_text, author, author_id, message, offset_ms)
+            VALUES (?, ?, ?, ?, ?)
+        ''', msgs)
+        total += len(msgs)
+        if progress == "all" and msgs:
+            # 按页一次写出，不逐条 flush
+            print("\n".join(f"{t} | {a} ({aid}) | {m}" for t, a, aid, m, _ in msgs))
         
         conn.commit()
 
@@ -239,9 +242,12 @@ def main(url):
             break
         continuation = next_c
 
-        if i % 20 == 0:
-            elapsed = int(time.time() - start_time)
-            print(f"⏳ 已用时 {elapsed}s / 已获取 {total} 条 / 当前 {max_seen_offset//1000}s")
+        now = time.time()
+        if progress != "quiet" and now - last_status >= 5:
+            last_status = now
+            elapsed = now - start_time
+            print(f"⏳ 已用时 {int(elapsed)}s / 已获取 {total} 条 ({total / elapsed:.0f} 条/s) / "
+                  f"当前 {max_seen_offset//1000}s / {duration}s", flush=True)
 
         time.sleep(0.08)
 
@@ -266,9 +272,11 @@ def main(url):
 
 
 if __name__ == "__main__":
-    import sys
-
-    if len(sys.argv) < 2:
-        print("Usage: python youtubeChatdl.py <youtube_url>")
-    else:
-        main(sys.argv[1])
+    import argparse
+
+    parser = argparse.ArgumentParser(description="下载单个视频的聊天回放到 SQLite")
+    parser.add_argument("url", help="YouTube 视频链接")
+    parser.add_argument("--progress", choices=("quiet", "status", "all"), default="status",
+                        help="进度输出：quiet 不输出，status 状态行，all 另外回显每条消息 (默认: status)")
+    args = parser.parse_args()
+    main(args.url, args.progress)
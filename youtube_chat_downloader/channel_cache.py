@@ -0,0 +1,68 @@
+"""频道直播列表的本地缓存"""
+
+import os
+import re
+import json
+from pathlib import Path
+from datetime import datetime, timezone
+
+# 这些状态之后还会变化（upcoming → live → was_live），增量刷新时不能以它们为停止点
+TRANSIENT_STATUSES = ("is_live", "is_upcoming")
+
+
+def channel_cache_path(channel_url, cache_dir):
+    """根据频道链接生成缓存文件路径"""
+    slug = re.sub(r"[^\w@.-]+", "_", channel_url.split("://", 1)[-1]).strip("_")
+    return Path(cache_dir) / f"{slug}.json"
+
+
+def load_channel_cache(path):
+    """读取频道缓存，不存在或损坏时返回 None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cache, dict) or not isinstance(cache.get("entries"), list):
+        return None
+    return cache
+
+
+def save_channel_cache(path, channel_url, entries):
+    """写入频道缓存（先写临时文件再替换，避免中断时损坏）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "channel_url": channel_url,
+            "updated_at": datetime.now().isoformat(),
+            "entries": entries,
+        }, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def entry_from_flat(entry):
+    """将 yt-dlp 平铺提取的条目转换为缓存条目"""
+    upload_date = entry.get("upload_date") or ""
+    if not upload_date and entry.get("timestamp"):
+        upload_date = datetime.fromtimestamp(entry["timestamp"], timezone.utc).strftime("%Y%m%d")
+    return {
+        "id": entry["id"],
+        "live_status": entry.get("live_status"),
+        "title": entry.get("title") or "",
+        "duration": entry.get("duration") or 0,
+        "upload_date": upload_date,
+    }
+
+
+def is_refresh_boundary(entry_id, cached_by_id):
+    """遇到已知且状态已确定的视频时即可停止翻页"""
+    cached = cached_by_id.get(entry_id)
+    return cached is not None and cached.get("live_status") not in TRANSIENT_STATUSES
+
+
+def merge_entries(fresh, cached):
+    """新抓取的条目在前（覆盖同 id 的旧条目），其余沿用缓存"""
+    fresh_ids = {e["id"] for e in fresh}
+    return fresh + [e for e in cached if e["id"] not in fresh_ids]
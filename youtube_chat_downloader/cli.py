@@ -1,43 +1,175 @@
 """YouTube 聊天回放下载器 CLI"""
 
 import os
-import json
 import time
 import argparse
+import threading
 from pathlib import Path
-from datetime import datetime
-from .fetcher import get_livestream_urls, fetch_video_chat
+from contextlib import nullcontext
+from .fetcher import (
+    get_livestream_urls,
+    resolve_video_info,
+    iter_video_chat,
+    iter_video_chat_sharded,
+    print_fetch_summary,
+    ChatReplayUnavailable
+)
+from .writers import generate_filename, open_chat_writer
+from .jsonl import SAVE_TYPES, require_zstandard
+from .db_importer import init_database, video_exists
+from .columnar import (
+    EXPORT_FORMATS,
+    PARTITIONS,
+    ColumnarChatWriter,
+    require_pyarrow,
+    export_chat_file
+)
+from .session import ChatSession
+from .engine import run_downloads, summarize_results
+from .ratelimit import AdaptiveRateLimiter
+from .channel_cache import channel_cache_path
+from .metrics import StageMetrics, RunMetrics, record_stage
+from .progress import ProgressReporter, LEVELS
 
 
-def generate_filename(video_info):
-    """根据视频信息生成文件名"""
-    video_id = video_info["id"]
-    upload_date = video_info.get("upload_date", "unknown")
-    
-    if upload_date and upload_date != "unknown":
-        try:
-            dt = datetime.strptime(upload_date, "%Y%m%d")
-            date_str = dt.strftime("%Y%m%d")
-        except:
-            date_str = upload_date
-    else:
-        date_str = "unknown"
-    
-    filename = f"{date_str}_{video_id}.json"
-    return filename
+def save_to_json(data, output_dir, save_type="json"):
+    """保存数据为JSON文件（save_type 为 jsonl / jsonl.gz / jsonl.zst 时保存为 JSON Lines）"""
+    # fetch_stats 等运行期信息不写入文件
+    writer = open_chat_writer(output_dir, data["video_info"], save_type)
+    with writer:
+        writer.write(data["messages"])
+        return writer.close(data["statistics"])
+
 
+def video_saved_in_db(db_path, video_id):
+    """视频是否已经写入数据库"""
+    conn = init_database(db_path)
+    try:
+        return video_exists(conn.cursor(), video_id)
+    finally:
+        conn.close()
 
-def save_to_json(data, output_dir):
-    """保存数据为JSON文件"""
-    os.makedirs(output_dir, exist_ok=True)
+
+def process_video(idx, url, total, args, cookies_file, session, run_metrics=None, reporter=None,
+                  cancel=None):
+    """下载单个视频的聊天回放并保存，返回结果字典"""
+    reporter = reporter or ProgressReporter()
+    say = reporter.info
+    say(f"\n{'='*60}")
+    say(f"处理视频 {idx}/{total}: {url}")
+    say(f"{'='*60}")
     
-    filename = generate_filename(data["video_info"])
-    filepath = os.path.join(output_dir, filename)
+    metrics = StageMetrics()
+    video_info = resolve_video_info(url, cookies_file, session, metrics)
+    if args.save_type == "sqlite":
+        filename = video_info["id"]
+        filepath = args.db_path
+        exists = args.incremental and video_saved_in_db(args.db_path, video_info["id"])
+    else:
+        filename = generate_filename(video_info, args.save_type)
+        filepath = os.path.join(args.output_dir, filename)
+        exists = args.incremental and os.path.exists(filepath)
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    if exists:
+        say(f"⏭️ 跳过已存在的{'视频' if args.save_type == 'sqlite' else '文件'}: {filename}")
+        reporter.event("video_skipped", video_id=video_info["id"], path=filepath)
+        if run_metrics is not None:
+            run_metrics.add_video(video_info["id"], "skipped", metrics)
+        return {"url": url, "status": "skipped"}
     
-    return filepath
+    counters = {}
+    verbose = not reporter.quiet
+    progress = reporter.video(video_info["id"], video_info.get("duration"))
+    try:
+        with open_chat_writer(args.output_dir, video_info, args.save_type, resume=args.resume,
+                              checkpoint_every=args.checkpoint_every, db_path=args.db_path) as writer:
+            resume_from = writer.resume_state
+            if resume_from:
+                say(f"🔁 从检查点继续：已有 {resume_from['messages']} 条消息，"
+                    f"进度 {resume_from['max_offset'] // 1000} 秒")
+            if args.shards > 1 and not resume_from:
+                pages = iter_video_chat_sharded(
+                    url, args.shards, cookies_file, verbose, session, counters, metrics
+                )
+            else:
+                pages = iter_video_chat(url, cookies_file, verbose, session, counters, resume_from,
+                                        prefetch=args.prefetch, metrics=metrics)
+            # 列式导出与保存同步逐页写入；续传时前面的消息不在内存中，改为保存后从文件导出
+            columnar = None
+            if args.columnar_dir and not resume_from:
+                columnar = ColumnarChatWriter(args.columnar_dir, video_info, args.columnar_format,
+                                              args.partition_by)
+            with columnar or nullcontext():
+                for page in pages:
+                    start = time.perf_counter()
+                    writer.write(page["messages"], page["next_continuation"], page["max_offset"])
+                    if columnar is not None:
+                        columnar.write(page["messages"])
+                    record_stage(metrics, "save", start)
+                    progress.page(page["messages"], page["max_offset"])
+                    if cancel is not None and cancel.is_set():
+                        # 其他线程收到 Ctrl-C：像单线程中断一样退出，写入器保存检查点
+                        raise KeyboardInterrupt
+                start = time.perf_counter()
+                saved_path = writer.close()
+                record_stage(metrics, "save", start, os.path.getsize(saved_path))
+                columnar_path = None
+                start = time.perf_counter()
+                if columnar is not None:
+                    columnar_path = columnar.close()
+                elif args.columnar_dir:
+                    columnar_path, _ = export_chat_file(saved_path, args.columnar_dir,
+                                                        args.columnar_format, args.partition_by)
+                if columnar_path:
+                    record_stage(metrics, "export", start, os.path.getsize(columnar_path))
+    except ChatReplayUnavailable as e:
+        progress.done("failed", error=str(e))
+        print(e)
+        print(f"❌ 无法获取视频数据")
+        result = {"url": url, "status": "failed", "error": "无法获取视频数据"}
+    except BaseException as e:
+        progress.done("failed", error=f"{type(e).__name__}: {e}")
+        raise
+    else:
+        statistics = writer.statistics
+        progress.done("success", path=saved_path, total_messages=statistics.total_messages,
+                      fetch_stats=counters)
+        if verbose:
+            print_fetch_summary(statistics.total_messages, counters)
+        say(f"💾 已保存到: {saved_path}")
+        if columnar_path:
+            say(f"🧱 列式导出: {columnar_path}")
+        say(f"📊 统计: {statistics.total_messages} 条消息, "
+            f"{len(statistics.author_ids)} 个用户")
+        result = {
+            "url": url,
+            "status": "success",
+            "path": saved_path,
+            "total_messages": statistics.total_messages,
+            "fetch_stats": counters,
+        }
+    
+    if idx < total and args.sleep_interval > 0:
+        say(f"😴 休眠 {args.sleep_interval} 秒...")
+        start = time.perf_counter()
+        time.sleep(args.sleep_interval)
+        record_stage(metrics, "sleep", start)
+    
+    if run_metrics is not None:
+        run_metrics.add_video(video_info["id"], result["status"], metrics, counters,
+                              result.get("total_messages", 0))
+    return result
+
+
+def print_stage_summary(run):
+    """打印耗时最多的几个阶段和分页延迟分位数"""
+    stages = sorted(run["stages"].items(), key=lambda kv: kv[1]["seconds"], reverse=True)
+    if stages:
+        print("⏱️ 阶段耗时: " + ", ".join(f"{name} {st['seconds']:.1f}s" for name, st in stages[:6]))
+    latency = run["page_latency"]
+    if latency["count"]:
+        print(f"📶 分页延迟: p50 {latency['p50'] * 1000:.0f}ms, p95 {latency['p95'] * 1000:.0f}ms, "
+              f"p99 {latency['p99'] * 1000:.0f}ms ({latency['count']} 页)")
 
 
 def main():
@@ -60,19 +192,60 @@ def main():
         "--save-type",
         type=str,
         default="json",
-        choices=["json"],
-        help="保存类型 (默认: json)"
+        choices=SAVE_TYPES + ("sqlite",),
+        help="保存类型：json 为缩进格式，jsonl / jsonl.gz / jsonl.zst 为每行一条消息的 JSON Lines，"
+             "sqlite 直接逐页写入 --db-path 数据库 (默认: json)"
+    )
+    parser.add_argument(
+        "--columnar-dir",
+        type=str,
+        help="同时导出为 Parquet / Arrow 到该目录（需要 pyarrow）"
+    )
+    parser.add_argument(
+        "--columnar-format",
+        choices=EXPORT_FORMATS,
+        default="parquet",
+        help="列式导出格式 (默认: parquet)"
+    )
+    parser.add_argument(
+        "--partition-by",
+        choices=PARTITIONS,
+        default="video",
+        help="列式导出的分区方式：video 或 month（上传月份）(默认: video)"
     )
     parser.add_argument(
         "--incremental",
         action="store_true",
         help="增量模式：跳过已存在的文件"
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="从上次中断的检查点继续下载（.part/.ckpt 文件）"
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=20,
+        help="每获取多少页保存一次检查点 (默认: 20)"
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="将单个回放按时间分成 N 段并发获取（不保存检查点）(默认: 1)"
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=2,
+        help="解析当前页时最多提前获取的页数，0 表示不预取 (默认: 2)"
+    )
     parser.add_argument(
         "--sleep-interval",
         type=int,
-        default=5,
-        help="视频之间的休眠间隔（秒）(默认: 5)"
+        default=0,
+        help="每个视频下载完成后额外休眠的秒数；请求速率已由自适应限流器控制，一般不需要 (默认: 0)"
     )
     parser.add_argument(
         "--channel",
@@ -80,6 +253,16 @@ def main():
         default="https://www.youtube.com/@chenyifaer/streams",
         help="YouTube 频道直播页面链接 (默认: @chenyifaer)"
     )
+    parser.add_argument(
+        "--full-rescan",
+        action="store_true",
+        help="忽略频道列表缓存，完整重新获取频道直播列表"
+    )
+    parser.add_argument(
+        "--no-channel-cache",
+        action="store_true",
+        help="不使用频道列表缓存（每次完整获取且不写入缓存）"
+    )
     parser.add_argument(
         "--url",
         type=str,
@@ -94,10 +277,103 @@ def main():
         "--db-path",
         type=str,
         default="chat_database.db",
-        help="SQLite数据库路径（配合--auto-import-db使用，默认: chat_database.db）"
+        help="SQLite数据库路径（配合--auto-import-db或--save-type sqlite使用，默认: chat_database.db）"
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=10,
+        help="HTTP 连接池大小 (默认: 10)"
+    )
+    parser.add_argument(
+        "--no-keep-alive",
+        action="store_true",
+        help="禁用 HTTP keep-alive（每个请求新建连接）"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="同时下载的视频数量 (默认: 1)"
+    )
+    parser.add_argument(
+        "--max-inflight",
+        type=int,
+        default=4,
+        help="所有视频共享的最大并发请求数 (默认: 4)"
+    )
+    parser.add_argument(
+        "--max-rate",
+        type=float,
+        default=20.0,
+        help="自适应限速的最大请求速率（次/秒）(默认: 20)"
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=8,
+        help="单个聊天分页请求的最大尝试次数 (默认: 8)"
+    )
+    parser.add_argument(
+        "--api-base",
+        type=str,
+        default="https://www.youtube.com",
+        help="InnerTube 接口地址，可指向本地桩服务器 (默认: https://www.youtube.com)"
+    )
+    parser.add_argument(
+        "--metrics-json",
+        type=str,
+        help="运行结束后把分阶段耗时/流量统计写入该 JSON 文件"
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        type=str,
+        help="运行结束后把统计写入该 Prometheus textfile（node_exporter textfile collector）"
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="只输出警告、错误和最终统计"
+    )
+    parser.add_argument(
+        "--progress",
+        choices=LEVELS[1:],
+        default="status",
+        help="进度输出：status 限频状态行，sample 另外抽样回显消息，all 回显每条消息 (默认: status)"
+    )
+    parser.add_argument(
+        "--sample-every",
+        type=int,
+        default=100,
+        help="--progress sample 时每 N 条消息回显一条 (默认: 100)"
+    )
+    parser.add_argument(
+        "--log-json",
+        type=str,
+        help="把进度和每个视频的结果以 JSON Lines 追加写入该文件"
     )
     
     args = parser.parse_args()
+    reporter = ProgressReporter(
+        "quiet" if args.quiet else args.progress,
+        sample_every=args.sample_every,
+        log_path=args.log_json,
+    )
+    
+    try:
+        if args.save_type == "jsonl.zst":
+            require_zstandard()
+        if args.columnar_dir:
+            require_pyarrow()
+        if args.save_type == "sqlite" or args.auto_import_db:
+            # 旧版结构的数据库需要先用 ytchat-import --migrate 转换
+            init_database(args.db_path).close()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+    if args.save_type == "sqlite":
+        if args.resume:
+            print("⚠️ --save-type sqlite 按视频整体提交，不支持 --resume，未完成的视频会重新下载")
     
     cookies_file = args.cookies if os.path.exists(args.cookies) else None
     if not cookies_file:
@@ -105,81 +381,88 @@ def main():
     
     if args.url:
         video_urls = [args.url]
-        print(f"📺 处理单个视频: {args.url}")
+        reporter.info(f"📺 处理单个视频: {args.url}")
     else:
-        print(f"🔍 正在获取频道的直播视频列表: {args.channel}")
-        video_urls = get_livestream_urls(args.channel, cookies_file)
-        print(f"✅ 找到 {len(video_urls)} 个直播视频")
+        reporter.info(f"🔍 正在获取频道的直播视频列表: {args.channel}")
+        cache_path = None
+        if not args.no_channel_cache:
+            cache_path = channel_cache_path(
+                args.channel, os.path.join(args.output_dir, ".channel_cache")
+            )
+        video_urls = get_livestream_urls(
+            args.channel, cookies_file, cache_path=cache_path, full_rescan=args.full_rescan
+        )
+        reporter.info(f"✅ 找到 {len(video_urls)} 个直播视频")
     
     if not video_urls:
         print("❌ 没有找到任何直播视频")
         return
     
-    successful = 0
-    skipped = 0
-    failed = 0
+    session = ChatSession(
+        pool_size=max(args.pool_size, args.jobs * args.shards),
+        keep_alive=not args.no_keep_alive,
+        max_inflight=args.max_inflight,
+        limiter=AdaptiveRateLimiter(max_rate=args.max_rate),
+        max_retries=args.max_retries,
+        api_base=args.api_base,
+    )
     
-    for idx, url in enumerate(video_urls, 1):
-        print(f"\n{'='*60}")
-        print(f"处理视频 {idx}/{len(video_urls)}: {url}")
-        print(f"{'='*60}")
-        
-        try:
-            from .fetcher import get_video_info
-            video_info = get_video_info(url, cookies_file)
-            filename = generate_filename(video_info)
-            filepath = os.path.join(args.output_dir, filename)
-            
-            if args.incremental and os.path.exists(filepath):
-                print(f"⏭️ 跳过已存在的文件: {filename}")
-                skipped += 1
-                continue
-            
-            data = fetch_video_chat(url, cookies_file, verbose=True)
-            
-            if data:
-                saved_path = save_to_json(data, args.output_dir)
-                print(f"💾 已保存到: {saved_path}")
-                print(f"📊 统计: {data['statistics']['total_messages']} 条消息, "
-                      f"{data['statistics']['unique_authors']} 个用户")
-                successful += 1
-            else:
-                print(f"❌ 无法获取视频数据")
-                failed += 1
-            
-            if idx < len(video_urls):
-                print(f"😴 休眠 {args.sleep_interval} 秒...")
-                time.sleep(args.sleep_interval)
-                
-        except KeyboardInterrupt:
-            print("\n\n⚠️ 用户中断，退出程序...")
-            break
-        except Exception as e:
-            print(f"❌ 处理失败: {e}")
-            failed += 1
-            import traceback
-            traceback.print_exc()
+    started = time.time()
+    run_metrics = RunMetrics()
+    cancel = threading.Event()
+    results = run_downloads(
+        video_urls,
+        lambda idx, url: process_video(idx, url, len(video_urls), args, cookies_file, session,
+                                       run_metrics, reporter, cancel),
+        jobs=args.jobs,
+        cancel=cancel,
+    )
+    summary = summarize_results(results)
+    successful = summary["successful"]
     
     print(f"\n{'='*60}")
     print(f"📊 最终统计")
     print(f"{'='*60}")
     print(f"✅ 成功: {successful}")
-    print(f"⏭️ 跳过: {skipped}")
-    print(f"❌ 失败: {failed}")
+    print(f"⏭️ 跳过: {summary['skipped']}")
+    print(f"❌ 失败: {summary['failed']}")
+    for failed_url, error in summary["failures"]:
+        print(f"   - {failed_url}: {error}")
+    print(f"💬 消息总数: {summary['total_messages']}")
+    print(f"🚦 限流: {summary['throttled']} 次, 重试: {summary['retries']} 次")
+    print(f"⏱️ 总耗时: {time.time() - started:.1f} 秒")
     print(f"📁 输出目录: {args.output_dir}")
     
+    conn_stats = session.connection_stats()
+    session.close()
+    print(f"🔌 HTTP 请求: {conn_stats['requests']} 次, "
+          f"新建连接: {conn_stats['connections']} 个, "
+          f"复用率: {conn_stats['reuse_ratio']:.1%}")
+    print_stage_summary(run_metrics.summary()["run"])
+    
     # 自动导入到数据库
-    if args.auto_import_db and successful > 0:
+    # --save-type sqlite 已经直接写入数据库
+    if args.auto_import_db and successful > 0 and args.save_type != "sqlite":
         print(f"\n{'='*60}")
         print(f"📥 自动导入到数据库")
         print(f"{'='*60}")
         from .db_importer import import_directory_to_db
+        start = time.perf_counter()
         import_directory_to_db(
             args.output_dir,
             args.db_path,
             incremental=True,
-            verbose=True
+            verbose=not args.quiet
         )
+        run_metrics.run_stages.add("db_import", time.perf_counter() - start)
+    
+    if args.metrics_json:
+        run_metrics.write_json(args.metrics_json)
+        print(f"📈 统计已写入: {args.metrics_json}")
+    if args.metrics_prom:
+        run_metrics.write_prometheus(args.metrics_prom)
+        print(f"📈 Prometheus 指标已写入: {args.metrics_prom}")
+    reporter.close()
 
 
 if __name__ == "__main__":
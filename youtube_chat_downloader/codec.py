@@ -0,0 +1,74 @@
+"""JSON 编解码层
+
+安装了 orjson 时使用 orjson，否则回退到标准库 json。所有函数都可以直接处理
+bytes，不必先解码成 str。设置环境变量 YTCHAT_JSON=json 可强制使用标准库。
+
+保存的聊天 JSON 文件（indent=2 格式）仍由 writers 模块按标准库的格式生成，
+不受后端影响。
+"""
+
+import os
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_json_decoder = json.JSONDecoder()
+# 观看页面中内嵌 JSON 之后常见的结束标记
+_PAGE_JSON_TERMINATORS = (";</script>", ";var ")
+
+
+def _stdlib_loads(data):
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+BACKENDS = {"json": (_stdlib_loads, _stdlib_dumps)}
+if orjson is not None:
+    BACKENDS["orjson"] = (orjson.loads, orjson.dumps)
+
+BACKEND = None
+loads = None
+dumps = None
+
+
+def use_backend(name=None):
+    """切换后端；name 为 None 时按 YTCHAT_JSON 环境变量或可用性选择"""
+    global BACKEND, loads, dumps
+    if name is None:
+        name = os.environ.get("YTCHAT_JSON") or ("orjson" if "orjson" in BACKENDS else "json")
+    if name not in BACKENDS:
+        raise ValueError(f"不可用的 JSON 后端: {name}（可用: {', '.join(BACKENDS)}）")
+    BACKEND = name
+    loads, dumps = BACKENDS[name]
+    return name
+
+
+use_backend()
+
+
+def load_file(path):
+    """以二进制读取并解析 JSON 文件"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def raw_decode(text, pos=0):
+    """从 text[pos] 开始解码恰好一个 JSON 值，返回 (值, 结束位置)
+
+    先尝试把到下一个 ;</script> 或 ;var 为止的片段整体交给当前后端解析；
+    片段不是完整的单个 JSON 值时解析会失败，此时回退到 JSONDecoder.raw_decode。
+    """
+    if BACKEND != "json":
+        ends = sorted(e for e in (text.find(t, pos) for t in _PAGE_JSON_TERMINATORS) if e > pos)
+        for end in ends:
+            try:
+                return loads(text[pos:end]), end
+            except ValueError:
+                continue
+    return _json_decoder.raw_decode(text, pos)
@@ -0,0 +1,233 @@
+"""Parquet / Arrow IPC 列式导出
+
+每个视频一个文件，列为 video_id、offset_ms (int64)、author_id、author 和 message，
+其中 video_id、author_id、author 为字典编码。目录按 Hive 风格分区：
+
+    partition_by="video":  {output_dir}/video_id=<id>/<id>.parquet
+    partition_by="month":  {output_dir}/upload_month=YYYY-MM/<id>.parquet
+
+按视频分区时 video_id 由目录名提供，不再重复写入文件。用
+pyarrow.dataset.dataset(output_dir, partitioning="hive") 读取时可以按分区裁剪目录，
+offset_ms 等列的过滤条件会下推到 row group 统计信息。需要安装 pyarrow。
+"""
+
+import os
+import time
+import sqlite3
+from pathlib import Path
+from .messages import as_messages
+from .jsonl import find_chat_files, load_chat_file
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_FORMATS = ("parquet", "arrow")
+PARTITIONS = ("video", "month")
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+# 每个 row group / record batch 的行数
+BATCH_ROWS = 65536
+PARQUET_COMPRESSION = "zstd"
+
+
+def require_pyarrow():
+    if pyarrow is None:
+        raise RuntimeError('Parquet / Arrow 导出需要安装 pyarrow：pip install "youtube-chat-downloader[arrow]"')
+
+
+def chat_schema(partition_by="video"):
+    """导出文件的 Arrow schema"""
+    require_pyarrow()
+    pa = pyarrow
+    dict_string = pa.dictionary(pa.int32(), pa.string())
+    fields = [
+        ("offset_ms", pa.int64()),
+        ("author_id", dict_string),
+        ("author", dict_string),
+        ("message", pa.string()),
+    ]
+    if partition_by != "video":
+        fields.insert(0, ("video_id", dict_string))
+    return pa.schema(fields)
+
+
+def partition_dir(video_info, partition_by):
+    """视频所在的分区目录名"""
+    if partition_by == "video":
+        return f"video_id={video_info['id']}"
+    upload_date = video_info.get("upload_date") or ""
+    if len(upload_date) >= 6 and upload_date[:6].isdigit():
+        return f"upload_month={upload_date[:4]}-{upload_date[4:6]}"
+    return "upload_month=unknown"
+
+
+class ColumnarChatWriter:
+    """逐页追加消息的 Parquet / Arrow IPC 写入器
+
+    消息按列缓存，每满 batch_rows 行写出一个 row group（Parquet）或 record batch
+    （Arrow）。数据先写入 .part 文件，close() 时再原子地重命名为最终文件名。
+    Arrow IPC 文件格式要求同一列的字典在文件内不变，因此 Arrow 格式在 close()
+    时统一字典后一次写出。
+    """
+
+    def __init__(self, output_dir, video_info, fmt="parquet", partition_by="video", batch_rows=BATCH_ROWS):
+        require_pyarrow()
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"未知的导出格式: {fmt}")
+        if partition_by not in PARTITIONS:
+            raise ValueError(f"未知的分区方式: {partition_by}")
+        directory = os.path.join(output_dir, partition_dir(video_info, partition_by))
+        os.makedirs(directory, exist_ok=True)
+        self.video_id = video_info["id"]
+        self.fmt = fmt
+        self.partition_by = partition_by
+        self.batch_rows = batch_rows
+        self.schema = chat_schema(partition_by)
+        self.path = os.path.join(directory, self.video_id + EXTENSIONS[fmt])
+        self.part_path = self.path + ".part"
+        self.rows = 0
+
+        self._columns = ([], [], [], [])
+        self._batches = []
+        self._writer = None
+        if fmt == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(
+                self.part_path, self.schema, compression=PARQUET_COMPRESSION
+            )
+        self.closed = False
+
+    def write(self, messages):
+        """追加一页消息（ChatMessage 或字典）"""
+        offsets, author_ids, authors, texts = self._columns
+        for m in as_messages(messages):
+            offsets.append(m.offset_ms)
+            author_ids.append(m.author_id)
+            authors.append(m.author)
+            texts.append(m.message)
+        if len(offsets) >= self.batch_rows:
+            self._flush()
+
+    def write_rows(self, rows):
+        """追加 (offset_ms, author_id, author, message) 元组，例如数据库查询结果"""
+        offsets, author_ids, authors, texts = self._columns
+        for offset_ms, author_id, author, message in rows:
+            offsets.append(offset_ms)
+            author_ids.append(author_id)
+            authors.append(author)
+            texts.append(message)
+        if len(offsets) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        offsets, author_ids, authors, texts = self._columns
+        if not offsets:
+            return
+        pa = pyarrow
+        arrays = [
+            pa.array(offsets, pa.int64()),
+            pa.array(author_ids, pa.string()).dictionary_encode(),
+            pa.array(authors, pa.string()).dictionary_encode(),
+            pa.array(texts, pa.string()),
+        ]
+        if self.partition_by != "video":
+            arrays.insert(0, pa.DictionaryArray.from_arrays(
+                pa.array([0] * len(offsets), pa.int32()), pa.array([self.video_id])
+            ))
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        self.rows += len(offsets)
+        self._columns = ([], [], [], [])
+        if self._writer is not None:
+            self._writer.write_batch(batch)
+        else:
+            self._batches.append(batch)
+
+    def close(self):
+        """写出剩余的行并生成最终文件，返回文件路径"""
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+        else:
+            table = pyarrow.Table.from_batches(self._batches, schema=self.schema)
+            table = table.unify_dictionaries().combine_chunks()
+            with pyarrow.ipc.new_file(self.part_path, self.schema) as writer:
+                writer.write_table(table)
+            self._batches = []
+        self.closed = True
+        os.replace(self.part_path, self.path)
+        return self.path
+
+    def abort(self):
+        """放弃写入并删除临时文件"""
+        if self._writer is not None:
+            self._writer.close()
+        self.closed = True
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and not self.closed:
+            self.abort()
+
+
+def export_chat_file(path, output_dir, fmt="parquet", partition_by="video"):
+    """把一个聊天回放文件（任意保存类型）导出为列式文件，返回 (输出路径, 行数)"""
+    data = load_chat_file(path)
+    with ColumnarChatWriter(output_dir, data["video_info"], fmt, partition_by) as writer:
+        writer.write(data["messages"])
+        return writer.close(), writer.rows
+
+
+def export_chat_directory(json_dir, output_dir, fmt="parquet", partition_by="video", verbose=True):
+    """导出目录中的所有聊天回放文件，返回 (文件数, 行数)"""
+    files = find_chat_files(json_dir)
+    total_rows = 0
+    for idx, path in enumerate(files, 1):
+        out_path, rows = export_chat_file(path, output_dir, fmt, partition_by)
+        total_rows += rows
+        if verbose:
+            print(f"[{idx}/{len(files)}] {Path(path).name} → {out_path} ({rows} 行)")
+    return len(files), total_rows
+
+
+def export_database(db_path, output_dir, fmt="parquet", partition_by="video",
+                    batch_rows=BATCH_ROWS, verbose=True):
+    """把 chat_database.db 中的每个视频导出为列式文件，返回 (视频数, 行数)
+
+    按视频流式读取（fetchmany），内存占用与单个 batch 相当。
+    """
+    require_pyarrow()
+    conn = sqlite3.connect(db_path)
+    try:
+        videos = conn.execute(
+            'SELECT video_id, upload_date FROM videos ORDER BY upload_date, video_id'
+        ).fetchall()
+        total_rows = 0
+        for idx, (video_id, upload_date) in enumerate(videos, 1):
+            start = time.perf_counter()
+            video_info = {"id": video_id, "upload_date": upload_date or ""}
+            with ColumnarChatWriter(output_dir, video_info, fmt, partition_by, batch_rows) as writer:
+                cursor = conn.execute('''
+                    SELECT offset_ms, author_id, author, message
+                    FROM chat_messages WHERE video_id = ?
+                    ORDER BY offset_ms
+                ''', (video_id,))
+                while True:
+                    rows = cursor.fetchmany(batch_rows)
+                    if not rows:
+                        break
+                    writer.write_rows(rows)
+                out_path = writer.close()
+            total_rows += writer.rows
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(f"[{idx}/{len(videos)}] {video_id} → {out_path} "
+                      f"({writer.rows} 行, {elapsed:.2f} 秒)")
+        return len(videos), total_rows
+    finally:
+        conn.close()
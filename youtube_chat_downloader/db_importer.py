@@ -1,62 +1,171 @@
-"""JSON 文件导入到 SQLite 数据库模块"""
+"""JSON / JSONL 文件导入到 SQLite 数据库模块"""
 
 import os
-import json
+import time
+import hashlib
 import sqlite3
 from pathlib import Path
 from datetime import datetime
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from .jsonl import load_chat_file, find_chat_files
+
+# 数据库结构版本（PRAGMA user_version）
+#   v1: chat_messages 表，每行保存完整的 video_id / author / author_id / time_text 字符串
+#   v2: videos / authors 维度表以整数为键，messages 表只保存整数键、offset_ms 和消息文本，
+#       chat_messages 改为兼容视图（time_text 由 offset_ms 计算）
+SCHEMA_VERSION = 2
+
+# messages 的二级索引（批量导入时先删除，结束后一次性重建）
+MESSAGE_INDEXES = {
+    "idx_messages_video": "CREATE INDEX IF NOT EXISTS idx_messages_video ON messages(video_key, offset_ms)",
+    "idx_messages_author": "CREATE INDEX IF NOT EXISTS idx_messages_author ON messages(author_key)",
+}
+# 每次 executemany 的行数
+BATCH_SIZE = 10000
+# 批量导入时的页缓存大小（KiB）
+BULK_CACHE_KIB = 256 * 1024
+
+# 由 offset_ms 计算 time_text，非负偏移时与 fetcher.ms_to_timestamp 的结果一致
+TIME_TEXT_SQL = '''CASE
+        WHEN {offset} >= 3600000 THEN ({offset} / 3600000) || ':'
+            || printf('%02d:%02d', {offset} / 60000 % 60, {offset} / 1000 % 60)
+        ELSE ({offset} / 60000) || ':' || printf('%02d', {offset} / 1000 % 60)
+    END'''
+
+SCHEMA_SQL = [
+    # 视频信息表
+    '''
+    CREATE TABLE IF NOT EXISTS videos (
+        id INTEGER PRIMARY KEY,
+        video_id TEXT NOT NULL UNIQUE,
+        title TEXT,
+        duration INTEGER,
+        upload_date TEXT,
+        url TEXT,
+        total_messages INTEGER,
+        unique_authors INTEGER,
+        time_range_min TEXT,
+        time_range_max TEXT,
+        imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    # 作者表：每个 (频道ID, 显示名称) 组合一行
+    '''
+    CREATE TABLE IF NOT EXISTS authors (
+        id INTEGER PRIMARY KEY,
+        author_id TEXT NOT NULL,
+        author TEXT NOT NULL,
+        UNIQUE (author_id, author)
+    )
+    ''',
+    # 聊天消息表；time_text 只在与 offset_ms 计算出的文本不同时保存，否则为 NULL
+    '''
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY,
+        video_key INTEGER NOT NULL REFERENCES videos(id),
+        author_key INTEGER NOT NULL REFERENCES authors(id),
+        offset_ms INTEGER,
+        message TEXT,
+        time_text TEXT
+    )
+    ''',
+    # 与 v1 的 chat_messages 表列名相同的兼容视图
+    f'''
+    CREATE VIEW IF NOT EXISTS chat_messages AS
+    SELECT
+        m.id AS id,
+        v.video_id AS video_id,
+        COALESCE(m.time_text, {TIME_TEXT_SQL.format(offset="m.offset_ms")}) AS time_text,
+        a.author AS author,
+        a.author_id AS author_id,
+        m.message AS message,
+        m.offset_ms AS offset_ms
+    FROM messages m
+    JOIN videos v ON v.id = m.video_key
+    JOIN authors a ON a.id = m.author_key
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_video_upload_date ON videos(upload_date)
+    ''',
+    # 导入清单表（目录导入时记录每个文件的状态，未变化的文件只需 stat() 即可跳过）
+    '''
+    CREATE TABLE IF NOT EXISTS import_manifest (
+        path TEXT PRIMARY KEY,
+        size INTEGER,
+        mtime_ns INTEGER,
+        content_hash TEXT,
+        video_id TEXT,
+        message_count INTEGER,
+        imported_at TIMESTAMP
+    )
+    ''',
+]
+
+INSERT_MESSAGE_SQL = '''
+    INSERT INTO messages
+    (video_key, author_key, offset_ms, message, time_text)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+UPSERT_VIDEO_SQL = '''
+    INSERT INTO videos
+    (video_id, title, duration, upload_date, url,
+     total_messages, unique_authors, time_range_min, time_range_max, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (video_id) DO UPDATE SET
+        title = excluded.title,
+        duration = excluded.duration,
+        upload_date = excluded.upload_date,
+        url = excluded.url,
+        total_messages = excluded.total_messages,
+        unique_authors = excluded.unique_authors,
+        time_range_min = excluded.time_range_min,
+        time_range_max = excluded.time_range_max,
+        updated_at = excluded.updated_at
+'''
+
+UPSERT_MANIFEST_SQL = '''
+    INSERT OR REPLACE INTO import_manifest
+    (path, size, mtime_ns, content_hash, video_id, message_count, imported_at)
+    VALUES (:path, :size, :mtime_ns, :content_hash, :video_id, :message_count, :imported_at)
+'''
+
+
+def schema_version(conn):
+    """数据库的结构版本；没有设置 user_version 但有 chat_messages 表的是 v1"""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version == 0 and conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_messages'"
+    ).fetchone():
+        return 1
+    return version
 
 
 def init_database(db_path):
-    """初始化SQLite数据库"""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    """初始化SQLite数据库（v2 结构）
     
-    # 创建视频信息表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS videos (
-            video_id TEXT PRIMARY KEY,
-            title TEXT,
-            duration INTEGER,
-            upload_date TEXT,
-            url TEXT,
-            total_messages INTEGER,
-            unique_authors INTEGER,
-            time_range_min TEXT,
-            time_range_max TEXT,
-            imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # 创建聊天消息表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS chat_messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            video_id TEXT,
-            time_text TEXT,
-            author TEXT,
-            author_id TEXT,
-            message TEXT,
-            offset_ms INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (video_id) REFERENCES videos(video_id)
+    v1 结构的数据库不会被自动转换，抛出 RuntimeError 提示先运行 ytchat-import --migrate。
+    已是 v2 的数据库上不做任何写入（IF NOT EXISTS 的语句不会加写锁），因此可以在
+    其他连接持有写事务时调用。
+    """
+    conn = sqlite3.connect(db_path)
+    version = schema_version(conn)
+    if version == 1:
+        conn.close()
+        raise RuntimeError(
+            f"数据库 {db_path} 是旧版结构 (v1)，请先转换: ytchat-import --migrate --db-path {db_path}"
         )
-    ''')
-    
-    # 创建索引
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_video_id ON chat_messages(video_id)
-    ''')
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_offset ON chat_messages(offset_ms)
-    ''')
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_author_id ON chat_messages(author_id)
-    ''')
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_video_upload_date ON videos(upload_date)
-    ''')
+    cursor = conn.cursor()
+    for sql in SCHEMA_SQL:
+        cursor.execute(sql)
+    for sql in MESSAGE_INDEXES.values():
+        cursor.execute(sql)
+    if version == 0:
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
     
     conn.commit()
     return conn
@@ -70,49 +179,66 @@ def video_exists(cursor, video_id):
 
 def get_video_message_count(cursor, video_id):
     """获取视频的消息数量"""
-    cursor.execute('SELECT COUNT(*) FROM chat_messages WHERE video_id = ?', (video_id,))
+    cursor.execute('''
+        SELECT COUNT(*) FROM messages
+        WHERE video_key = (SELECT id FROM videos WHERE video_id = ?)
+    ''', (video_id,))
     return cursor.fetchone()[0]
 
 
-def import_json_to_db(json_path, conn, incremental=True, verbose=True):
-    """导入单个JSON文件到数据库
-    
-    Args:
-        json_path: JSON文件路径
-        conn: 数据库连接
-        incremental: 是否增量导入（跳过已存在的视频）
-        verbose: 是否显示详细信息
+# 按秒缓存 offset_ms 对应的 time_text
+_time_texts = {}
+
+
+def stored_time_text(time_text, offset_ms):
+    """messages.time_text 列要保存的值：与兼容视图计算结果相同时为 None"""
+    if type(offset_ms) is int and offset_ms >= 0:
+        sec = offset_ms // 1000
+        text = _time_texts.get(sec)
+        if text is None:
+            m, s = divmod(sec, 60)
+            h, m = divmod(m, 60)
+            text = _time_texts[sec] = f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+        if text == time_text:
+            return None
+    return time_text
+
+
+def message_rows(messages):
+    """把消息转换为 (author_id, author, offset_ms, message, time_text) 元组列表
     
-    Returns:
-        导入的消息数量，如果跳过则返回0
+    time_text 能由 offset_ms 计算出来时为 None。作者由 insert_messages 换成整数键。
     """
-    cursor = conn.cursor()
-    
-    # 读取JSON文件
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    rows = []
+    for msg in messages:
+        offset_ms = msg.get('offset_ms', 0)
+        rows.append((
+            msg.get('author_id') or '',
+            msg.get('author') or '',
+            offset_ms,
+            msg.get('message', ''),
+            stored_time_text(msg.get('time_text', '0:00'), offset_ms)
+        ))
+    return rows
+
+
+def decode_chat_file(json_path):
+    """读取并解码一个聊天回放文件，返回 (video_info, statistics, rows)
     
+    只做文件读取和解析，不访问数据库，可以在子进程中运行。
+    """
+    data = load_chat_file(json_path)
     video_info = data.get('video_info', {})
-    messages = data.get('messages', [])
     statistics = data.get('statistics', {})
-    
+    rows = message_rows(data.get('messages', []))
+    return video_info, statistics, rows
+
+
+def upsert_video(cursor, video_info, statistics):
+    """插入或更新 videos 行（保留原来的整数键），返回视频的整数键"""
     video_id = video_info.get('id', 'unknown')
-    
-    # 检查增量模式
-    if incremental and video_exists(cursor, video_id):
-        existing_count = get_video_message_count(cursor, video_id)
-        if verbose:
-            print(f"⏭️ 跳过已存在的视频: {video_id} (已有 {existing_count} 条消息)")
-        return 0
-    
-    # 插入或更新视频信息
     time_range = statistics.get('time_range', {})
-    cursor.execute('''
-        INSERT OR REPLACE INTO videos 
-        (video_id, title, duration, upload_date, url, 
-         total_messages, unique_authors, time_range_min, time_range_max, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
+    cursor.execute(UPSERT_VIDEO_SQL, (
         video_id,
         video_info.get('title', ''),
         video_info.get('duration', 0),
@@ -124,44 +250,235 @@ def import_json_to_db(json_path, conn, incremental=True, verbose=True):
         time_range.get('max', '0:00'),
         datetime.now().isoformat()
     ))
+    cursor.execute('SELECT id FROM videos WHERE video_id = ?', (video_id,))
+    return cursor.fetchone()[0]
+
+
+def author_keys(cursor, pairs, cache):
+    """把 (author_id, author) 映射为 authors 表的整数键，缺少的作者会被插入
     
-    # 如果不是增量模式且视频已存在，先删除旧消息
-    if not incremental and video_exists(cursor, video_id):
-        cursor.execute('DELETE FROM chat_messages WHERE video_id = ?', (video_id,))
+    cache 是调用方在同一个连接上复用的 {(author_id, author): 键} 字典；
+    事务回滚后其中新插入的键失效，调用方必须清空它。
+    """
+    for pair in pairs:
+        if pair in cache:
+            continue
+        cursor.execute('SELECT id FROM authors WHERE author_id = ? AND author = ?', pair)
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute('INSERT INTO authors (author_id, author) VALUES (?, ?)', pair)
+            cache[pair] = cursor.lastrowid
+        else:
+            cache[pair] = row[0]
+    return cache
+
+
+def insert_messages(cursor, video_key, rows, cache):
+    """插入 message_rows 产生的行（每 BATCH_SIZE 行一次 executemany）"""
+    keys = author_keys(cursor, {(r[0], r[1]) for r in rows}, cache)
+    for i in range(0, len(rows), BATCH_SIZE):
+        cursor.executemany(INSERT_MESSAGE_SQL, [
+            (video_key, keys[r[0], r[1]], r[2], r[3], r[4]) for r in rows[i:i + BATCH_SIZE]
+        ])
+
+
+def file_state(path):
+    """文件的清单记录：绝对路径、大小和修改时间（只调用 stat()）"""
+    path = Path(path).resolve()
+    st = path.stat()
+    return {"path": str(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def file_digest(path):
+    """文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(conn):
+    """读取导入清单，返回 {path: 记录字典}"""
+    cursor = conn.execute('SELECT * FROM import_manifest')
+    columns = [c[0] for c in cursor.description]
+    return {row[0]: dict(zip(columns, row)) for row in cursor}
+
+
+def record_manifest(conn, entry, video_id, message_count):
+    """更新一个文件的清单记录（不提交，与消息写入在同一事务中）"""
+    entry.update(video_id=video_id, message_count=message_count,
+                 imported_at=datetime.now().isoformat())
+    conn.execute(UPSERT_MANIFEST_SQL, entry)
+
+
+def write_video(conn, video_info, statistics, rows, incremental=True, verbose=True, manifest_entry=None,
+                author_cache=None):
+    """把 decode_chat_file 的结果写入数据库，返回导入的消息数量（跳过时返回0）
     
-    # 批量插入消息
-    message_count = 0
-    for msg in messages:
-        cursor.execute('''
-            INSERT INTO chat_messages 
-            (video_id, time_text, author, author_id, message, offset_ms)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            video_id,
-            msg.get('time_text', '0:00'),
-            msg.get('author', ''),
-            msg.get('author_id', ''),
-            msg.get('message', ''),
-            msg.get('offset_ms', 0)
-        ))
-        message_count += 1
+    提供 manifest_entry（file_state() 加上 content_hash）时，清单记录与视频、
+    消息在同一个事务中提交：要么整个文件导入成功，要么数据库保持原样。
+    author_cache 见 author_keys。
+    """
+    cursor = conn.cursor()
+    video_id = video_info.get('id', 'unknown')
     
+    existed = video_exists(cursor, video_id)
+    
+    # 检查增量模式
+    if incremental and existed:
+        existing_count = get_video_message_count(cursor, video_id)
+        if verbose:
+            print(f"⏭️ 跳过已存在的视频: {video_id} (已有 {existing_count} 条消息)")
+        if manifest_entry is not None:
+            record_manifest(conn, manifest_entry, video_id, existing_count)
+            conn.commit()
+        return 0
+    
+    # 插入或更新视频信息；视频原来就存在时才需要删除旧消息
+    video_key = upsert_video(cursor, video_info, statistics)
+    if existed:
+        cursor.execute('DELETE FROM messages WHERE video_key = ?', (video_key,))
+    
+    insert_messages(cursor, video_key, rows, {} if author_cache is None else author_cache)
+    
+    if manifest_entry is not None:
+        record_manifest(conn, manifest_entry, video_id, len(rows))
     conn.commit()
     
     if verbose:
-        print(f"✅ 导入视频: {video_id} - {video_info.get('title', 'Unknown')} ({message_count} 条消息)")
+        print(f"✅ 导入视频: {video_id} - {video_info.get('title', 'Unknown')} ({len(rows)} 条消息)")
     
-    return message_count
+    return len(rows)
 
 
-def import_directory_to_db(json_dir, db_path, incremental=True, verbose=True):
+def import_json_to_db(json_path, conn, incremental=True, verbose=True):
+    """导入单个聊天回放文件到数据库
+    
+    Args:
+        json_path: 聊天回放文件路径（.json / .jsonl / .jsonl.gz / .jsonl.zst）
+        conn: 数据库连接
+        incremental: 是否增量导入（跳过已存在的视频）
+        verbose: 是否显示详细信息
+    
+    Returns:
+        导入的消息数量，如果跳过则返回0
+    """
+    video_info, statistics, rows = decode_chat_file(json_path)
+    return write_video(conn, video_info, statistics, rows, incremental, verbose)
+
+
+def iter_decoded(paths, workers=1):
+    """按输入顺序产出 (path, decode_chat_file 的结果, 异常)
+    
+    workers > 1 时在进程池中解码，最多 2 * workers 个文件同时在途，
+    内存占用不随文件数增长；调用方在单个连接上依次写入。
+    """
+    if workers <= 1:
+        for path in paths:
+            try:
+                yield path, decode_chat_file(path), None
+            except Exception as e:
+                yield path, None, e
+        return
+    
+    paths = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque(
+            (path, pool.submit(decode_chat_file, path)) for path in islice(paths, 2 * workers)
+        )
+        while pending:
+            path, future = pending.popleft()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(decode_chat_file, next_path)))
+            try:
+                yield path, future.result(), None
+            except Exception as e:
+                yield path, None, e
+
+
+@contextmanager
+def bulk_load(conn, cache_kib=BULK_CACHE_KIB, verbose=True):
+    """批量导入模式
+    
+    导入期间使用 WAL、synchronous=OFF 和更大的页缓存，并删除 messages 的
+    二级索引，结束时（包括出错时）一次性重建索引并恢复原来的设置。
+    数据库中已有视频时保留 idx_messages_video，重新导入时按视频删除旧消息需要它，
+    否则每次删除都要扫描整张表。新视频不会执行删除。
+    """
+    journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    synchronous = conn.execute('PRAGMA synchronous').fetchone()[0]
+    cache_size = conn.execute('PRAGMA cache_size').fetchone()[0]
+    conn.commit()
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute(f'PRAGMA cache_size=-{int(cache_kib)}')
+    
+    has_rows = conn.execute(
+        'SELECT EXISTS (SELECT 1 FROM messages) OR EXISTS (SELECT 1 FROM videos)'
+    ).fetchone()[0] == 1
+    dropped = [name for name in MESSAGE_INDEXES if not (has_rows and name == "idx_messages_video")]
+    for name in dropped:
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.commit()
+        start = time.perf_counter()
+        for name in dropped:
+            conn.execute(MESSAGE_INDEXES[name])
+        conn.commit()
+        if verbose:
+            print(f"🗂️ 重建索引 {', '.join(dropped)}: {time.perf_counter() - start:.1f} 秒")
+        conn.execute(f'PRAGMA synchronous={int(synchronous)}')
+        conn.execute(f'PRAGMA cache_size={int(cache_size)}')
+        conn.execute(f'PRAGMA journal_mode={journal_mode}')
+
+
+def plan_import(conn, json_files, incremental=True):
+    """根据导入清单挑出需要导入的文件
+    
+    增量模式下，大小和修改时间与清单一致的文件直接跳过，不读取内容；
+    只有修改时间变了而内容哈希相同的文件只更新清单。
+    
+    Returns:
+        ([(path, 清单记录, 是否已导入过)], 未变化的文件数)
+    """
+    manifest = load_manifest(conn)
+    pending = []
+    unchanged = 0
+    for path in json_files:
+        entry = file_state(path)
+        old = manifest.get(entry["path"])
+        if incremental and old and (old["size"], old["mtime_ns"]) == (entry["size"], entry["mtime_ns"]):
+            unchanged += 1
+            continue
+        entry["content_hash"] = file_digest(path)
+        if incremental and old and old["content_hash"] == entry["content_hash"]:
+            record_manifest(conn, entry, old["video_id"], old["message_count"])
+            unchanged += 1
+            continue
+        pending.append((path, entry, old is not None))
+    conn.commit()
+    return pending, unchanged
+
+
+def import_directory_to_db(json_dir, db_path, incremental=True, verbose=True, bulk=False, workers=1):
     """导入整个目录的JSON文件到数据库
     
+    每个文件的大小、修改时间、内容哈希、视频ID和消息数记录在 import_manifest 表中。
+    增量模式下未变化的文件按清单跳过；清单中已有但内容变了的文件会重新导入，
+    旧消息的删除、新消息的插入和清单更新在同一个事务中完成。
+    
     Args:
         json_dir: JSON文件目录
         db_path: 数据库文件路径
         incremental: 是否增量导入
         verbose: 是否显示详细信息
+        bulk: 是否使用批量导入模式（见 bulk_load）
+        workers: 解码文件的进程数；写入始终在单个连接上按文件顺序进行
     
     Returns:
         (成功数, 跳过数, 失败数, 总消息数)
@@ -171,43 +488,70 @@ def import_directory_to_db(json_dir, db_path, incremental=True, verbose=True):
         print(f"❌ 目录不存在: {json_dir}")
         return (0, 0, 0, 0)
     
-    # 获取所有JSON文件
-    json_files = list(json_dir.glob('*.json'))
+    # 获取所有聊天回放文件（JSON 和 JSONL）
+    json_files = find_chat_files(json_dir)
     if not json_files:
-        print(f"⚠️ 目录中没有找到JSON文件: {json_dir}")
+        print(f"⚠️ 目录中没有找到JSON/JSONL文件: {json_dir}")
         return (0, 0, 0, 0)
     
     if verbose:
-        print(f"📂 找到 {len(json_files)} 个JSON文件")
+        print(f"📂 找到 {len(json_files)} 个聊天回放文件")
         print(f"💾 数据库: {db_path}")
         print(f"🔄 增量模式: {'开启' if incremental else '关闭'}")
+        if bulk:
+            print("🚚 批量导入模式: 开启")
+        if workers > 1:
+            print(f"🧵 解码进程数: {workers}")
         print()
     
     # 初始化数据库
-    conn = init_database(db_path)
+    try:
+        conn = init_database(db_path)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return (0, 0, 0, 0)
     
     success_count = 0
     skip_count = 0
     fail_count = 0
     total_messages = 0
     
-    for idx, json_file in enumerate(json_files, 1):
-        if verbose:
-            print(f"[{idx}/{len(json_files)}] 处理: {json_file.name}")
-        
-        try:
-            message_count = import_json_to_db(json_file, conn, incremental, verbose)
-            if message_count > 0:
-                success_count += 1
-                total_messages += message_count
-            else:
-                skip_count += 1
-        except Exception as e:
-            fail_count += 1
+    start = time.perf_counter()
+    pending, skip_count = plan_import(conn, json_files, incremental)
+    if verbose and skip_count:
+        print(f"⏭️ 跳过未变化的文件: {skip_count} 个 (导入清单)")
+    
+    with bulk_load(conn, verbose=verbose) if bulk and pending else nullcontext():
+        entries = {path: (entry, changed) for path, entry, changed in pending}
+        author_cache = {}
+        decoded_files = iter_decoded([path for path, _, _ in pending], workers)
+        for idx, (json_file, decoded, error) in enumerate(decoded_files, 1):
+            entry, changed = entries[json_file]
             if verbose:
-                print(f"❌ 导入失败: {e}")
-                import traceback
-                traceback.print_exc()
+                status = "重新导入（文件已变化）" if changed and incremental else "处理"
+                print(f"[{idx}/{len(pending)}] {status}: {json_file.name}")
+        
+            try:
+                if error is not None:
+                    raise error
+                # 清单中已有但内容变了的文件总是替换旧数据
+                message_count = write_video(conn, *decoded, incremental and not changed, verbose,
+                                            manifest_entry=entry, author_cache=author_cache)
+                if message_count > 0:
+                    success_count += 1
+                    total_messages += message_count
+                else:
+                    skip_count += 1
+            except Exception as e:
+                # 丢弃该文件已插入但未提交的行（包括新作者，其缓存的键随之失效）
+                conn.rollback()
+                author_cache.clear()
+                fail_count += 1
+                if verbose:
+                    print(f"❌ 导入失败: {e}")
+                    import traceback
+                    traceback.print_exc()
+    elapsed = time.perf_counter() - start
     
     conn.close()
     
@@ -220,11 +564,101 @@ def import_directory_to_db(json_dir, db_path, incremental=True, verbose=True):
         print(f"⏭️ 跳过: {skip_count} 个视频")
         print(f"❌ 失败: {fail_count} 个视频")
         print(f"💬 总消息数: {total_messages} 条")
+        print(f"⚡ 速度: {total_messages / max(elapsed, 1e-9):,.0f} 行/秒 ({elapsed:.1f} 秒)")
         print(f"💾 数据库: {db_path}")
     
     return (success_count, skip_count, fail_count, total_messages)
 
 
+def migrate_database(db_path, verbose=True):
+    """把 v1 结构的数据库原地转换为 v2
+    
+    在一个事务中把旧表改名、按 (author_id, author) 和 video_id 建立维度表、
+    把消息复制到 messages（time_text 与计算结果相同的不再保存），然后删除旧表；
+    任何一步失败都会回滚，数据库保持原样。最后 VACUUM 回收空间，
+    因此转换期间需要大约与原数据库相同大小的额外磁盘空间。
+    
+    Returns:
+        (转换前大小, 转换后大小)，单位为字节；不需要转换时两者相同
+    """
+    if not os.path.exists(db_path):
+        print(f"❌ 数据库不存在: {db_path}")
+        return None
+    
+    size_before = os.path.getsize(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        version = schema_version(conn)
+        if version != 1:
+            if verbose:
+                print(f"✅ 数据库已是 v{version} 结构，无需转换: {db_path}")
+            return (size_before, size_before)
+        
+        if verbose:
+            print(f"🔧 转换数据库结构 v1 → v{SCHEMA_VERSION}: {db_path}")
+        start = time.perf_counter()
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            for name in ("idx_video_id", "idx_offset", "idx_author_id", "idx_video_upload_date"):
+                cursor.execute(f'DROP INDEX IF EXISTS {name}')
+            cursor.execute('ALTER TABLE videos RENAME TO videos_v1')
+            cursor.execute('ALTER TABLE chat_messages RENAME TO chat_messages_v1')
+            for sql in SCHEMA_SQL:
+                cursor.execute(sql)
+            
+            cursor.execute('''
+                INSERT INTO videos
+                (video_id, title, duration, upload_date, url, total_messages, unique_authors,
+                 time_range_min, time_range_max, imported_at, updated_at)
+                SELECT video_id, title, duration, upload_date, url, total_messages, unique_authors,
+                       time_range_min, time_range_max, imported_at, updated_at
+                FROM videos_v1 ORDER BY rowid
+            ''')
+            # 没有 videos 行的消息（理论上不应存在）也要保留
+            cursor.execute('''
+                INSERT OR IGNORE INTO videos (video_id)
+                SELECT DISTINCT video_id FROM chat_messages_v1 WHERE video_id IS NOT NULL
+            ''')
+            cursor.execute('''
+                INSERT OR IGNORE INTO authors (author_id, author)
+                SELECT COALESCE(author_id, ''), COALESCE(author, '')
+                FROM chat_messages_v1 GROUP BY 1, 2 ORDER BY MIN(id)
+            ''')
+            cursor.execute(f'''
+                INSERT INTO messages (id, video_key, author_key, offset_ms, message, time_text)
+                SELECT c.id, v.id, a.id, c.offset_ms, c.message,
+                       CASE WHEN c.time_text IS {TIME_TEXT_SQL.format(offset="c.offset_ms")}
+                            THEN NULL ELSE c.time_text END
+                FROM chat_messages_v1 c
+                JOIN videos v ON v.video_id = c.video_id
+                JOIN authors a ON a.author_id = COALESCE(c.author_id, '') AND a.author = COALESCE(c.author, '')
+                ORDER BY c.id
+            ''')
+            message_count = cursor.rowcount
+            
+            cursor.execute('DROP TABLE chat_messages_v1')
+            cursor.execute('DROP TABLE videos_v1')
+            for sql in MESSAGE_INDEXES.values():
+                cursor.execute(sql)
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        
+        if verbose:
+            print(f"✅ 已转换 {message_count:,} 条消息 ({time.perf_counter() - start:.1f} 秒)，正在 VACUUM...")
+        cursor.execute('VACUUM')
+    finally:
+        conn.close()
+    
+    size_after = os.path.getsize(db_path)
+    if verbose:
+        print(f"💾 数据库大小: {size_before / (1024 * 1024):.2f} MB → {size_after / (1024 * 1024):.2f} MB")
+    return (size_before, size_after)
+
+
 def get_database_stats(db_path):
     """获取数据库统计信息"""
     if not os.path.exists(db_path):
@@ -233,18 +667,28 @@ def get_database_stats(db_path):
     
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
+    version = schema_version(conn)
     
     # 视频总数
     cursor.execute('SELECT COUNT(*) FROM videos')
     video_count = cursor.fetchone()[0]
     
-    # 消息总数
-    cursor.execute('SELECT COUNT(*) FROM chat_messages')
-    message_count = cursor.fetchone()[0]
-    
-    # 独特作者数
-    cursor.execute('SELECT COUNT(DISTINCT author_id) FROM chat_messages WHERE author_id != ""')
-    author_count = cursor.fetchone()[0]
+    if version >= 2:
+        # 消息总数
+        cursor.execute('SELECT COUNT(*) FROM messages')
+        message_count = cursor.fetchone()[0]
+        
+        # 独特作者数（只统计仍有消息的作者）
+        cursor.execute('''
+            SELECT COUNT(DISTINCT author_id) FROM authors a
+            WHERE author_id != '' AND EXISTS (SELECT 1 FROM messages WHERE author_key = a.id)
+        ''')
+        author_count = cursor.fetchone()[0]
+    else:
+        cursor.execute('SELECT COUNT(*) FROM chat_messages')
+        message_count = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(DISTINCT author_id) FROM chat_messages WHERE author_id != ""')
+        author_count = cursor.fetchone()[0]
     
     # 数据库大小
     db_size = os.path.getsize(db_path)
@@ -257,6 +701,7 @@ def get_database_stats(db_path):
     conn.close()
     
     stats = {
+        'schema_version': version,
         'video_count': video_count,
         'message_count': message_count,
         'author_count': author_count,
@@ -280,6 +725,7 @@ def print_database_stats(db_path):
     print(f"💬 消息总数: {stats['message_count']:,}")
     print(f"👤 独特作者: {stats['author_count']:,}")
     print(f"💾 数据库大小: {stats['db_size_mb']:.2f} MB")
+    print(f"🧱 结构版本: v{stats['schema_version']}")
     if stats['date_range'][0] and stats['date_range'][1]:
         print(f"📅 视频日期范围: {stats['date_range'][0]} ~ {stats['date_range'][1]}")
     print("=" * 60)
@@ -0,0 +1,107 @@
+"""多视频并发下载调度"""
+
+import queue
+import threading
+import traceback
+
+
+def _run_isolated(worker, idx, url):
+    """执行单个视频任务，异常只影响该视频本身"""
+    try:
+        return worker(idx, url)
+    except Exception as e:
+        print(f"❌ 处理失败: {url}: {e}")
+        traceback.print_exc()
+        return {"url": url, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+
+
+def run_downloads(video_urls, worker, jobs=1, cancel=None):
+    """以有界并发处理视频列表
+
+    Args:
+        video_urls: 视频链接列表
+        worker: worker(idx, url) -> 结果字典，至少包含 url/status 字段
+        jobs: 同时处理的视频数量
+        cancel: 可选的 threading.Event；Ctrl-C 时置位，通知进行中的 worker 抛出
+            KeyboardInterrupt 以关闭写入器并保存检查点
+
+    Returns:
+        按输入顺序排列的结果列表（被中断时只包含已完成的视频）
+    """
+    results = [None] * len(video_urls)
+
+    if jobs <= 1:
+        try:
+            for idx, url in enumerate(video_urls, 1):
+                results[idx - 1] = _run_isolated(worker, idx, url)
+        except KeyboardInterrupt:
+            print("\n\n⚠️ 用户中断，退出程序...")
+        return [r for r in results if r is not None]
+
+    pending = queue.Queue()
+    for idx, url in enumerate(video_urls, 1):
+        pending.put((idx, url))
+    stop = threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            try:
+                idx, url = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                results[idx - 1] = _run_isolated(worker, idx, url)
+            except KeyboardInterrupt:
+                # 被 cancel 取消：写入器已在退出时保存检查点，该视频不计入结果
+                return
+
+    # 守护线程：等待收尾时再次 Ctrl-C 可以强制退出
+    threads = [
+        threading.Thread(target=loop, name=f"ytchat-worker-{i}", daemon=True)
+        for i in range(min(jobs, len(video_urls)))
+    ]
+    for t in threads:
+        t.start()
+
+    try:
+        for t in threads:
+            while t.is_alive():
+                t.join(0.5)
+    except KeyboardInterrupt:
+        stop.set()
+        if cancel is not None:
+            cancel.set()
+        print("\n\n⚠️ 用户中断，等待进行中的下载保存检查点...")
+        # 汇总、关闭会话和自动导入都必须在所有写入器关闭之后进行
+        for t in threads:
+            while t.is_alive():
+                t.join(0.5)
+
+    return [r for r in results if r is not None]
+
+
+def summarize_results(results):
+    """汇总所有视频的处理结果"""
+    summary = {
+        "successful": 0,
+        "skipped": 0,
+        "failed": 0,
+        "total_messages": 0,
+        "throttled": 0,
+        "retries": 0,
+        "failures": [],
+    }
+    for r in results:
+        status = r["status"]
+        fetch_stats = r.get("fetch_stats") or {}
+        summary["throttled"] += fetch_stats.get("throttled", 0)
+        summary["retries"] += fetch_stats.get("retries", 0)
+        if status == "success":
+            summary["successful"] += 1
+            summary["total_messages"] += r.get("total_messages", 0)
+        elif status == "skipped":
+            summary["skipped"] += 1
+        else:
+            summary["failed"] += 1
+            summary["failures"].append((r["url"], r.get("error", "")))
+    return summary
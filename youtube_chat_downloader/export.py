@@ -0,0 +1,88 @@
+"""导出为 Parquet / Arrow 的 CLI 工具"""
+
+import time
+import argparse
+from .columnar import (
+    EXPORT_FORMATS,
+    PARTITIONS,
+    BATCH_ROWS,
+    require_pyarrow,
+    export_database,
+    export_chat_directory
+)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description="把 SQLite 数据库或聊天回放文件导出为 Parquet / Arrow（列式，供数据分析使用）"
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--db-path",
+        type=str,
+        default="chat_database.db",
+        help="从 SQLite 数据库导出 (默认: chat_database.db)"
+    )
+    source.add_argument(
+        "--json-dir",
+        type=str,
+        help="改为从聊天回放文件目录导出（.json / .jsonl / .jsonl.gz / .jsonl.zst）"
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default="chat_parquet",
+        help="输出目录 (默认: chat_parquet)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=EXPORT_FORMATS,
+        default="parquet",
+        help="输出格式 (默认: parquet)"
+    )
+    parser.add_argument(
+        "--partition-by",
+        choices=PARTITIONS,
+        default="video",
+        help="分区方式：video 每个视频一个目录，month 按上传月份 (默认: video)"
+    )
+    parser.add_argument(
+        "--batch-rows",
+        type=int,
+        default=BATCH_ROWS,
+        help=f"每个 row group 的行数 (默认: {BATCH_ROWS})"
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="安静模式：减少输出信息"
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        require_pyarrow()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    verbose = not args.quiet
+    start = time.perf_counter()
+    if args.json_dir:
+        count, rows = export_chat_directory(
+            args.json_dir, args.output_dir, args.format, args.partition_by, verbose
+        )
+    else:
+        count, rows = export_database(
+            args.db_path, args.output_dir, args.format, args.partition_by, args.batch_rows, verbose
+        )
+    elapsed = time.perf_counter() - start
+    
+    print(f"✅ 已导出 {count} 个视频, {rows} 条消息 → {args.output_dir} "
+          f"({elapsed:.1f} 秒, {rows / max(elapsed, 1e-9):,.0f} 条/秒)")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
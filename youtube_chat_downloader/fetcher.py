@@ -1,38 +1,190 @@
 """YouTube 聊天回放获取核心模块"""
 
 import re
-import json
 import time
+import queue
+import threading
 import requests
+from operator import attrgetter
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 from yt_dlp import YoutubeDL
-
-USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
-
-
-def fetch_html(url):
+from . import codec
+from .messages import ChatMessage
+from .metrics import record_stage
+from .session import get_default_session
+from .ratelimit import backoff_delay, parse_retry_after
+from .channel_cache import (
+    load_channel_cache,
+    save_channel_cache,
+    entry_from_flat,
+    is_refresh_boundary,
+    merge_entries
+)
+
+
+def fetch_html(url, session=None):
     """获取页面HTML"""
-    headers = {"User-Agent": USER_AGENT}
-    r = requests.get(url, headers=headers, timeout=20)
+    session = session or get_default_session()
+    r = session.get(url, timeout=20)
     r.raise_for_status()
     return r.text
 
 
-def extract_params(html):
-    """从HTML中提取API参数"""
-    key_m = re.search(r'INNERTUBE_API_KEY["\']\s*:\s*"([^"]+)"', html)
-    ver_m = re.search(r'INNERTUBE_CONTEXT_CLIENT_VERSION["\']\s*:\s*"([^"]+)"', html)
-    yid_m = re.search(
-        r'ytInitialData["\']?\s*[:=]\s*(\{.*?\})[;\n]', html, flags=re.DOTALL
+DEFAULT_CLIENT_VERSION = "2.20201021.03.00"
+
+_PAGE_TOKEN_RE = re.compile(
+    r'INNERTUBE_API_KEY["\']\s*:\s*"(?P<api_key>[^"]+)"'
+    r'|INNERTUBE_CONTEXT_CLIENT_VERSION["\']\s*:\s*"(?P<version>[^"]+)"'
+    r'|(?P<player_response>ytInitialPlayerResponse)\s*=\s*(?=\{)'
+    r'|(?P<initial_data>ytInitialData)["\']?\s*[:=]\s*(?=\{)'
+)
+_INITIAL_DATA_RE = re.compile(r'(?P<initial_data>ytInitialData)["\']?\s*[:=]\s*(?=\{)')
+
+
+def _scan_watch_page(html, cache=None, player_response=False):
+    """单次扫描观看页面
+
+    遇到 ytInitialData / ytInitialPlayerResponse 标记时用 codec.raw_decode
+    从该位置解码恰好一个 JSON 值，然后跳过这段数据继续查找其余字段。
+
+    Args:
+        cache: 可选字典，按运行缓存 api_key/version；都已缓存时只查找 ytInitialData
+        player_response: 是否同时解码 ytInitialPlayerResponse
+    """
+    found = {}
+    if cache:
+        found.update((k, cache[k]) for k in ("api_key", "version") if k in cache)
+    wanted = {"api_key", "version", "initial_data"}
+    if player_response:
+        wanted.add("player_response")
+        pattern = _PAGE_TOKEN_RE
+    else:
+        pattern = _INITIAL_DATA_RE if len(found) == 2 else _PAGE_TOKEN_RE
+
+    pos = 0
+    while not wanted <= found.keys():
+        m = pattern.search(html, pos)
+        if not m:
+            break
+        pos = m.end()
+        name = m.lastgroup
+        if name in found or name not in wanted:
+            continue
+        if name in ("api_key", "version"):
+            found[name] = m.group(name)
+        else:
+            try:
+                found[name], pos = codec.raw_decode(html, pos)
+            except ValueError:
+                pass
+
+    if cache is not None:
+        cache.update((k, found[k]) for k in ("api_key", "version") if k in found)
+    return found
+
+
+def extract_params(html, cache=None):
+    """从HTML中提取API参数
+
+    对页面只扫描一遍：遇到 ytInitialData 标记时用 codec.raw_decode
+    从该位置解码恰好一个 JSON 值，然后跳过这段数据继续查找 API key 和客户端版本。
+
+    Args:
+        html: 观看页面HTML
+        cache: 可选字典，按运行缓存 api_key/version；都已缓存时只查找 ytInitialData
+
+    Returns:
+        (api_key, version, ytInitialData)
+    """
+    found = _scan_watch_page(html, cache)
+    return (
+        found.get("api_key"),
+        found.get("version", DEFAULT_CLIENT_VERSION),
+        found.get("initial_data"),
     )
 
-    api_key = key_m.group(1) if key_m else None
-    version = ver_m.group(1) if ver_m else "2.20201021.03.00"
-    yid = json.loads(yid_m.group(1)) if yid_m else None
-    return api_key, version, yid
+
+def utc_upload_date(upload):
+    """把 uploadDate（ISO 8601，可带时区偏移）转换为 UTC 日期 YYYYMMDD
+
+    与 yt-dlp 一致：带时间的值先换算到 UTC 再取日期，否则晚间开播（如太平洋时间）
+    的直播会差一天，文件名随之不同，--incremental 找不到已下载的文件。
+    只有日期时直接取日期。无法解析时返回空字符串。
+    """
+    upload = (upload or "").strip()
+    if len(upload) <= 10:
+        upload_date = upload.replace("-", "")
+        return upload_date if len(upload_date) == 8 and upload_date.isdigit() else ""
+    try:
+        # Python 3.11 之前的 fromisoformat 不接受 "Z"
+        parsed = datetime.fromisoformat(upload.replace("Z", "+00:00"))
+    except ValueError:
+        return ""
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime("%Y%m%d")
+
+
+def extract_video_info(player_response, url):
+    """从 ytInitialPlayerResponse 提取视频信息，字段不全时返回 None"""
+    if not isinstance(player_response, dict):
+        return None
+    details = player_response.get("videoDetails") or {}
+    micro = (player_response.get("microformat") or {}).get("playerMicroformatRenderer") or {}
+
+    video_id = details.get("videoId")
+    try:
+        duration = int(details.get("lengthSeconds") or micro.get("lengthSeconds") or 0)
+    except (TypeError, ValueError):
+        duration = 0
+    upload_date = utc_upload_date(micro.get("uploadDate") or micro.get("publishDate"))
+    if not video_id or not duration or len(upload_date) != 8:
+        return None
+
+    return {
+        "id": video_id,
+        "title": details.get("title", ""),
+        "duration": duration,
+        "upload_date": upload_date,
+        "url": url
+    }
+
+
+# 直接路径查找命中/回退到全树遍历的次数
+continuation_lookup_stats = {"fast_path": 0, "fallback": 0}
+
+# 回放翻页时按优先级查找的 continuation 类型（跳过 playerSeekContinuationData）
+_NEXT_CONTINUATION_KEYS = (
+    "liveChatReplayContinuationData",
+    "invalidationContinuationData",
+    "timedContinuationData",
+    "reloadContinuationData",
+)
+
+
+def _initial_continuation_fast(ytInitialData):
+    """从 conversationBar.liveChatRenderer 直接读取初始 continuation"""
+    try:
+        renderer = ytInitialData["contents"]["twoColumnWatchNextResults"][
+            "conversationBar"]["liveChatRenderer"]
+    except (KeyError, TypeError):
+        return None
+    for c in renderer.get("continuations") or ():
+        token = c.get("reloadContinuationData", {}).get("continuation")
+        if token:
+            return token
+    return None
 
 
 def find_continuation(ytInitialData):
     """查找初始continuation token"""
+    token = _initial_continuation_fast(ytInitialData)
+    if token:
+        continuation_lookup_stats["fast_path"] += 1
+        return token
+    continuation_lookup_stats["fallback"] += 1
+
     def walk(d):
         if isinstance(d, dict):
             if "continuation" in d:
@@ -51,22 +203,69 @@ def find_continuation(ytInitialData):
     return walk(ytInitialData)
 
 
-def fetch_chat(api_key, version, continuation, retries=3):
-    """获取聊天数据"""
-    url = f"https://www.youtube.com/youtubei/v1/live_chat/get_live_chat_replay?key={api_key}"
+def _bump(counters, key, n=1):
+    if counters is not None:
+        counters[key] = counters.get(key, 0) + n
+
+
+def fetch_chat(api_key, version, continuation, retries=None, session=None, counters=None,
+               player_offset_ms=None, metrics=None):
+    """获取聊天数据
+
+    每次请求前从会话的自适应限速器取令牌；遇到 429/5xx 时降低速率，
+    按 Retry-After 或带抖动的指数退避等待后重试。
+
+    Args:
+        retries: 最大尝试次数，默认使用会话的 max_retries
+        counters: 可选的计数字典，记录 requests/retries/throttled/server_errors/errors
+        player_offset_ms: 配合 playerSeekContinuationData 使用，跳转到回放的指定位置
+        metrics: 可选的 StageMetrics，记录限速等待、请求（成功的计入分页延迟）、解码和退避的耗时
+    """
+    session = session or get_default_session()
+    url = f"{session.api_base}/youtubei/v1/live_chat/get_live_chat_replay?key={api_key}"
     data = {
         "context": {"client": {"clientName": "WEB", "clientVersion": version}},
         "continuation": continuation,
     }
-    headers = {"User-Agent": USER_AGENT, "Content-Type": "application/json"}
+    if player_offset_ms is not None:
+        data["currentPlayerState"] = {"playerOffsetMs": str(int(player_offset_ms))}
+    headers = {"Content-Type": "application/json"}
+    limiter = session.limiter
+    if retries is None:
+        retries = session.max_retries
     for attempt in range(retries):
+        start = time.perf_counter()
+        limiter.acquire()
+        record_stage(metrics, "rate_limit_wait", start)
+        _bump(counters, "requests")
+        start = time.perf_counter()
         try:
-            r = requests.post(url, headers=headers, json=data, timeout=60)
-            r.raise_for_status()
-            return r.json()
+            r = session.post(url, headers=headers, data=codec.dumps(data), timeout=60)
+            if r.status_code == 429 or r.status_code >= 500:
+                record_stage(metrics, "chat_page_error", start, len(r.content))
+                retry_after = parse_retry_after(r.headers.get("Retry-After"))
+                limiter.on_throttle(retry_after)
+                _bump(counters, "throttled" if r.status_code == 429 else "server_errors")
+                delay = max(retry_after or 0, backoff_delay(attempt))
+                print(f"⚠️ HTTP {r.status_code} — {delay:.1f} 秒后重试 {attempt+1}/{retries}")
+            else:
+                r.raise_for_status()
+                record_stage(metrics, "chat_page", start, len(r.content))
+                start = time.perf_counter()
+                result = codec.loads(r.content)
+                record_stage(metrics, "decode", start)
+                limiter.on_success()
+                return result
         except requests.exceptions.RequestException as e:
+            record_stage(metrics, "chat_page_error", start)
+            _bump(counters, "errors")
+            delay = backoff_delay(attempt)
             print(f"⚠️ {type(e).__name__}: {e} — 重试 {attempt+1}/{retries}")
-            time.sleep(3)
+        if attempt + 1 < retries:
+            _bump(counters, "retries")
+            start = time.perf_counter()
+            time.sleep(delay)
+            record_stage(metrics, "backoff", start)
     raise RuntimeError("❌ 重试后仍无法获取。")
 
 
@@ -83,56 +282,139 @@ def ms_to_timestamp(ms):
         return "0:00"
 
 
-def parse_messages(actions):
-    """解析消息，不过滤负时间戳"""
-    messages = []
-    latest_offset = 0
-    for a in actions or []:
-        if "replayChatItemAction" in a:
-            item = a["replayChatItemAction"].get("actions", [{}])[0]
-            chat = item.get("addChatItemAction", {}).get("item", {})
-            for t in ("liveChatTextMessageRenderer", "liveChatPaidMessageRenderer"):
-                if t in chat:
-                    r = chat[t]
+_CHAT_RENDERERS = frozenset(("liveChatTextMessageRenderer", "liveChatPaidMessageRenderer"))
+# 删除 \x00-\x1F 与 \x7F 的转换表
+_CONTROL_CHARS = dict.fromkeys([*range(0x20), 0x7F])
+_MISSING = object()
+# 按秒缓存的时间文本（同一秒内的消息共享同一个字符串）
+_time_text_cache = {}
 
-                    author = r.get("authorName", {}).get("simpleText", "").strip()
-                    if not author:
-                        continue
 
-                    author_id = r.get("authorExternalChannelId", "")
+def _time_text(offset):
+    sec = offset // 1000
+    text = _time_text_cache.get(sec)
+    if text is None:
+        text = _time_text_cache[sec] = ms_to_timestamp(offset)
+    return text
 
-                    msg_runs = r.get("message", {}).get("runs", [])
-                    msg = "".join([x.get("text", "") for x in msg_runs]).strip()
-                    if not msg:
-                        continue
 
+def parse_messages(actions):
+    """解析消息，不过滤负时间戳，返回 (ChatMessage 列表, 最大偏移)
+
+    每个 item 只查找一次渲染器；单段消息不拼接；只有含不可打印字符时才用
+    str.translate 删除控制字符；时间文本按秒缓存。输出与逐字段 .get 链的旧实现一致
+    （benchmarks/legacy.py 保留了旧实现用于对比）。
+    """
+    messages = []
+    append = messages.append
+    latest_offset = 0
+    for a in actions or ():
+        replay = a.get("replayChatItemAction")
+        if replay is None:
+            continue
+        inner = replay.get("actions")
+        if not inner:
+            continue
+        add = inner[0].get("addChatItemAction")
+        if add is None:
+            continue
+        chat = add.get("item")
+        if not chat:
+            continue
+
+        for t, r in chat.items():
+            if t not in _CHAT_RENDERERS:
+                continue
+
+            name = r.get("authorName")
+            author = name.get("simpleText", "").strip() if name is not None else ""
+            if not author:
+                continue
+
+            body = r.get("message")
+            runs = body.get("runs") if body is not None else None
+            if not runs:
+                continue
+            if len(runs) == 1:
+                msg = runs[0].get("text", "").strip()
+            else:
+                msg = "".join([x.get("text", "") for x in runs]).strip()
+            if not msg:
+                continue
+            if not msg.isprintable():
+                msg = msg.translate(_CONTROL_CHARS)
+
+            v = r.get("videoOffsetTimeMsec", _MISSING)
+            if v is not _MISSING:
+                try:
+                    offset = int(v)
+                except (TypeError, ValueError, OverflowError):
+                    try:
+                        offset = int(float(v))
+                    except Exception:
+                        offset = None
+                if offset is None:
                     offset = 0
                     time_text = "0:00"
-                    if "videoOffsetTimeMsec" in r:
-                        try:
-                            offset = int(float(r["videoOffsetTimeMsec"]))
-                            time_text = ms_to_timestamp(offset)
-                        except:
-                            pass
-                    elif "timestampText" in r:
-                        time_text = r["timestampText"].get("simpleText", "0:00").strip()
-
-                    msg = re.sub(r"[\x00-\x1F\x7F]", "", msg)
-
-                    messages.append({
-                        "time_text": time_text,
-                        "author": author,
-                        "author_id": author_id,
-                        "message": msg,
-                        "offset_ms": offset
-                    })
-                    if offset > latest_offset:
-                        latest_offset = offset
+                else:
+                    time_text = _time_text(offset)
+            else:
+                offset = 0
+                ts = r.get("timestampText")
+                time_text = ts.get("simpleText", "0:00").strip() if ts is not None else "0:00"
+
+            append(ChatMessage(time_text, author, r.get("authorExternalChannelId", ""), msg, offset))
+            if offset > latest_offset:
+                latest_offset = offset
     return messages, latest_offset
 
 
+def _page_actions(data):
+    return data.get("actions") or data.get("continuationContents", {}).get(
+        "liveChatContinuation", {}
+    ).get("actions")
+
+
+def extract_seek_cont(json_data):
+    """提取回放跳转用的 playerSeekContinuationData token"""
+    try:
+        continuations = json_data["continuationContents"]["liveChatContinuation"]["continuations"]
+    except (KeyError, TypeError):
+        return None
+    for c in continuations:
+        token = c.get("playerSeekContinuationData", {}).get("continuation")
+        if token:
+            return token
+    return None
+
+
+def _next_continuation_fast(json_data):
+    """从 continuationContents.liveChatContinuation.continuations 直接读取下一页 token
+
+    Returns:
+        (是否找到已知结构, token)；结构存在但没有翻页 token 时说明已经是最后一页
+    """
+    try:
+        continuations = json_data["continuationContents"]["liveChatContinuation"]["continuations"]
+    except (KeyError, TypeError):
+        return False, None
+    for key in _NEXT_CONTINUATION_KEYS:
+        for c in continuations:
+            if key in c:
+                token = c[key].get("continuation")
+                if token:
+                    return True, token
+    return True, None
+
+
 def extract_next_cont(json_data):
     """提取下一个continuation token"""
+    known, token = _next_continuation_fast(json_data)
+    if known:
+        continuation_lookup_stats["fast_path"] += 1
+        return token
+    continuation_lookup_stats["fallback"] += 1
+
     def walk(obj):
         if isinstance(obj, dict):
             for k, v in obj.items():
@@ -168,8 +450,57 @@ def get_video_info(url, cookies_file=None):
         }
 
 
-def get_livestream_urls(channel_url, cookies_file=None):
-    """获取频道的所有直播视频链接"""
+def load_watch_page(url, cookies_file=None, session=None, metrics=None):
+    """获取并解析观看页面，每次运行每个视频只解析一次
+
+    视频信息优先取自页面中的 ytInitialPlayerResponse，字段不全时才回退到 yt-dlp。
+    提供 metrics（StageMetrics）时记录 html / metadata 阶段的耗时。
+
+    Returns:
+        {"video_info", "api_key", "version", "has_initial_data", "continuation"}
+    """
+    session = session or get_default_session()
+    page = session.watch_pages.get(url)
+    if page is not None:
+        return page
+
+    start = time.perf_counter()
+    html = fetch_html(url, session)
+    record_stage(metrics, "html", start, len(html))
+
+    start = time.perf_counter()
+    found = _scan_watch_page(html, session.params_cache, player_response=True)
+    video_info = extract_video_info(found.get("player_response"), url)
+    if video_info is None:
+        video_info = get_video_info(url, cookies_file)
+    record_stage(metrics, "metadata", start)
+
+    yid = found.get("initial_data")
+    page = {
+        "video_info": video_info,
+        "api_key": found.get("api_key"),
+        "version": found.get("version", DEFAULT_CLIENT_VERSION),
+        "has_initial_data": yid is not None,
+        "continuation": find_continuation(yid) if yid else None,
+    }
+    session.watch_pages[url] = page
+    return page
+
+
+def resolve_video_info(url, cookies_file=None, session=None, metrics=None):
+    """获取视频信息（观看页面优先，yt-dlp 兜底，按运行缓存）"""
+    return load_watch_page(url, cookies_file, session, metrics)["video_info"]
+
+
+def get_livestream_urls(channel_url, cookies_file=None, cache_path=None, full_rescan=False):
+    """获取频道的所有直播视频链接
+
+    Args:
+        channel_url: 频道直播页面链接
+        cookies_file: Cookies 文件路径
+        cache_path: 频道列表缓存文件；指定后增量刷新，遇到第一个已知视频即停止翻页
+        full_rescan: 忽略缓存，完整重新获取列表
+    """
     ydl_opts = {
         'quiet': True,
         'extract_flat': True,
@@ -177,87 +508,347 @@ def get_livestream_urls(channel_url, cookies_file=None):
     }
     if cookies_file:
         ydl_opts['cookiefile'] = cookies_file
-    
-    urls = []
+
+    cache = load_channel_cache(cache_path) if cache_path and not full_rescan else None
+    cached_entries = cache["entries"] if cache else []
+    cached_by_id = {e["id"]: e for e in cached_entries}
+
+    fresh = []
+    complete = False
     with YoutubeDL(ydl_opts) as ydl:
         try:
-            result = ydl.extract_info(channel_url, download=False)
-            if result and 'entries' in result:
-                for entry in result['entries']:
-                    if entry and entry.get('live_status') == 'was_live':
-                        video_url = f"https://www.youtube.com/watch?v={entry['id']}"
-                        urls.append(video_url)
+            # process=False 时 entries 是惰性生成器，按需翻页
+            result = ydl.extract_info(channel_url, download=False, process=False)
+            for _ in range(3):
+                if not result or result.get('_type') not in ('url', 'url_transparent'):
+                    break
+                result = ydl.extract_info(
+                    result['url'], download=False, process=False, ie_key=result.get('ie_key')
+                )
+            for entry in (result or {}).get('entries') or []:
+                if not entry or not entry.get('id'):
+                    continue
+                if is_refresh_boundary(entry['id'], cached_by_id):
+                    break
+                fresh.append(entry_from_flat(entry))
+            complete = True
         except Exception as e:
             print(f"❌ 获取频道视频列表失败: {e}")
-    
-    return urls
 
+    entries = merge_entries(fresh, cached_entries)
+    if cache_path and complete:
+        save_channel_cache(cache_path, channel_url, entries)
+    if cache is not None:
+        print(f"🗂️ 频道缓存: 新增/更新 {len(fresh)} 个视频，沿用缓存 {len(entries) - len(fresh)} 个")
+
+    return [
+        f"https://www.youtube.com/watch?v={e['id']}"
+        for e in entries
+        if e.get('live_status') == 'was_live'
+    ]
+
+
+class ChatReplayUnavailable(RuntimeError):
+    """观看页面中没有可用的聊天回放（缺少 ytInitialData 或 continuation）"""
+
+
+class ChatStatistics:
+    """边获取边累计的统计信息，不需要保留全部消息"""
+
+    def __init__(self):
+        self.total_messages = 0
+        self.author_ids = set()
+        self.min_offset = None
+        self.max_offset = None
+
+    def add(self, messages):
+        """累计一页 ChatMessage"""
+        if not messages:
+            return
+        offsets = [m.offset_ms for m in messages]
+        low, high = min(offsets), max(offsets)
+        if self.min_offset is None or low < self.min_offset:
+            self.min_offset = low
+        if self.max_offset is None or high > self.max_offset:
+            self.max_offset = high
+        self.author_ids.update([m.author_id for m in messages])
+        self.author_ids.discard("")
+        self.total_messages += len(messages)
+
+    def as_dict(self):
+        return {
+            "total_messages": self.total_messages,
+            "unique_authors": len(self.author_ids),
+            "time_range": {
+                "min": ms_to_timestamp(self.min_offset if self.min_offset is not None else 0),
+                "max": ms_to_timestamp(self.max_offset if self.max_offset is not None else 0)
+            }
+        }
 
-def fetch_video_chat(url, cookies_file=None, verbose=True):
-    """获取单个视频的聊天回放数据"""
+
+def print_fetch_summary(total_messages, counters):
+    """打印单个视频的获取结果"""
+    print(f"✅ 完成：已获取 {total_messages} 条评论")
+    if counters.get("throttled") or counters.get("server_errors") or counters.get("errors"):
+        print(f"🚦 限流 {counters.get('throttled', 0)} 次, "
+              f"服务器错误 {counters.get('server_errors', 0)} 次, "
+              f"网络错误 {counters.get('errors', 0)} 次, "
+              f"重试 {counters.get('retries', 0)} 次")
+
+
+def _page_chain(api_key, version, continuation, session, counters, metrics=None):
+    """沿 continuation 链顺序请求，产出 (响应, 下一页 token)
+
+    下一页 token 在收到响应后立即提取，不必等待消息解析。
+    """
+    seen_continuations = set()
+    for i in range(3000):
+        if continuation in seen_continuations:
+            return
+        seen_continuations.add(continuation)
+
+        data = fetch_chat(api_key, version, continuation, session=session, counters=counters,
+                          metrics=metrics)
+        _bump(counters, "pages")
+        next_c = extract_next_cont(data)
+        yield data, next_c
+
+        if not next_c:
+            return
+        continuation = next_c
+
+
+def _prefetched(items, depth):
+    """在后台线程中提前迭代 items，最多缓冲 depth 项
+
+    有界队列提供背压：消费方处理不过来时生产线程阻塞，不会无限制地提前请求。
+    消费方提前结束（break 或异常）时生产线程在下一次入队时退出；
+    生产线程中的异常在消费方重新抛出。
+    """
+    pending = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((done, e))
+
+    # 守护线程：Ctrl-C 时不必等待正在进行的请求
+    threading.Thread(target=produce, name="ytchat-prefetch", daemon=True).start()
+    try:
+        while True:
+            item, error = pending.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def iter_video_chat(url, cookies_file=None, verbose=True, session=None, counters=None,
+                    resume_from=None, prefetch=2, metrics=None):
+    """逐页获取聊天回放，每获取一页就产出一页解析后的消息
+
+    调用方可以边获取边写盘，内存占用与回放长度无关。prefetch > 0 时请求在后台线程中
+    进行：收到一页后立即请求下一页，同时在当前线程解析和处理上一页。
+
+    Args:
+        resume_from: 检查点状态 {"continuation", "max_offset"}，从该处继续获取
+        prefetch: 最多提前获取的页数，0 表示请求与解析交替进行
+        metrics: 可选的 StageMetrics，记录各阶段耗时与流量
+
+    Yields:
+        {"messages": 本页消息列表, "max_offset": 已见最大偏移(ms), "next_continuation": 下一页 token}
+
+    Raises:
+        ChatReplayUnavailable: 页面中没有 ytInitialData 或 continuation
+    """
     if verbose:
         print(f"▶ Fetching: {url}")
     
-    video_info = get_video_info(url, cookies_file)
-    duration = video_info["duration"]
-    video_id = video_info["id"]
+    page = load_watch_page(url, cookies_file, session, metrics)
+    duration = page["video_info"]["duration"]
     
     if verbose:
         print(f"📏 视频长度: {duration} 秒")
 
-    html = fetch_html(url)
-    api_key, version, yid = extract_params(html)
-    if not yid:
-        print("❌ 未找到 ytInitialData。可能需要 Cookie。")
-        return None
+    api_key, version = page["api_key"], page["version"]
+    if not page["has_initial_data"]:
+        raise ChatReplayUnavailable("❌ 未找到 ytInitialData。可能需要 Cookie。")
 
-    continuation = find_continuation(yid)
+    continuation = page["continuation"]
     if not continuation:
-        print("❌ 未找到 continuation。")
-        return None
+        raise ChatReplayUnavailable("❌ 未找到 continuation。")
 
-    all_messages = []
     max_seen_offset = 0
+    if resume_from:
+        continuation = resume_from["continuation"]
+        max_seen_offset = resume_from.get("max_offset", 0)
+
+    # 与分段获取相同的截止规则：只保留 offset_ms < 视频长度的消息，越过长度后停止翻页
+    end_ms = duration * 1000 if duration > 0 else float("inf")
+    pages = _page_chain(api_key, version, continuation, session, counters, metrics)
+    if prefetch > 0:
+        pages = _prefetched(pages, prefetch)
+    try:
+        for data, next_c in pages:
+            start = time.perf_counter()
+            msgs, latest_offset = parse_messages(_page_actions(data))
+            record_stage(metrics, "parse", start)
+
+            if latest_offset > max_seen_offset:
+                max_seen_offset = latest_offset
+
+            if max_seen_offset >= end_ms:
+                msgs = [m for m in msgs if m.offset_ms < end_ms]
+                if msgs:
+                    yield {"messages": msgs, "max_offset": max_seen_offset, "next_continuation": None}
+                break
+
+            yield {"messages": msgs, "max_offset": max_seen_offset, "next_continuation": next_c}
+    finally:
+        pages.close()
+
+
+def _fetch_segment(api_key, version, continuation, start_ms, end_ms, session, counters,
+                   player_offset_ms=None, first_data=None, metrics=None):
+    """沿 continuation 链获取 [start_ms, end_ms) 范围内的消息
+
+    Args:
+        player_offset_ms: 首个请求的跳转位置（配合 seek token 使用）
+        first_data: 已经获取到的首页响应，提供时不再重复请求
+    """
+    messages = []
     seen_continuations = set()
+    data = first_data
 
     for i in range(3000):
-        if continuation in seen_continuations:
+        if data is None:
+            if continuation in seen_continuations:
+                break
+            seen_continuations.add(continuation)
+            data = fetch_chat(api_key, version, continuation, session=session,
+                              counters=counters, player_offset_ms=player_offset_ms,
+                              metrics=metrics)
+            _bump(counters, "pages")
+            player_offset_ms = None
+
+        start = time.perf_counter()
+        msgs, latest_offset = parse_messages(_page_actions(data))
+        record_stage(metrics, "parse", start)
+        # 半开区间划分：跳转页带回的、属于相邻分段的消息在这里被去掉
+        messages.extend(m for m in msgs if start_ms <= m.offset_ms < end_ms)
+        if latest_offset >= end_ms:
             break
-        seen_continuations.add(continuation)
 
-        data = fetch_chat(api_key, version, continuation)
-        actions = data.get("actions") or data.get("continuationContents", {}).get(
-            "liveChatContinuation", {}
-        ).get("actions")
-        msgs, latest_offset = parse_messages(actions)
+        continuation = extract_next_cont(data)
+        if not continuation:
+            break
+        data = None
 
-        if latest_offset > max_seen_offset:
-            max_seen_offset = latest_offset
+    messages.sort(key=attrgetter("offset_ms"))
+    return messages
 
-        if max_seen_offset / 1000 >= duration:
-            break
 
-        all_messages.extend(msgs)
+def iter_video_chat_sharded(url, shards, cookies_file=None, verbose=True, session=None,
+                            counters=None, metrics=None):
+    """按时间分段并发获取长回放
 
-        next_c = extract_next_cont(data)
-        if not next_c:
-            break
-        continuation = next_c
+    先取首页拿到 playerSeekContinuationData，再在 N 个均匀分布的偏移处跳转，
+    各分段沿各自的 continuation 链并发获取，最后按 offset_ms 顺序逐段产出。
+    无法分段（没有 seek token 或时长未知）时退回顺序获取。
+
+    Yields:
+        与 iter_video_chat 相同结构的字典，每个分段一项（不支持检查点）
+    """
+    session = session or get_default_session()
+    if verbose:
+        print(f"▶ Fetching: {url} （{shards} 段并发）")
+
+    page = load_watch_page(url, cookies_file, session, metrics)
+    duration_ms = page["video_info"]["duration"] * 1000
+    api_key, version = page["api_key"], page["version"]
+    if not page["has_initial_data"]:
+        raise ChatReplayUnavailable("❌ 未找到 ytInitialData。可能需要 Cookie。")
+    if not page["continuation"]:
+        raise ChatReplayUnavailable("❌ 未找到 continuation。")
+
+    first = fetch_chat(api_key, version, page["continuation"], session=session, counters=counters,
+                       metrics=metrics)
+    _bump(counters, "pages")
+    seek = extract_seek_cont(first)
+    if shards <= 1 or not seek or duration_ms <= 0:
+        if verbose:
+            print("⚠️ 无法分段获取，改为顺序获取")
+        yield from iter_video_chat(url, cookies_file, False, session, counters, metrics=metrics)
+        return
+
+    bounds = [duration_ms * k // shards for k in range(shards + 1)]
+    bounds[0] = float("-inf")  # 直播开始前的消息（负偏移）归入第一段
+    shard_counters = [{} for _ in range(shards)]
+
+    with ThreadPoolExecutor(max_workers=shards) as pool:
+        futures = [pool.submit(
+            _fetch_segment, api_key, version, page["continuation"], bounds[0], bounds[1],
+            session, shard_counters[0], first_data=first, metrics=metrics,
+        )]
+        for k in range(1, shards):
+            futures.append(pool.submit(
+                _fetch_segment, api_key, version, seek, bounds[k], bounds[k + 1],
+                session, shard_counters[k], player_offset_ms=bounds[k], metrics=metrics,
+            ))
+
+        max_seen_offset = 0
+        for k, future in enumerate(futures):
+            messages = future.result()
+            if messages:
+                max_seen_offset = max(max_seen_offset, messages[-1].offset_ms)
+            if verbose:
+                print(f"🧩 分段 {k + 1}/{shards} 完成：{len(messages)} 条消息")
+            yield {"messages": messages, "max_offset": max_seen_offset, "next_continuation": None}
+
+    if counters is not None:
+        for c in shard_counters:
+            for key, n in c.items():
+                _bump(counters, key, n)
+
+
+def fetch_video_chat(url, cookies_file=None, verbose=True, session=None, prefetch=2):
+    """获取单个视频的聊天回放数据"""
+    all_messages = []
+    statistics = ChatStatistics()
+    counters = {}
 
-        time.sleep(0.08)
+    try:
+        for page in iter_video_chat(url, cookies_file, verbose, session, counters, prefetch=prefetch):
+            all_messages.extend(page["messages"])
+            statistics.add(page["messages"])
+    except ChatReplayUnavailable as e:
+        print(e)
+        return None
 
     if verbose:
-        print(f"✅ 完成：已获取 {len(all_messages)} 条评论")
+        print_fetch_summary(len(all_messages), counters)
 
     return {
-        "video_info": video_info,
+        "video_info": load_watch_page(url, cookies_file, session)["video_info"],
+        "fetch_stats": counters,
         "messages": all_messages,
-        "statistics": {
-            "total_messages": len(all_messages),
-            "unique_authors": len(set(m["author_id"] for m in all_messages if m["author_id"])),
-            "time_range": {
-                "min": ms_to_timestamp(min((m["offset_ms"] for m in all_messages), default=0)),
-                "max": ms_to_timestamp(max((m["offset_ms"] for m in all_messages), default=0))
-            }
-        }
+        "statistics": statistics.as_dict()
     }
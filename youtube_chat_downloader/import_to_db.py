@@ -1,19 +1,19 @@
 """JSON 导入到 SQLite 数据库的 CLI 工具"""
 
 import argparse
-from .db_importer import import_directory_to_db, print_database_stats
+from .db_importer import import_directory_to_db, migrate_database, print_database_stats
 
 
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(
-        description="将 JSON 聊天回放文件导入到 SQLite 数据库"
+        description="将 JSON / JSONL 聊天回放文件导入到 SQLite 数据库"
     )
     parser.add_argument(
         "--json-dir",
         type=str,
         default="chat_replays",
-        help="JSON 文件目录 (默认: chat_replays)"
+        help="聊天回放文件目录，包含 .json / .jsonl / .jsonl.gz / .jsonl.zst (默认: chat_replays)"
     )
     parser.add_argument(
         "--db-path",
@@ -26,6 +26,22 @@ def main():
         action="store_true",
         help="增量模式：跳过已存在的视频"
     )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="批量导入模式：WAL + synchronous=OFF + 大页缓存，导入后一次性重建索引（适合大量数据）"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="并行读取和解码文件的进程数，写入仍由单个连接按顺序进行 (默认: 1)"
+    )
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="把 --db-path 指定的旧版 (v1) 数据库原地转换为 v2 结构（不导入）"
+    )
     parser.add_argument(
         "--stats",
         action="store_true",
@@ -39,6 +55,11 @@ def main():
     
     args = parser.parse_args()
     
+    # 转换旧版数据库结构
+    if args.migrate:
+        migrate_database(args.db_path, verbose=not args.quiet)
+        return
+    
     # 如果只是查看统计信息
     if args.stats:
         print_database_stats(args.db_path)
@@ -57,7 +78,9 @@ def main():
         args.json_dir,
         args.db_path,
         args.incremental,
-        verbose
+        verbose,
+        bulk=args.bulk,
+        workers=args.workers
     )
     
     # 显示最终数据库统计
@@ -0,0 +1,157 @@
+"""JSON Lines 格式的聊天回放文件
+
+文件结构（每行一个 JSON 对象）:
+    {"type":"header","format":"ytchat-jsonl","version":1,"video_info":{...}}
+    {"time_text":"0:01","author":"...","author_id":"...","message":"...","offset_ms":1000}
+    ...
+    {"type":"trailer","statistics":{...}}
+
+jsonl.gz 由一个或多个 gzip 成员拼接而成，jsonl.zst 由一个或多个 zstd 帧拼接而成
+（每个检查点结束一个成员/帧，以便中断后截断续写）。jsonl.zst 需要安装 zstandard。
+"""
+
+import gzip
+import json
+import zlib
+from pathlib import Path
+from json.encoder import encode_basestring
+from . import codec
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMAT = "ytchat-jsonl"
+VERSION = 1
+SAVE_TYPES = ("json", "jsonl", "jsonl.gz", "jsonl.zst")
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+_READ_SIZE = 1 << 20
+
+
+def save_type_of(path):
+    """根据文件名判断保存类型，不是聊天回放文件时返回 None"""
+    name = str(path)
+    for save_type in ("jsonl.gz", "jsonl.zst", "jsonl", "json"):
+        if name.endswith("." + save_type):
+            return save_type
+    return None
+
+
+def require_zstandard():
+    if zstandard is None:
+        raise RuntimeError('jsonl.zst 格式需要安装 zstandard：pip install "youtube-chat-downloader[zstd]"')
+
+
+def compressor(save_type):
+    """返回新的压缩器（compress() / flush() 结束当前成员），不压缩时返回 None"""
+    if save_type == "jsonl.gz":
+        # wbits=31：带 gzip 头和尾，flush() 输出一个完整的 gzip 成员
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    if save_type == "jsonl.zst":
+        require_zstandard()
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return None
+
+
+def header_line(video_info):
+    return codec.dumps({"type": "header", "format": FORMAT, "version": VERSION,
+                        "video_info": video_info}) + b"\n"
+
+
+def trailer_line(statistics):
+    return codec.dumps({"type": "trailer", "statistics": statistics}) + b"\n"
+
+
+def message_line(m):
+    """一条 ChatMessage 的 JSON 行（不含换行符）"""
+    return (
+        '{"time_text":' + encode_basestring(m.time_text)
+        + ',"author":' + encode_basestring(m.author)
+        + ',"author_id":' + encode_basestring(m.author_id)
+        + ',"message":' + encode_basestring(m.message)
+        + ',"offset_ms":' + str(m.offset_ms)
+        + '}'
+    )
+
+
+def _open_chunks(path, save_type):
+    """按块产出解压后的字节"""
+    if save_type == "jsonl.zst":
+        require_zstandard()
+        with open(path, 'rb') as f:
+            reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+            yield from iter(lambda: reader.read(_READ_SIZE), b"")
+        return
+    opener = gzip.open if save_type == "jsonl.gz" else open
+    with opener(path, 'rb') as f:
+        yield from iter(lambda: f.read(_READ_SIZE), b"")
+
+
+def iter_records(path):
+    """逐行解析 JSONL 文件，产出每一行的对象（包括 header 和 trailer）"""
+    pending = b""
+    for chunk in _open_chunks(path, save_type_of(path)):
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line:
+                yield codec.loads(line)
+    if pending.strip():
+        yield codec.loads(pending)
+
+
+def read_jsonl(path):
+    """读取 JSONL 文件，返回与 JSON 文件相同结构的字典"""
+    records = iter_records(path)
+    header = next(records, None)
+    if not header or header.get("type") != "header":
+        raise ValueError(f"不是有效的 {FORMAT} 文件（缺少 header）: {path}")
+    messages = []
+    statistics = None
+    for record in records:
+        if record.get("type") == "trailer":
+            statistics = record["statistics"]
+        else:
+            messages.append(record)
+    if statistics is None:
+        raise ValueError(f"文件不完整（缺少 trailer）: {path}")
+    return {"video_info": header["video_info"], "messages": messages, "statistics": statistics}
+
+
+def load_chat_file(path):
+    """读取任意保存类型的聊天回放文件"""
+    save_type = save_type_of(path)
+    if save_type is None or save_type == "json":
+        return codec.load_file(path)
+    return read_jsonl(path)
+
+
+def write_chat_file(path, data):
+    """把 {"video_info", "messages", "statistics"} 一次性写成 path 扩展名对应的格式"""
+    save_type = save_type_of(path) or "json"
+    if save_type == "json":
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+    z = compressor(save_type)
+    with open(path, 'wb') as f:
+        def emit(data_bytes):
+            f.write(z.compress(data_bytes) if z else data_bytes)
+        emit(header_line(data["video_info"]))
+        for m in data["messages"]:
+            emit(codec.dumps(m) + b"\n")
+        emit(trailer_line(data["statistics"]))
+        if z:
+            f.write(z.flush())
+    return path
+
+
+def find_chat_files(directory):
+    """目录中所有保存类型的聊天回放文件（按文件名排序）"""
+    directory = Path(directory)
+    return sorted(
+        (p for p in directory.iterdir() if p.is_file() and save_type_of(p.name)),
+        key=lambda p: p.name,
+    )
@@ -0,0 +1,56 @@
+"""紧凑的聊天消息记录"""
+
+import sys
+
+FIELDS = ("time_text", "author", "author_id", "message", "offset_ms")
+
+
+class ChatMessage:
+    """一条聊天消息
+
+    使用 __slots__ 代替五个键的字典，作者名和频道 ID 经过 sys.intern，
+    同一作者的所有消息共享同一个字符串对象。to_dict() 返回与原 JSON 输出
+    字段顺序一致的字典；m["offset_ms"] 形式的只读访问仍然可用。
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, time_text, author, author_id, message, offset_ms):
+        self.time_text = time_text
+        self.author = sys.intern(author)
+        self.author_id = sys.intern(author_id)
+        self.message = message
+        self.offset_ms = offset_ms
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["time_text"], d["author"], d["author_id"], d["message"], d["offset_ms"])
+
+    def to_dict(self):
+        return {
+            "time_text": self.time_text,
+            "author": self.author,
+            "author_id": self.author_id,
+            "message": self.message,
+            "offset_ms": self.offset_ms
+        }
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __eq__(self, other):
+        if isinstance(other, ChatMessage):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ChatMessage({self.time_text!r}, {self.author!r}, {self.message!r})"
+
+
+def as_messages(messages):
+    """把字典形式的消息转换为 ChatMessage（已经是 ChatMessage 的原样保留）"""
+    return [m if isinstance(m, ChatMessage) else ChatMessage.from_dict(m) for m in messages]
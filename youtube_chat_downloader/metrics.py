@@ -0,0 +1,197 @@
+"""下载过程的分阶段耗时与流量统计"""
+
+import os
+import json
+import time
+import threading
+
+# 阶段：html 下载观看页面、metadata 解析视频信息（观看页面或 yt-dlp）、
+# rate_limit_wait 等待限速令牌、chat_page 聊天分页 HTTP 请求、decode 解码分页 JSON、
+# parse 解析消息、backoff 重试退避、save 写入文件、export 列式导出、sleep 视频之间的休眠、
+# db_import 导入数据库
+QUANTILES = (0.5, 0.95, 0.99)
+# fetch_stats 中导出为 Prometheus 计数器的字段
+FETCH_COUNTERS = ("requests", "pages", "retries", "throttled", "server_errors", "errors")
+
+
+def percentile(values, q):
+    """线性插值的分位数，values 为空时返回 0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+class StageMetrics:
+    """线程安全的分阶段累计：次数、秒数、字节数，以及每个聊天分页的延迟"""
+
+    def __init__(self):
+        self.stages = {}
+        self.page_latencies = []
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, nbytes=0):
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = {"count": 0, "seconds": 0.0, "bytes": 0}
+            entry["count"] += 1
+            entry["seconds"] += seconds
+            entry["bytes"] += nbytes
+            if stage == "chat_page":
+                self.page_latencies.append(seconds)
+
+    def merge(self, other):
+        with other._lock:
+            stages = {k: dict(v) for k, v in other.stages.items()}
+            latencies = list(other.page_latencies)
+        with self._lock:
+            for stage, src in stages.items():
+                entry = self.stages.setdefault(stage, {"count": 0, "seconds": 0.0, "bytes": 0})
+                for key in entry:
+                    entry[key] += src[key]
+            self.page_latencies.extend(latencies)
+
+    def as_dict(self):
+        with self._lock:
+            stages = {
+                k: {"count": v["count"], "seconds": round(v["seconds"], 6), "bytes": v["bytes"]}
+                for k, v in self.stages.items()
+            }
+            latencies = list(self.page_latencies)
+        return {
+            "stages": stages,
+            "page_latency": {
+                "count": len(latencies),
+                "sum": round(sum(latencies), 6),
+                **{f"p{int(q * 100)}": round(percentile(latencies, q), 6) for q in QUANTILES},
+            },
+        }
+
+
+def record_stage(metrics, stage, start, nbytes=0):
+    """记录从 start（time.perf_counter()）到现在的耗时；metrics 为 None 时不做任何事"""
+    if metrics is not None:
+        metrics.add(stage, time.perf_counter() - start, nbytes)
+
+
+class RunMetrics:
+    """整个运行的统计：每个视频一份 StageMetrics，另有运行级阶段（如导入数据库）"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.run_stages = StageMetrics()
+        self.videos = {}
+        self._lock = threading.Lock()
+
+    def add_video(self, video_id, status, metrics=None, fetch_stats=None, messages=0):
+        with self._lock:
+            self.videos[video_id] = {
+                "status": status,
+                "messages": messages,
+                "fetch_stats": dict(fetch_stats or {}),
+                "metrics": metrics or StageMetrics(),
+            }
+
+    def summary(self):
+        """返回 JSON 可序列化的汇总（运行级 + 每个视频）"""
+        total = StageMetrics()
+        total.merge(self.run_stages)
+        fetch_totals = {}
+        statuses = {}
+        videos = {}
+        with self._lock:
+            items = list(self.videos.items())
+        for video_id, v in items:
+            total.merge(v["metrics"])
+            for key, n in v["fetch_stats"].items():
+                fetch_totals[key] = fetch_totals.get(key, 0) + n
+            statuses[v["status"]] = statuses.get(v["status"], 0) + 1
+            videos[video_id] = {
+                "status": v["status"],
+                "messages": v["messages"],
+                "fetch_stats": v["fetch_stats"],
+                **v["metrics"].as_dict(),
+            }
+        return {
+            "run": {
+                "started_at": self.started,
+                "duration_seconds": round(time.time() - self.started, 3),
+                "videos": statuses,
+                "messages": sum(v["messages"] for _, v in items),
+                "fetch_stats": fetch_totals,
+                **total.as_dict(),
+            },
+            "videos": videos,
+        }
+
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path):
+        """写入 node_exporter textfile collector 格式"""
+        _write_atomic(path, prometheus_text(self.summary()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(summary):
+    """把 RunMetrics.summary() 转成 Prometheus 文本格式"""
+    run = summary["run"]
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+    metric("ytchat_run_duration_seconds", "gauge", "Wall time of the download run.",
+           [({}, run["duration_seconds"])])
+    metric("ytchat_videos", "gauge", "Videos processed by status.",
+           [({"status": s}, n) for s, n in sorted(run["videos"].items())])
+    metric("ytchat_messages_total", "counter", "Chat messages saved.", [({}, run["messages"])])
+    for key in FETCH_COUNTERS:
+        metric(f"ytchat_{key}_total", "counter", f"Chat replay {key.replace('_', ' ')}.",
+               [({}, run["fetch_stats"].get(key, 0))])
+
+    for field, unit in (("seconds", "seconds"), ("bytes", "bytes"), ("count", "count")):
+        name = f"ytchat_stage_{field}_total" if field != "count" else "ytchat_stage_calls_total"
+        metric(name, "counter", f"Per-stage {unit}.",
+               [({"stage": s}, v[field]) for s, v in sorted(run["stages"].items())])
+
+    latency = run["page_latency"]
+    lines.append("# HELP ytchat_page_latency_seconds Chat page request latency.")
+    lines.append("# TYPE ytchat_page_latency_seconds summary")
+    for q in QUANTILES:
+        lines.append(f'ytchat_page_latency_seconds{{quantile="{q}"}} {latency[f"p{int(q * 100)}"]}')
+    lines.append(f"ytchat_page_latency_seconds_sum {latency['sum']}")
+    lines.append(f"ytchat_page_latency_seconds_count {latency['count']}")
+
+    metric("ytchat_video_stage_seconds", "gauge", "Per-video stage seconds.", [
+        ({"video_id": vid, "stage": s}, st["seconds"])
+        for vid, v in sorted(summary["videos"].items())
+        for s, st in sorted(v["stages"].items())
+    ])
+    metric("ytchat_video_page_latency_seconds", "gauge", "Per-video chat page latency quantiles.", [
+        ({"video_id": vid, "quantile": q}, v["page_latency"][f"p{int(q * 100)}"])
+        for vid, v in sorted(summary["videos"].items())
+        for q in QUANTILES
+    ])
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path, text):
+    """先写临时文件再替换，textfile collector 不会读到半个文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,167 @@
+"""低开销的下载进度输出"""
+
+import sys
+import json
+import time
+import threading
+from .fetcher import ms_to_timestamp
+
+# 输出级别：quiet 只输出警告和最终统计；status 输出限频的状态行；
+# sample 另外抽样回显消息；all 回显每一条消息
+LEVELS = ("quiet", "status", "sample", "all")
+
+
+class ProgressReporter:
+    """整个运行共享的进度输出
+
+    状态行按 interval 秒限频：终端中原地刷新（\\r），重定向到文件时每隔
+    file_interval 秒输出一行。消息回显按页批量写出，不逐条 flush。
+    log_path 提供时额外写入 JSON Lines 格式的结构化事件。
+    """
+
+    def __init__(self, level="status", interval=0.5, file_interval=10.0, sample_every=100,
+                 stream=None, log_path=None):
+        if level not in LEVELS:
+            raise ValueError(f"未知的进度级别: {level}")
+        self.level = level
+        self.sample_every = max(1, sample_every)
+        self.stream = stream or sys.stdout
+        self.tty = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.interval = interval if self.tty else file_interval
+        self._lock = threading.Lock()
+        self._active = 0
+        self._line_open = False
+        self._log = open(log_path, 'a', encoding='utf-8') if log_path else None
+
+    @property
+    def quiet(self):
+        return self.level == "quiet"
+
+    def info(self, text):
+        """普通提示（quiet 时不输出）"""
+        if not self.quiet:
+            self.write_line(text)
+
+    def write_line(self, text):
+        with self._lock:
+            if self._line_open:
+                self.stream.write("\n")
+                self._line_open = False
+            self.stream.write(text + "\n")
+
+    def status(self, text):
+        """状态行：单个视频且输出到终端时原地刷新，否则整行输出"""
+        with self._lock:
+            if self.tty and self._active <= 1:
+                self.stream.write("\r\033[K" + text)
+                self._line_open = True
+            else:
+                if self._line_open:
+                    self.stream.write("\n")
+                    self._line_open = False
+                self.stream.write(text + "\n")
+            self.stream.flush()
+
+    def event(self, kind, **fields):
+        """写一条结构化日志事件"""
+        if self._log is None:
+            return
+        record = {"ts": round(time.time(), 3), "event": kind, **fields}
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._log.write(line + "\n")
+            self._log.flush()
+
+    def video(self, video_id, duration):
+        """开始跟踪一个视频，返回 VideoProgress"""
+        with self._lock:
+            self._active += 1
+        self.event("video_start", video_id=video_id, duration=duration)
+        return VideoProgress(self, video_id, duration)
+
+    def _video_finished(self):
+        with self._lock:
+            self._active -= 1
+            if self._line_open:
+                self.stream.write("\n")
+                self._line_open = False
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+class VideoProgress:
+    """单个视频的进度：每页调用一次 page()"""
+
+    def __init__(self, reporter, video_id, duration):
+        self.reporter = reporter
+        self.video_id = video_id
+        self.duration_ms = (duration or 0) * 1000
+        self.pages = 0
+        self.messages = 0
+        self.max_offset = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self._until_sample = reporter.sample_every
+
+    def covered(self):
+        """已覆盖的视频时长比例"""
+        if not self.duration_ms:
+            return 0.0
+        return min(max(self.max_offset / self.duration_ms, 0.0), 1.0)
+
+    def snapshot(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "video_id": self.video_id,
+            "pages": self.pages,
+            "messages": self.messages,
+            "covered": round(self.covered(), 4),
+            "pages_per_s": round(self.pages / elapsed, 2),
+            "msgs_per_s": round(self.messages / elapsed, 1),
+            "elapsed": round(elapsed, 3),
+        }
+
+    def page(self, messages, max_offset):
+        """记录一页消息，按需回显消息并刷新状态行"""
+        reporter = self.reporter
+        self.pages += 1
+        self.messages += len(messages)
+        if max_offset and max_offset > self.max_offset:
+            self.max_offset = max_offset
+
+        if reporter.level == "all":
+            echo = messages
+        elif reporter.level == "sample":
+            # 每 sample_every 条回显一条，跨页连续计数
+            i = self._until_sample - 1
+            echo = messages[i::reporter.sample_every]
+            self._until_sample = (i - len(messages)) % reporter.sample_every + 1
+        else:
+            echo = ()
+        if echo:
+            reporter.write_line("\n".join(
+                f"{m.time_text} | {m.author} ({m.author_id}) | {m.message}" for m in echo
+            ))
+
+        now = time.monotonic()
+        if now - self._last_report >= reporter.interval:
+            self._last_report = now
+            snap = self.snapshot()
+            if not reporter.quiet:
+                reporter.status(self.format(snap))
+            reporter.event("progress", **snap)
+
+    def format(self, snap):
+        position = ms_to_timestamp(self.max_offset)
+        total = ms_to_timestamp(self.duration_ms) if self.duration_ms else "?"
+        return (f"⏳ {snap['pages_per_s']:.1f} 页/s | {snap['msgs_per_s']:,.0f} 条/s | "
+                f"{snap['covered']:.1%} ({position} / {total}) | {self.messages:,} 条")
+
+    def done(self, status, **fields):
+        """结束该视频的跟踪"""
+        snap = self.snapshot()
+        self.reporter._video_finished()
+        self.reporter.event("video_done", status=status, **snap, **fields)
@@ -0,0 +1,80 @@
+"""自适应限速与重试退避"""
+
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+
+class AdaptiveRateLimiter:
+    """自适应令牌桶
+
+    响应正常时按加法逐步提高速率，遇到 429/5xx 时按乘法降低速率，
+    并在服务器给出 Retry-After 时暂停所有请求直到该时间点。
+    同一个实例被所有视频共享，因此也是整个运行的全局请求预算。
+    """
+
+    def __init__(self, rate=10.0, min_rate=0.2, max_rate=20.0, burst=5,
+                 increase=0.5, decrease=0.5):
+        self.rate = min(rate, max_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+
+    def acquire(self):
+        """阻塞直到获得一个请求令牌"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                    self._last = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        """请求成功：加法提高速率"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        """被限流或服务器出错：乘法降低速率，必要时全局暂停"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = 0.0
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """带抖动的指数退避，返回 [base/2, min(cap, base*2^attempt)] 内的随机秒数"""
+    return random.uniform(base / 2, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 头（秒数或 HTTP 日期），返回秒数或 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return max((dt - datetime.now(timezone.utc)).total_seconds(), 0.0)
@@ -0,0 +1,135 @@
+"""可复用的 HTTP 会话（连接池 + keep-alive）"""
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from .ratelimit import AdaptiveRateLimiter
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
+
+
+class _CountingAdapter(HTTPAdapter):
+    """记录真实建立的 TCP 连接数的 HTTPAdapter"""
+
+    def __init__(self, on_connect, **kwargs):
+        self._on_connect = on_connect
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": self._counting_pool(HTTPConnectionPool),
+            "https": self._counting_pool(HTTPSConnectionPool),
+        }
+
+    def _counting_pool(self, pool_cls):
+        on_connect = self._on_connect
+
+        class Connection(pool_cls.ConnectionCls):
+            def connect(self):
+                super().connect()
+                on_connect()
+
+        return type(pool_cls.__name__, (pool_cls,), {"ConnectionCls": Connection})
+
+
+class ChatSession:
+    """在一次运行中被所有视频共享的 HTTP 会话
+
+    内部持有一个 requests.Session，通过 HTTPAdapter 维护连接池，
+    让 fetch_html / fetch_chat 的请求复用已建立的 TCP+TLS 连接。
+    """
+
+    def __init__(self, pool_size=10, keep_alive=True, max_inflight=None,
+                 limiter=None, max_retries=8, api_base="https://www.youtube.com"):
+        self.pool_size = pool_size
+        # InnerTube 接口地址，可指向本地桩服务器进行离线测试
+        self.api_base = api_base.rstrip("/")
+        self.keep_alive = keep_alive
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.max_retries = max_retries
+        # 按运行缓存的 INNERTUBE_API_KEY / 客户端版本，后续视频无需再搜索
+        self.params_cache = {}
+        # 按运行缓存的观看页面解析结果（视频信息 + 初始 continuation），键为视频链接
+        self.watch_pages = {}
+        # 全局请求预算：所有并发视频共享同一个在途请求上限
+        self._inflight = threading.BoundedSemaphore(max_inflight) if max_inflight else None
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._connections = 0
+        self._bytes = 0
+
+        self._session = requests.Session()
+        adapter = _CountingAdapter(
+            self._count_connection, pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers["User-Agent"] = USER_AGENT
+        self._session.headers["Connection"] = "keep-alive" if keep_alive else "close"
+
+    def _count_connection(self):
+        with self._lock:
+            self._connections += 1
+
+    def request(self, method, url, **kwargs):
+        """发送请求并记录流量"""
+        if self._inflight is None:
+            r = self._session.request(method, url, **kwargs)
+        else:
+            with self._inflight:
+                r = self._session.request(method, url, **kwargs)
+        with self._lock:
+            self._requests += 1
+            self._bytes += len(r.content)
+        return r
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def connection_stats(self):
+        """返回连接复用统计
+
+        Returns:
+            {"requests", "connections", "reused", "reuse_ratio", "bytes"}
+        """
+        with self._lock:
+            requests_sent = self._requests
+            connections = self._connections
+            received = self._bytes
+
+        reused = max(requests_sent - connections, 0)
+        return {
+            "requests": requests_sent,
+            "connections": connections,
+            "reused": reused,
+            "reuse_ratio": reused / requests_sent if requests_sent else 0.0,
+            "bytes": received,
+        }
+
+    def close(self):
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_default_session = None
+_default_lock = threading.Lock()
+
+
+def get_default_session():
+    """获取模块级共享会话（未显式传入 session 时使用）"""
+    global _default_session
+    with _default_lock:
+        if _default_session is None:
+            _default_session = ChatSession()
+        return _default_session
@@ -0,0 +1,356 @@
+"""聊天回放的增量写入"""
+
+import os
+import json
+import sqlite3
+import threading
+from json.encoder import encode_basestring
+from datetime import datetime
+from . import codec
+from .fetcher import ChatStatistics
+from .messages import as_messages
+from .jsonl import compressor, header_line, trailer_line, message_line
+from .db_importer import init_database, video_exists, upsert_video, stored_time_text
+
+
+def generate_filename(video_info, save_type="json"):
+    """根据视频信息生成文件名，扩展名为保存类型（json / jsonl / jsonl.gz / jsonl.zst）"""
+    video_id = video_info["id"]
+    upload_date = video_info.get("upload_date", "unknown")
+
+    if upload_date and upload_date != "unknown":
+        try:
+            dt = datetime.strptime(upload_date, "%Y%m%d")
+            date_str = dt.strftime("%Y%m%d")
+        except:
+            date_str = upload_date
+    else:
+        date_str = "unknown"
+
+    filename = f"{date_str}_{video_id}.{save_type}"
+    return filename
+
+
+def _dumps(obj, level):
+    """按 json.dump(indent=2) 的格式序列化，并缩进到指定层级"""
+    text = json.dumps(obj, ensure_ascii=False, indent=2)
+    return text.replace("\n", "\n" + " " * level)
+
+
+def _message_json(m):
+    """按 _dumps(m.to_dict(), 4) 的格式序列化一条消息，不经过字典和 Python 版编码器"""
+    return (
+        '{\n      "time_text": ' + encode_basestring(m.time_text)
+        + ',\n      "author": ' + encode_basestring(m.author)
+        + ',\n      "author_id": ' + encode_basestring(m.author_id)
+        + ',\n      "message": ' + encode_basestring(m.message)
+        + ',\n      "offset_ms": ' + str(m.offset_ms)
+        + '\n    }'
+    )
+
+
+class JsonChatWriter:
+    """逐页追加消息的 JSON 写入器
+
+    输出与 json.dump({"video_info", "messages", "statistics"}, indent=2) 逐字节一致，
+    但消息写完即释放，统计信息边写边计算。数据先写入 .part 文件，
+    close() 时再原子地重命名为最终文件名。
+
+    每写入 checkpoint_every 页会在 .ckpt 文件中记录下一页的 continuation、
+    已见最大偏移和 .part 的有效长度；下载中断后用 resume=True 重新打开即可续传。
+    """
+
+    save_type = "json"
+
+    def __init__(self, output_dir, video_info, resume=False, checkpoint_every=20):
+        os.makedirs(output_dir, exist_ok=True)
+        self.video_info = video_info
+        self.path = os.path.join(output_dir, generate_filename(video_info, self.save_type))
+        self.part_path = self.path + ".part"
+        self.checkpoint_path = self.path + ".ckpt"
+        self.checkpoint_every = checkpoint_every
+        self.statistics = ChatStatistics()
+        # 从检查点恢复时为 {"continuation", "max_offset", "messages"}，否则为 None
+        self.resume_state = None
+
+        self._state = None
+        self._pages_since_checkpoint = 0
+
+        checkpoint = self._load_checkpoint() if resume else None
+        if checkpoint:
+            self._file = open(self.part_path, 'r+b')
+            self._file.truncate(checkpoint["part_bytes"])
+            self._file.seek(checkpoint["part_bytes"])
+            stats = checkpoint["statistics"]
+            self.statistics.total_messages = stats["total_messages"]
+            self.statistics.author_ids = set(stats["author_ids"])
+            self.statistics.min_offset = stats["min_offset"]
+            self.statistics.max_offset = stats["max_offset"]
+            self._state = checkpoint
+            self.resume_state = {
+                "continuation": checkpoint["continuation"],
+                "max_offset": checkpoint["max_offset"],
+                "messages": stats["total_messages"],
+            }
+        else:
+            self._file = open(self.part_path, 'wb')
+            self._start()
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+
+    def _start(self):
+        """写入消息之前的部分"""
+        self._file.write(
+            ('{\n  "video_info": ' + _dumps(self.video_info, 2) + ',\n  "messages": [').encode('utf-8')
+        )
+
+    def _write_page(self, messages):
+        sep = ",\n    " if self.statistics.total_messages else "\n    "
+        self._file.write((sep + ",\n    ".join(map(_message_json, messages))).encode('utf-8'))
+
+    def _finish(self, statistics):
+        """写入消息之后的部分"""
+        closing = "\n  ]" if self.statistics.total_messages else "]"
+        self._file.write((closing + ',\n  "statistics": ' + _dumps(statistics, 2) + "\n}").encode('utf-8'))
+
+    def _resume_point(self, due):
+        """可以从此处截断续写的 .part 长度；返回 None 表示本页不更新检查点状态
+
+        due 为 True 表示本页之后要保存检查点。
+        """
+        return self._file.tell()
+
+    def _load_checkpoint(self):
+        """读取与当前视频匹配且 .part 文件完好的检查点"""
+        try:
+            checkpoint = codec.load_file(self.checkpoint_path)
+            part_size = os.path.getsize(self.part_path)
+        except (OSError, ValueError):
+            return None
+        if checkpoint.get("video_id") != self.video_info["id"]:
+            return None
+        if not checkpoint.get("continuation") or checkpoint.get("part_bytes", 0) > part_size:
+            return None
+        return checkpoint
+
+    def write(self, messages, continuation=None, max_offset=None):
+        """追加一页消息
+
+        Args:
+            messages: ChatMessage 列表（字典形式的消息也可以）
+            continuation: 下一页的 continuation；提供时更新检查点状态
+            max_offset: 已见的最大偏移（毫秒）
+        """
+        if messages:
+            messages = as_messages(messages)
+            self._write_page(messages)
+            self.statistics.add(messages)
+
+        if continuation:
+            self._pages_since_checkpoint += 1
+            due = self._pages_since_checkpoint >= self.checkpoint_every
+            part_bytes = self._resume_point(due)
+            if part_bytes is not None:
+                self._state = {
+                    "video_id": self.video_info["id"],
+                    "continuation": continuation,
+                    "max_offset": max_offset or 0,
+                    "part_bytes": part_bytes,
+                    "statistics": {
+                        "total_messages": self.statistics.total_messages,
+                        "min_offset": self.statistics.min_offset,
+                        "max_offset": self.statistics.max_offset,
+                    },
+                }
+            if due:
+                self.save_checkpoint()
+
+    def save_checkpoint(self):
+        """把最近一次的检查点状态写入磁盘"""
+        if self._state is None:
+            return
+        self._file.flush()
+        state = dict(self._state)
+        state["statistics"] = dict(state["statistics"], author_ids=sorted(self.statistics.author_ids))
+        state["updated_at"] = datetime.now().isoformat()
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(codec.dumps(state))
+        os.replace(tmp_path, self.checkpoint_path)
+        self._pages_since_checkpoint = 0
+
+    def close(self, statistics=None):
+        """写入统计信息并生成最终文件，返回文件路径"""
+        if statistics is None:
+            statistics = self.statistics.as_dict()
+        self._finish(statistics)
+        self._file.close()
+        os.replace(self.part_path, self.path)
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return self.path
+
+    def abort(self):
+        """放弃写入并删除临时文件"""
+        self._file.close()
+        for path in (self.part_path, self.checkpoint_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None or self._file.closed:
+            return
+        # 已有进度时保留 .part 和检查点供 --resume 续传（包括 Ctrl-C）
+        if self._state is not None:
+            self.save_checkpoint()
+            self._file.close()
+        else:
+            self.abort()
+
+
+class JsonlChatWriter(JsonChatWriter):
+    """逐页追加消息的 JSON Lines 写入器（jsonl / jsonl.gz / jsonl.zst）
+
+    首行为 header（video_info），每条消息一行，close() 时写入 trailer（statistics）。
+    压缩格式在每个检查点结束当前 gzip 成员 / zstd 帧，检查点记录的 .part 长度
+    总是落在成员边界上，续传时截断后追加新的成员即可。
+    """
+
+    def __init__(self, output_dir, video_info, save_type="jsonl", resume=False, checkpoint_every=20):
+        self.save_type = save_type
+        self._z = compressor(save_type)
+        super().__init__(output_dir, video_info, resume=resume, checkpoint_every=checkpoint_every)
+
+    def _write(self, data):
+        self._file.write(self._z.compress(data) if self._z else data)
+
+    def _end_member(self):
+        self._file.write(self._z.flush())
+        self._z = compressor(self.save_type)
+
+    def _start(self):
+        self._write(header_line(self.video_info))
+
+    def _write_page(self, messages):
+        self._write(("\n".join(map(message_line, messages)) + "\n").encode('utf-8'))
+
+    def _finish(self, statistics):
+        self._write(trailer_line(statistics))
+        if self._z:
+            self._file.write(self._z.flush())
+
+    def _resume_point(self, due):
+        if self._z is None:
+            return self._file.tell()
+        # 压缩流只在成员边界上可截断
+        if not due:
+            return None
+        self._end_member()
+        return self._file.tell()
+
+
+# 每个数据库文件一把锁：同一进程内各视频的写入事务依次进行
+_db_locks = {}
+_db_locks_guard = threading.Lock()
+
+
+def _db_lock(db_path):
+    key = os.path.abspath(db_path)
+    with _db_locks_guard:
+        return _db_locks.setdefault(key, threading.Lock())
+
+
+class SqliteChatWriter:
+    """逐页写入 SQLite 数据库（videos / authors / messages 表）的写入器
+
+    下载期间每页消息一次 executemany 写入本连接的 TEMP 暂存表，不占用主数据库的写锁，
+    多个视频可以同时下载。close() 时才开始事务：写入 videos 行、删除该视频的旧消息，
+    把暂存的消息连同新作者一次复制到 messages 并提交；中断时暂存表随连接丢弃，
+    数据库中不会留下半个视频。事务是原子的，因此不支持检查点续传（resume_state 总是 None）。
+    """
+
+    save_type = "sqlite"
+
+    def __init__(self, db_path, video_info, resume=False, checkpoint_every=20):
+        self.video_info = video_info
+        self.path = db_path
+        self.statistics = ChatStatistics()
+        self.resume_state = None
+        init_database(db_path).close()
+        # isolation_level=None：由本类显式控制事务
+        self._conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TEMP TABLE staging (
+                author_id TEXT, author TEXT, offset_ms INTEGER, message TEXT, time_text TEXT
+            )
+        ''')
+        self._lock = _db_lock(db_path)
+
+    def write(self, messages, continuation=None, max_offset=None):
+        """追加一页消息（continuation / max_offset 仅为与 JsonChatWriter 接口一致）"""
+        if messages:
+            messages = as_messages(messages)
+            self._conn.executemany(
+                'INSERT INTO temp.staging VALUES (?, ?, ?, ?, ?)',
+                [(m.author_id or '', m.author or '', m.offset_ms, m.message,
+                  stored_time_text(m.time_text, m.offset_ms)) for m in messages]
+            )
+            self.statistics.add(messages)
+
+    def close(self, statistics=None):
+        """在一个事务中写入视频和暂存的消息并提交，返回数据库路径"""
+        if statistics is None:
+            statistics = self.statistics.as_dict()
+        try:
+            with self._lock:
+                cursor = self._conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    existed = video_exists(cursor, self.video_info["id"])
+                    video_key = upsert_video(cursor, self.video_info, statistics)
+                    if existed:
+                        cursor.execute('DELETE FROM messages WHERE video_key = ?', (video_key,))
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO authors (author_id, author)
+                        SELECT author_id, author FROM temp.staging
+                        GROUP BY author_id, author ORDER BY MIN(rowid)
+                    ''')
+                    cursor.execute('''
+                        INSERT INTO messages (video_key, author_key, offset_ms, message, time_text)
+                        SELECT ?, a.id, s.offset_ms, s.message, s.time_text
+                        FROM temp.staging s
+                        JOIN authors a ON a.author_id = s.author_id AND a.author = s.author
+                        ORDER BY s.rowid
+                    ''', (video_key,))
+                    cursor.execute('COMMIT')
+                except BaseException:
+                    cursor.execute('ROLLBACK')
+                    raise
+        finally:
+            self._conn.close()
+        return self.path
+
+    def abort(self):
+        """放弃当前视频（丢弃暂存的消息）"""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+
+
+def open_chat_writer(output_dir, video_info, save_type="json", resume=False, checkpoint_every=20,
+                     db_path=None):
+    """按保存类型创建写入器；save_type 为 sqlite 时写入 db_path"""
+    if save_type == "json":
+        return JsonChatWriter(output_dir, video_info, resume=resume, checkpoint_every=checkpoint_every)
+    if save_type == "sqlite":
+        return SqliteChatWriter(db_path, video_info, resume=resume, checkpoint_every=checkpoint_every)
+    return JsonlChatWriter(output_dir, video_info, save_type, resume=resume,
+                           checkpoint_every=checkpoint_every)